@@ -2,7 +2,12 @@
 
 from django.contrib import admin
 from django.contrib.auth.models import User, Group
-from .models import BlogPost, Tag
+from django.db.models import Exists, OuterRef
+from django.urls import reverse
+from django.utils.html import format_html
+from .models import BlogPost, Tag, ImageJob, Like
+from .pagination import EstimatedCountPaginator
+from .search import search_posts
 
 # 認証と認可セクションを非表示
 admin.site.unregister(User)
@@ -13,32 +18,132 @@ admin.site.unregister(Group)
 class TagAdmin(admin.ModelAdmin):
     """タグ管理画面の設定"""
 
-    list_display = ["name", "created_at"]
+    list_display = ["name", "published_post_count", "created_at"]
     search_fields = ["name"]
     ordering = ["name"]
 
 
+class TagFilter(admin.SimpleListFilter):
+    """タグで絞り込む（中間テーブルへの EXISTS にして JOIN と DISTINCT を避ける）"""
+
+    title = "タグ"
+    parameter_name = "tag"
+
+    def lookups(self, request, model_admin):
+        return Tag.objects.order_by("name").values_list("pk", "name")
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        try:
+            tag_id = int(self.value())
+        except ValueError:
+            return queryset.none()
+        # 中間テーブルの (blogpost_id, tag_id) 一意インデックスを引く
+        return queryset.filter(
+            Exists(
+                BlogPost.tags.through.objects.filter(blogpost_id=OuterRef("pk"), tag_id=tag_id)
+            )
+        )
+
+
 @admin.register(BlogPost)
 class BlogPostAdmin(admin.ModelAdmin):
-    """ブログ記事管理画面の設定"""
+    """
+    ブログ記事管理画面の設定
+
+    記事が多くても一覧が重くならないよう、件数は推定値（EstimatedCountPaginator）、
+    タグの絞り込みは EXISTS、検索は全文検索インデックスを使う。
+    date_hierarchy は年・月の一覧を作るために全件を走査するため使わない。
+    """
 
-    list_display = ["title", "is_published", "created_at", "updated_at"]
-    list_filter = ["is_published", "created_at", "tags"]
+    list_display = ["title", "is_published", "image_status", "likes_link", "created_at", "updated_at"]
+    list_filter = ["is_published", "created_at", TagFilter]
+    # 検索は get_search_results で blog.search の全文検索に置き換える
     search_fields = ["title", "description"]
     filter_horizontal = ["tags"]
-    date_hierarchy = "created_at"
-    readonly_fields = ["created_at", "updated_at"]
+    readonly_fields = ["image_status", "created_at", "updated_at"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     fieldsets = (
         ("基本情報", {"fields": ("title", "description")}),
-        ("画像", {"fields": ("image",)}),
+        ("画像", {"fields": ("image", "image_status")}),
         ("タグ", {"fields": ("tags",)}),
         ("公開設定", {"fields": ("is_published", "published_at")}),
         ("タイムスタンプ", {"fields": ("created_at", "updated_at"), "classes": ("collapse",)}),
     )
 
+    @admin.display(description="いいね数", ordering="likes_count")
+    def likes_link(self, obj):
+        """非正規化されたいいね数と、その記事のいいね一覧へのリンク"""
+        url = reverse("admin:blog_like_changelist")
+        return format_html('<a href="{}?blog_post__id__exact={}">{}</a>', url, obj.pk, obj.likes_count)
+
+    def get_search_results(self, request, queryset, search_term):
+        """本文の ILIKE で全件を走査せず、全文検索インデックス（blog.search）で検索する"""
+        if not search_term.strip():
+            return queryset, False
+        return search_posts(queryset, search_term), False
+
     def save_model(self, request, obj, form, change):
         """保存時に著者を自動設定"""
         if not change:  # 新規作成時のみ
             obj.author = request.user
         super().save_model(request, obj, form, change)
+
+
+@admin.register(ImageJob)
+class ImageJobAdmin(admin.ModelAdmin):
+    """画像処理ジョブ管理画面の設定（閲覧のみ）"""
+
+    list_display = ["blog_post", "status", "attempts", "is_backfill", "created_at", "finished_at"]
+    list_filter = ["status", "is_backfill"]
+    list_select_related = ["blog_post"]
+    readonly_fields = [
+        "blog_post", "source_name", "status", "attempts", "is_backfill", "error",
+        "created_at", "started_at", "finished_at",
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Like)
+class LikeAdmin(admin.ModelAdmin):
+    """
+    いいね管理画面の設定（閲覧のみ）
+
+    数百万行でもインデックスで引ける操作だけにする：新しい順（created_at）、
+    記事での絞り込み（記事一覧の「いいね数」のリンク）、セッションキーの完全一致検索。
+    記事ごとの件数は集計せず、非正規化された BlogPost.likes_count を表示する。
+    """
+
+    list_display = ["created_at", "blog_post", "post_likes_count", "short_session_key"]
+    list_select_related = ["blog_post"]
+    search_fields = ["=session_key"]
+    search_help_text = "セッションキーの完全一致で検索します"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = ["blog_post", "session_key", "created_at"]
+
+    @admin.display(description="記事のいいね数", ordering="blog_post__likes_count")
+    def post_likes_count(self, obj):
+        return obj.blog_post.likes_count
+
+    @admin.display(description="セッションキー")
+    def short_session_key(self, obj):
+        return f"{obj.session_key[:8]}..."
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        # 削除するといいね数（likes_count）やトレンドスコアとずれるため blog.likes を通す
+        return False
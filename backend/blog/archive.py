@@ -0,0 +1,82 @@
+# blog/archive.py
+
+"""
+月別アーカイブ（ArchiveMonth）の維持
+
+記事の保存・削除のたびに blog.signals から refresh_months を呼び、その記事の
+作成月（TIME_ZONE での月）の公開記事数だけを数え直す。作成日時は変更されない
+ため、公開・非公開の切り替えや削除で影響する月は常に1つになる。
+シグナルを通さない一括投入（blog.seed・seed_blog）の後は rebuild で全月を作り直す。
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from . import cache
+from .models import ArchiveMonth, BlogPost
+
+
+def month_of(value):
+    """日時が属する月の1日（現在のタイムゾーン）"""
+    return timezone.localtime(value).date().replace(day=1)
+
+
+def parse_month(value):
+    """"2024-05" 形式の文字列を月の1日にする（不正な値は ValueError）"""
+    return datetime.strptime(value, "%Y-%m").date()
+
+
+def month_range(month):
+    """月の始まりと次の月の始まり（created_at の範囲条件に使う aware な日時）"""
+    next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (
+        timezone.make_aware(datetime.combine(month, time.min)),
+        timezone.make_aware(datetime.combine(next_month, time.min)),
+    )
+
+
+def actual_month_counts():
+    """公開記事の実件数を月ごとに数える（{月の1日: 件数}）"""
+    rows = (
+        BlogPost.objects.filter(is_published=True)
+        .annotate(month=TruncMonth("created_at"))
+        .order_by()
+        .values("month")
+        .annotate(c=Count("pk"))
+        .values_list("month", "c")
+    )
+    return {month_of(month): count for month, count in rows}
+
+
+def store_counts(counts):
+    """月ごとの件数を保存する（0件の月は行を消す）"""
+    with transaction.atomic():
+        ArchiveMonth.objects.filter(
+            month__in=[month for month, count in counts.items() if not count]
+        ).delete()
+        for month, count in counts.items():
+            if count:
+                ArchiveMonth.objects.update_or_create(month=month, defaults={"post_count": count})
+    cache.invalidate(cache.ARCHIVE)
+
+
+def refresh_months(months):
+    """指定した月の公開記事数を数え直す"""
+    counts = {}
+    for month in set(months):
+        start, end = month_range(month)
+        counts[month] = BlogPost.objects.filter(
+            is_published=True, created_at__gte=start, created_at__lt=end
+        ).count()
+    store_counts(counts)
+
+
+def rebuild():
+    """すべての月の公開記事数を数え直す（記事のなくなった月の行は消す）"""
+    counts = dict.fromkeys(ArchiveMonth.objects.values_list("month", flat=True), 0)
+    counts.update(actual_month_counts())
+    store_counts(counts)
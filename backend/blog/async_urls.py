@@ -0,0 +1,23 @@
+# blog/async_urls.py
+
+"""
+記事一覧・詳細・いいね系を非同期ビュー（blog.async_views）で処理する blog.urls
+
+settings.ASYNC_API_VIEWS が True のとき config.urls が /api/ に使う。
+"""
+
+from django.urls import path
+
+from . import async_views
+from .urls import app_name, urlpatterns as sync_urlpatterns  # noqa: F401
+
+urlpatterns = [
+    path('posts/', async_views.post_list, name='blogpost-list'),
+    path('posts/<int:pk>/', async_views.post_detail, name='blogpost-detail'),
+    path('posts/<int:pk>/like/', async_views.post_like, name='blogpost-like'),
+    path(
+        'posts/<int:pk>/like_status/',
+        async_views.post_like_status,
+        name='blogpost-like-status',
+    ),
+] + sync_urlpatterns
@@ -0,0 +1,215 @@
+# blog/async_views.py
+
+"""
+ASGI 向けの非同期ビュー（settings.ASYNC_API_VIEWS が True のとき blog.async_urls が使う）
+
+記事一覧・詳細・いいね・いいね状態を async def で実装し、DBアクセスは
+非同期ORM（acount / aget / aexists / async for）で行う。URL・レスポンスの
+形式は BlogPostViewSet と同じで、絞り込み・並べ替え・ページネーション・
+キャッシュもビューセットの実装（フィルター、BlogPostPagination、blog.cache）を
+共用する。
+
+JSON 以外の表現（ブラウザブルAPI）や GET/POST/DELETE 以外のメソッドは
+従来のビューセットに委譲する。同期方式のいいねの追加・解除は
+トランザクションが必要なため、その部分だけスレッドで実行する（blog.likes）。
+
+CSRF はビューセット（SessionAuthentication）と同じく、ログイン中のセッションの
+リクエストにだけトークンを求める。委譲する GET 系は csrf_exempt にして
+ビューセット側の検査に任せ、自前で書き込むいいねは session_csrf で検査する。
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import APIException, MethodNotAllowed
+
+from . import cache, likes, routers, timing
+from .models import BlogPost
+from .serializers import aserialize_list_rows, list_row_fields
+from .views import BlogPostViewSet, like_result
+
+# 非同期パスで応答しない場合に使うビューセットのビュー
+_sync_views = {
+    "list": BlogPostViewSet.as_view({"get": "list"}),
+    "retrieve": BlogPostViewSet.as_view({"get": "retrieve"}),
+    "like": BlogPostViewSet.as_view({"post": "like", "delete": "like"}),
+    "like_status": BlogPostViewSet.as_view({"get": "like_status"}),
+}
+
+
+def _json(data, status=200):
+    # DRF の JSONRenderer と同じく非ASCII文字をエスケープせず、区切りを詰める
+    return JsonResponse(
+        data,
+        status=status,
+        safe=False,
+        json_dumps_params={"ensure_ascii": False, "separators": (",", ":")},
+    )
+
+
+def _wants_json(request):
+    """JSON で応答してよいリクエストか（ブラウザブルAPIはビューセットに任せる）"""
+    fmt = request.GET.get("format")
+    if fmt is not None:
+        return fmt == "json"
+    accept = request.headers.get("Accept", "")
+    return "text/html" not in accept or "application/json" in accept
+
+
+def session_csrf(view):
+    """
+    SessionAuthentication と同じ条件で CSRF を検査する非同期ビュー用デコレーター
+
+    未ログインのリクエストは検査しない（CsrfViewMiddleware の対象からも外す）。
+    有効なユーザーでログインしていればトークンを必須にし、失敗したら 403 を返す。
+    """
+
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        user = await request.auser()
+        if user.is_active:
+            try:
+                SessionAuthentication().enforce_csrf(request)
+            except APIException as exc:
+                return _json({"detail": exc.detail}, status=exc.status_code)
+        return await view(request, *args, **kwargs)
+
+    wrapped.csrf_exempt = True
+    return wrapped
+
+
+async def _delegate(action, request, **kwargs):
+    return await sync_to_async(_sync_views[action])(request, **kwargs)
+
+
+def _viewset(request, action, **kwargs):
+    """フィルター・ページネーション・キャッシュスコープを共用するためのビューセット"""
+    view = BlogPostViewSet(
+        action_map={"get": action}, action=action, args=(), kwargs=kwargs, format_kwarg=None
+    )
+    view.request = view.initialize_request(request, **kwargs)
+    return view
+
+
+async def _aget_post(pk, prefetch=False):
+    """公開済みの記事を取得する（見つからなければ None）"""
+    queryset = BlogPost.objects.filter(is_published=True)
+    if prefetch:
+        queryset = queryset.prefetch_related("tags", "image_variants")
+    try:
+        return await queryset.aget(pk=pk)
+    except (BlogPost.DoesNotExist, ValueError, TypeError, ValidationError):
+        return None
+
+
+def _not_found():
+    return _json({"detail": "No BlogPost matches the given query."}, status=404)
+
+
+async def _cached(view, handler):
+    """CachedResponseMixin と同じキャッシュ・条件付きGETの処理"""
+    validators, not_modified, cached = await sync_to_async(cache.lookup)(
+        view.request, view.get_cache_scopes(), view.cache_query_params, "json"
+    )
+    if not_modified is not None:
+        return cache.add_validators(not_modified, validators)
+    if cached is not None:
+        data, status = cached
+        response = _json(data, status=status)
+        response["X-Cache"] = "HIT"
+        return cache.add_validators(response, validators)
+
+    try:
+        with routers.read_from_replica(
+            view.replica_reads and routers.can_read_replica(validators.last_modified)
+        ):
+            data = await handler()
+    except APIException as exc:
+        return _json({"detail": exc.detail}, status=exc.status_code)
+    if data is None:
+        return _not_found()
+    await sync_to_async(cache.store)(validators, data, 200)
+    response = _json(data)
+    response["X-Cache"] = "MISS"
+    return cache.add_validators(response, validators)
+
+
+@csrf_exempt
+async def post_list(request):
+    """GET /api/posts/"""
+    if request.method != "GET" or not _wants_json(request):
+        return await _delegate("list", request)
+
+    view = _viewset(request, "list")
+
+    async def handler():
+        context = view.get_serializer_context()
+        queryset = view.filter_queryset(view.get_queryset()).values(*list_row_fields(context))
+        paginator = view.paginator
+        rows = await paginator.apaginate_queryset(queryset, view.request, view)
+        with timing.timed("serialize"):
+            data = await aserialize_list_rows(rows, context)
+        return paginator.get_paginated_response(data).data
+
+    return await _cached(view, handler)
+
+
+@csrf_exempt
+async def post_detail(request, pk):
+    """GET /api/posts/<pk>/"""
+    if request.method != "GET" or not _wants_json(request):
+        return await _delegate("retrieve", request, pk=pk)
+
+    view = _viewset(request, "retrieve", pk=pk)
+
+    async def handler():
+        post = await _aget_post(pk, prefetch=True)
+        if post is None:
+            return None
+        with timing.timed("serialize"):
+            return view.get_serializer(post).data
+
+    return await _cached(view, handler)
+
+
+@session_csrf
+async def post_like(request, pk):
+    """POST / DELETE /api/posts/<pk>/like/"""
+    if request.method not in ("POST", "DELETE"):
+        if request.method in ("OPTIONS", "HEAD"):
+            return await _delegate("like", request, pk=pk)
+        exc = MethodNotAllowed(request.method)
+        return _json({"detail": exc.detail}, status=exc.status_code)
+
+    post = await _aget_post(pk)
+    if post is None:
+        return _not_found()
+
+    # セッションはいいねの追加時だけ作成する（BlogPostViewSet._get_session_key と同じ）
+    if request.method == "POST" and not request.session.session_key:
+        await request.session.acreate()
+    session_key = request.session.session_key
+
+    if request.method == "POST":
+        changed, likes_count = await likes.aadd_like(post, session_key)
+    else:
+        changed, likes_count = await likes.aremove_like(post, session_key)
+    data, status = like_result(request.method, changed, likes_count)
+    return _json(data, status=status)
+
+
+@csrf_exempt
+async def post_like_status(request, pk):
+    """GET /api/posts/<pk>/like_status/"""
+    if request.method != "GET" or not _wants_json(request):
+        return await _delegate("like_status", request, pk=pk)
+
+    post = await _aget_post(pk)
+    if post is None:
+        return _not_found()
+    is_liked, likes_count = await likes.alike_state(post, request.session.session_key)
+    return _json({"is_liked": is_liked, "likes_count": likes_count})
@@ -0,0 +1,244 @@
+# blog/cache.py
+
+"""
+APIレスポンスキャッシュと条件付きGET
+
+一覧・詳細・タグ一覧のレスポンスデータを settings.API_CACHE_ALIAS の
+キャッシュに保存する。キャッシュキーには「スコープ」ごとのバージョンを
+埋め込んでおき、記事・タグ・いいねが変わったときはシグナル
+（blog.signals）から該当スコープのバージョンだけを更新して無効化する。
+
+同じバージョンから ETag / Last-Modified も求めるため、If-None-Match が
+一致すればDBにもシリアライザーにも触れずに 304 を返す。Last-Modified は秒単位で
+同じ秒の中の更新を区別できないため、If-Modified-Since だけでは 304 を返さない。
+
+スコープ:
+    posts           記事系すべて（タグ名の変更時など）
+    posts:list      タグ絞り込みなしの一覧・検索結果
+    tag:<名前>       そのタグで絞り込んだ一覧
+    post:<ID>       記事詳細
+    tags            タグ一覧
+    archive         月別アーカイブ
+
+ヒット数・ミス数は blog.timing と同じくプロセスごとのメモリ上で数える
+（毎リクエストで共有キャッシュに書き込まないため）。複数ワーカー構成では
+stats() はそのワーカーの値になる。
+"""
+
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from . import routers, timing
+
+POSTS = "posts"
+POST_LIST = "posts:list"
+TAGS = "tags"
+ARCHIVE = "archive"
+
+# キャッシュキー・ETag・Last-Modified（UNIX秒）
+Validators = namedtuple("Validators", ["key", "etag", "last_modified"])
+
+_lock = threading.Lock()
+_counts = {"hits": 0, "misses": 0}
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def post_scope(pk):
+    return f"post:{pk}"
+
+
+def tag_scope(name):
+    return f"tag:{name}"
+
+
+def post_scopes(post_id, tag_names):
+    """1件の記事の変更で影響を受けるスコープ"""
+    return [post_scope(post_id), POST_LIST, *(tag_scope(name) for name in tag_names)]
+
+
+def _version_key(scope):
+    digest = hashlib.sha1(scope.encode()).hexdigest()
+    return f"api-cache:version:{digest}"
+
+
+def _versions(scopes):
+    """スコープごとの現在のバージョン（未設定なら新しい値で初期化）"""
+    cache = get_cache()
+    keys = {scope: _version_key(scope) for scope in scopes}
+    stored = cache.get_many(list(keys.values()))
+    versions = []
+    for scope, key in keys.items():
+        version = stored.get(key)
+        if version is None:
+            # 消えたバージョンを 1 から数え直すと古いエントリを拾うため時刻を使う
+            version = time.time_ns()
+            cache.add(key, version, timeout=None)
+            version = cache.get(key, version)
+        versions.append(int(version))
+    return versions
+
+
+def invalidate(*scopes):
+    """スコープのバージョンを更新し、そのスコープのエントリを無効にする"""
+    scopes = {scope for scope in scopes if scope}
+    if not scopes:
+        return
+
+    def bump():
+        version = time.time_ns()
+        get_cache().set_many(
+            {_version_key(scope): version for scope in scopes}, timeout=None
+        )
+
+    # コミット前に無効化すると、並行リクエストが古いデータを再キャッシュしうる
+    transaction.on_commit(bump)
+
+
+def build_validators(request, scopes, params, renderer_format=None):
+    """
+    スコープのバージョン・パス・対象クエリパラメータからキャッシュキーと
+    ETag / Last-Modified を作る
+
+    バージョンは最後に無効化された時刻（ナノ秒）なので、その最大値を秒に
+    切り捨てて Last-Modified とする（条件付きGETの判定には使わない）。
+    ETag は表現（レンダラー）ごとに変える
+    （renderer_format 省略時は DRF のリクエストで選ばれたレンダラー）。
+    """
+    query = sorted(
+        (name, value)
+        for name in params
+        for value in request.GET.getlist(name)
+    )
+    versions = _versions(scopes)
+    parts = [
+        request.scheme,
+        request.get_host(),
+        request.path,
+        repr(query),
+        *(str(version) for version in versions),
+    ]
+    digest = hashlib.sha1("\n".join(parts).encode()).hexdigest()
+    if renderer_format is None:
+        renderer_format = getattr(getattr(request, "accepted_renderer", None), "format", "")
+    etag = '"%s-%s"' % (digest[:32], renderer_format)
+    return Validators(
+        key=f"api-cache:response:{digest}",
+        etag=etag,
+        last_modified=max(versions) // 1_000_000_000 if versions else None,
+    )
+
+
+def record(hit):
+    with _lock:
+        _counts["hits" if hit else "misses"] += 1
+
+
+def stats():
+    """ヒット数・ミス数・ヒット率（このプロセスの値）"""
+    with _lock:
+        hits, misses = _counts["hits"], _counts["misses"]
+    total = hits + misses
+    return {
+        "backend": settings.CACHES[settings.API_CACHE_ALIAS]["BACKEND"],
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else None,
+    }
+
+
+def reset_stats():
+    with _lock:
+        _counts.update(hits=0, misses=0)
+
+
+class CachedResponseMixin:
+    """
+    list / retrieve のレスポンスデータをキャッシュし、条件付きGETに応答するビューセット用Mixin
+
+    ビュー側で get_cache_scopes() を実装する。cache_query_params に
+    含まれないクエリパラメータはキーに入れない（レスポンスに影響しないこと）。
+    """
+
+    cache_query_params = ()
+    # True: キャッシュにないレスポンスを読み取りレプリカから作る（blog.routers）
+    replica_reads = False
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(super().retrieve, request, *args, **kwargs)
+
+    def _cached_response(self, handler, request, *args, **kwargs):
+        validators, not_modified, cached = lookup(
+            request, self.get_cache_scopes(), self.cache_query_params
+        )
+        if not_modified is not None:
+            return add_validators(not_modified, validators)
+
+        if cached is not None:
+            data, status = cached
+            response = Response(data, status=status)
+            response["X-Cache"] = "HIT"
+            return add_validators(response, validators)
+
+        with routers.read_from_replica(
+            self.replica_reads and routers.can_read_replica(validators.last_modified)
+        ):
+            response = handler(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        store(validators, response.data, response.status_code)
+        response["X-Cache"] = "MISS"
+        return add_validators(response, validators)
+
+
+def lookup(request, scopes, params, renderer_format=None):
+    """
+    条件付きGETとキャッシュを確認し、(validators, 304レスポンス, (data, status)) を返す
+
+    304 で応答できる場合は2番目、キャッシュにある場合は3番目が None 以外になる。
+    CachedResponseMixin と非同期ビュー（blog.async_views）で共用する。
+    """
+    validators = build_validators(request, scopes, params, renderer_format)
+    # If-Modified-Since は秒単位のため、同じ秒の中の更新後にも一致してしまう
+    not_modified = get_conditional_response(
+        getattr(request, "_request", request), etag=validators.etag
+    )
+    if not_modified is not None:
+        record(hit=True)
+        return validators, not_modified, None
+
+    with timing.timed("cache"):
+        cached = get_cache().get(validators.key)
+    record(hit=cached is not None)
+    return validators, None, cached
+
+
+def store(validators, data, status):
+    get_cache().set(validators.key, (data, status))
+
+
+def add_validators(response, validators):
+    response["ETag"] = validators.etag
+    if validators.last_modified is not None:
+        response["Last-Modified"] = http_date(validators.last_modified)
+    # ブラウザにはヒューリスティックなキャッシュをさせず、毎回検証させる
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ["Accept"])
+    return response
@@ -0,0 +1,167 @@
+# blog/images.py
+
+"""
+画像最適化（HEIC変換 + リサイズ + 圧縮）
+
+データベースに触れない純粋な関数だけを置き、ワーカーのプロセスプールから
+そのまま呼び出せるようにしている。
+
+巨大な画像でワーカーがメモリを使い切らないよう、デコード前にヘッダーの
+寸法を検査し、JPEGはドラフトモード（1/2〜1/8スケールでのデコード）、
+HEICは十分な大きさの埋め込みサムネイルがあればそれをデコードする。
+PNG・WebP などは縮小してデコードできないため、実際にデコードする画素数の
+上限（MAX_DECODE_PIXELS）を超えたものはデコードせずに拒否する。
+"""
+
+import hashlib
+import io
+import json
+import os
+from collections import namedtuple
+
+import pillow_heif
+from PIL import Image
+
+# ワーカープロセスでも Image.open で HEIC を遅延デコードできるようにする
+pillow_heif.register_heif_opener()
+
+MAX_WIDTH = 1200
+JPEG_QUALITY = 85
+
+# ヘッダー上の総画素数の上限（これを超える画像は開かずに拒否）
+MAX_PIXELS = 200_000_000
+# 実際にデコードする画素数の上限（ドラフト/サムネイルで縮小した後の寸法で判定する）
+# 縮小できない PNG・WebP はこの画素数を丸ごとデコードする。12MP の RGBA で約48MB、
+# RGB への変換と縮小を含めてもワーカー1つあたり100MB程度に収まる
+MAX_DECODE_PIXELS = 12_000_000
+
+# Pillow標準の警告/エラーの閾値も上限に合わせる
+Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+# レスポンシブ画像（srcset）用の幅と形式
+VARIANT_WIDTHS = (320, 640, 1200)
+VARIANT_FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 6},
+    "jpeg": {"format": "JPEG", "quality": JPEG_QUALITY, "optimize": True, "progressive": True},
+}
+
+# process_image の出力が変わる変更をしたら上げる（既存画像が再最適化の対象になる）
+PIPELINE_VERSION = 1
+
+ProcessedImage = namedtuple("ProcessedImage", ["content", "filename", "variants"])
+Variant = namedtuple("Variant", ["width", "height", "format", "content", "filename"])
+
+
+class ImageTooLarge(ValueError):
+    """寸法が上限を超えている画像（デコンプレッション・ボム対策）"""
+
+
+def open_image(source, max_width=MAX_WIDTH):
+    """
+    画像を開き、max_width に縮小するのに必要な解像度だけをデコードできる状態で返す
+
+    source はファイルパスまたはバイト列。寸法が上限を超える場合は ImageTooLarge。
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    # Image.open はヘッダーだけを読む（画素のデコードは load まで遅延される）
+    pil_image = Image.open(source)
+    width, height = pil_image.size
+    if width * height > MAX_PIXELS:
+        raise ImageTooLarge(f"画像が大きすぎます: {width}x{height}")
+
+    if width > max_width:
+        # JPEGは縮小デコード、HEICは十分な大きさのサムネイルに切り替わる
+        target = (max_width, max(1, int(height * max_width / width)))
+        pil_image.draft("RGB", target)
+
+    width, height = pil_image.size
+    if width * height > MAX_DECODE_PIXELS:
+        raise ImageTooLarge(f"デコードする画像が大きすぎます: {width}x{height}")
+    return pil_image
+
+
+def optimized_filename(filename):
+    """最適化後のファイル名（拡張子を .jpg にしたベース名）"""
+    return os.path.splitext(os.path.basename(filename))[0] + ".jpg"
+
+
+def _to_rgb(pil_image):
+    """JPEG/WebPで保存できるモードに揃える"""
+    if pil_image.mode in ("RGBA", "P"):
+        return pil_image.convert("RGB")
+    return pil_image
+
+
+def _resize_to_width(pil_image, width):
+    """幅が width を超える場合だけ縦横比を保って縮小する"""
+    if pil_image.width <= width:
+        return pil_image
+    ratio = width / pil_image.width
+    new_height = int(pil_image.height * ratio)
+    return pil_image.resize((width, new_height), Image.Resampling.LANCZOS)
+
+
+def _encode(pil_image, **save_options):
+    output = io.BytesIO()
+    pil_image.save(output, **save_options)
+    return output.getvalue()
+
+
+def variant_widths(source_width):
+    """元画像の幅から生成するバリアントの幅を決める（拡大はしない）"""
+    widths = [width for width in VARIANT_WIDTHS if width < source_width]
+    widths.append(min(source_width, VARIANT_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def build_variants(pil_image, filename):
+    """幅ごと・形式ごとのバリアントを大きい順に縮小しながら生成する"""
+    base = os.path.splitext(os.path.basename(filename))[0]
+    variants = []
+    current = pil_image
+    for width in sorted(variant_widths(pil_image.width), reverse=True):
+        current = _resize_to_width(current, width)
+        for name, options in VARIANT_FORMATS.items():
+            ext = "jpg" if name == "jpeg" else name
+            variants.append(
+                Variant(
+                    width=current.width,
+                    height=current.height,
+                    format=name,
+                    content=_encode(current, **options),
+                    filename=f"{base}_{current.width}w.{ext}",
+                )
+            )
+    return variants
+
+
+def settings_fingerprint():
+    """
+    最適化の設定（幅・画質・バリアント）の指紋
+
+    最適化した画像には処理時の指紋を記録しておき（BlogPost.image_fingerprint）、
+    設定を変えたときに reoptimize_images が処理し直す画像を見分ける。
+    """
+    raw = json.dumps(
+        [PIPELINE_VERSION, MAX_WIDTH, JPEG_QUALITY, VARIANT_WIDTHS, VARIANT_FORMATS],
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def process_image(source, filename, max_width=MAX_WIDTH):
+    """
+    画像を1回だけデコードし、最適化済みの本体とレスポンシブ用バリアントを生成する
+
+    source はファイルパスまたはバイト列。プロセスプールから呼ぶため、
+    戻り値は pickle 可能な ProcessedImage。
+    """
+    pil_image = _resize_to_width(_to_rgb(open_image(source, max_width)), max_width)
+    content = _encode(pil_image, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+    return ProcessedImage(
+        content=content,
+        filename=optimized_filename(filename),
+        variants=build_variants(pil_image, filename),
+    )
@@ -0,0 +1,244 @@
+# blog/jobs.py
+
+"""
+画像処理ジョブのキュー操作
+
+ジョブは ImageJob テーブルに積み、process_image_jobs コマンドのワーカーが
+取り出して処理する。データベース操作はワーカーの親プロセスだけが行い、
+重い画像処理（blog.images.process_image）だけをプロセスプールに渡す。
+"""
+
+import logging
+import traceback
+from collections import defaultdict
+from concurrent.futures import Future, as_completed
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cache, snapshots, timing
+from .images import ImageTooLarge, process_image, settings_fingerprint
+from .models import BlogPost, ImageJob, ImageStatus, ImageVariant
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+
+
+def enqueue_image_job(post, run_now=False):
+    """記事の現在の画像を最適化するジョブを登録する（run_now ならその場で処理）"""
+    job = ImageJob.objects.create(blog_post=post, source_name=post.image.name)
+    if run_now:
+        run_jobs(_mark_running([job]))
+    return job
+
+
+def start_reoptimize_jobs(posts):
+    """
+    既存の画像 [(記事ID, 画像名)] を処理し直すジョブを処理中の状態で登録する
+
+    reoptimize_images がその場で run_jobs に渡すため、待機中にはせず
+    ワーカー（claim_jobs）に取られないようにする。一括再処理のジョブは
+    失敗・中断しても待機中に戻さない（再実行した reoptimize_images が処理し直す）。
+    """
+    now = timezone.now()
+    return ImageJob.objects.bulk_create(
+        [
+            ImageJob(
+                blog_post_id=pk, source_name=name, status=ImageJob.Status.RUNNING,
+                attempts=1, is_backfill=True, started_at=now,
+            )
+            for pk, name in posts
+        ]
+    )
+
+
+def _mark_running(jobs):
+    """ジョブを処理中にして試行回数を加算する"""
+    now = timezone.now()
+    ImageJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+        status=ImageJob.Status.RUNNING, started_at=now, attempts=F("attempts") + 1
+    )
+    for job in jobs:
+        job.status = ImageJob.Status.RUNNING
+        job.started_at = now
+        job.attempts += 1
+    return jobs
+
+
+def claim_jobs(limit):
+    """待機中のジョブを古い順に最大 limit 件取り出す（他のワーカーと重複しない）"""
+    with transaction.atomic():
+        jobs = list(
+            ImageJob.objects.select_for_update(skip_locked=True)
+            .filter(status=ImageJob.Status.PENDING)
+            .order_by("created_at")[:limit]
+        )
+        if jobs:
+            _mark_running(jobs)
+    return jobs
+
+
+def _read_source(storage, name):
+    """
+    画像処理に渡す元画像を返す
+
+    ローカルのストレージならファイルパスを渡し、ワーカー側で必要な部分だけを
+    読ませる（バイト列をメモリに載せてプロセス間でコピーしない）。
+    """
+    try:
+        return storage.path(name)
+    except NotImplementedError:
+        with storage.open(name, "rb") as source:
+            return source.read()
+
+
+def _submit(executor, source, filename):
+    """プロセスプールに画像処理を投げる（executor が None なら同じプロセスで実行）"""
+    if executor is not None:
+        return executor.submit(process_image, source, filename)
+
+    future = Future()
+    try:
+        with timing.timed("image"):
+            future.set_result(process_image(source, filename))
+    except Exception as exc:
+        future.set_exception(exc)
+    return future
+
+
+def run_jobs(jobs, executor=None):
+    """
+    ジョブを処理し、(完了件数, 失敗件数) を返す
+
+    元画像の名前が同じジョブ（内容のハッシュで名前が付くため同じ内容）は
+    1回だけ処理し、その結果を全員に反映する。
+    """
+    storage = BlogPost._meta.get_field("image").storage
+    by_source = defaultdict(list)
+    for job in jobs:
+        by_source[job.source_name].append(job)
+
+    futures = {}
+    done = failed = 0
+
+    for source_name, group in by_source.items():
+        try:
+            source = _read_source(storage, source_name)
+        except Exception as exc:
+            for job in group:
+                fail_job(job, exc)
+            failed += len(group)
+            continue
+        futures[_submit(executor, source, source_name)] = group
+
+    for future in as_completed(futures):
+        for job in futures[future]:
+            try:
+                complete_job(job, future.result())
+            except Exception as exc:
+                fail_job(job, exc)
+                failed += 1
+            else:
+                done += 1
+
+    return done, failed
+
+
+def complete_job(job, processed):
+    """最適化済みの画像とバリアントを保存し、記事の画像を差し替える"""
+    field = BlogPost._meta.get_field("image")
+    variant_field = ImageVariant._meta.get_field("image")
+    post = BlogPost(pk=job.blog_post_id)
+
+    new_name = field.storage.save(
+        field.generate_filename(post, processed.filename), ContentFile(processed.content)
+    )
+    variants = [
+        ImageVariant(
+            blog_post_id=job.blog_post_id,
+            image=variant_field.storage.save(
+                variant_field.generate_filename(None, variant.filename),
+                ContentFile(variant.content),
+            ),
+            width=variant.width,
+            height=variant.height,
+            format=variant.format,
+        )
+        for variant in processed.variants
+    ]
+
+    with transaction.atomic():
+        # 処理中に画像が差し替えられていた場合は何もしない
+        swapped = BlogPost.objects.filter(
+            pk=job.blog_post_id, image=job.source_name
+        ).update(
+            image=new_name, image_status=ImageStatus.READY, image_fingerprint=settings_fingerprint()
+        )
+        if swapped:
+            # 古いバリアントのファイルは django_cleanup が削除する
+            ImageVariant.objects.filter(blog_post_id=job.blog_post_id).delete()
+            ImageVariant.objects.bulk_create(variants)
+        job.status = ImageJob.Status.DONE
+        job.error = ""
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+
+    if swapped:
+        tag_names = BlogPost.tags.through.objects.filter(
+            blogpost_id=job.blog_post_id
+        ).values_list("tag__name", flat=True)
+        cache.invalidate(*cache.post_scopes(job.blog_post_id, tag_names))
+        snapshots.schedule(posts=[job.blog_post_id])
+        # 最適化の結果が元画像と同じ内容（同じ名前）でも、保存で増えた参照を1つ解放する
+        field.storage.delete(job.source_name)
+    else:
+        field.storage.delete(new_name)
+        for variant in variants:
+            variant_field.storage.delete(variant.image.name)
+
+
+def fail_job(job, exc):
+    """失敗をジョブに記録する（上限未満なら再試行待ちに戻す）"""
+    job.error = "".join(traceback.format_exception(exc))
+    job.finished_at = timezone.now()
+    # 大きすぎる画像は何度試しても同じなので再試行しない
+    if job.attempts >= MAX_ATTEMPTS or job.is_backfill or isinstance(exc, ImageTooLarge):
+        job.status = ImageJob.Status.FAILED
+        # 再最適化（reoptimize_images）の失敗では、表示中の画像を失敗扱いにしない
+        BlogPost.objects.filter(
+            pk=job.blog_post_id, image=job.source_name, image_status=ImageStatus.PROCESSING
+        ).update(image_status=ImageStatus.FAILED)
+    else:
+        job.status = ImageJob.Status.PENDING
+    job.save(update_fields=["status", "error", "finished_at"])
+    logger.warning("画像処理ジョブ %s が失敗しました: %s", job.pk, exc)
+
+
+def retry_failed_jobs():
+    """失敗したジョブを再試行待ちに戻し、件数を返す"""
+    failed = ImageJob.objects.filter(status=ImageJob.Status.FAILED, is_backfill=False)
+    BlogPost.objects.filter(
+        image_jobs__in=failed, image_status=ImageStatus.FAILED
+    ).update(image_status=ImageStatus.PROCESSING)
+    return failed.update(status=ImageJob.Status.PENDING, attempts=0, error="")
+
+
+def requeue_stale_jobs(minutes):
+    """
+    ワーカー停止などで処理中のまま残ったジョブを再試行待ちに戻す
+
+    中断された reoptimize_images のジョブは、再実行で同じ記事を処理し直すため
+    待機中に戻さず失敗として閉じる（戻すと同じ画像を2回処理する）。
+    """
+    threshold = timezone.now() - timedelta(minutes=minutes)
+    stale = ImageJob.objects.filter(status=ImageJob.Status.RUNNING, started_at__lt=threshold)
+    stale.filter(is_backfill=True).update(
+        status=ImageJob.Status.FAILED,
+        error="中断されました（reoptimize_images の再実行で処理し直します）",
+        finished_at=timezone.now(),
+    )
+    return stale.filter(is_backfill=False).update(status=ImageJob.Status.PENDING)
@@ -0,0 +1,235 @@
+# blog/likes.py
+
+"""
+いいねの追加・解除
+
+通常は1リクエスト1トランザクションで Like を作成/削除し、likes_count を
+F() で増減する。settings.LIKE_WRITE_BEHIND が True の場合は LikeEvent に
+操作を追記するだけで応答し（いいね数は未反映分を足した楽観値）、
+flush_like_events コマンドがまとめて Like テーブルへ反映する。
+"""
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from . import cache, snapshots, trending
+from .models import BlogPost, Like, LikeEvent
+
+# フラッシュ時に1回の DELETE にまとめる (session_key, blog_post) の数
+DELETE_CHUNK_SIZE = 500
+
+
+def actual_likes_count():
+    """記事ごとの Like の実件数（BlogPost のクエリセットで使うサブクエリ式）"""
+    return Coalesce(
+        Subquery(
+            Like.objects.filter(blog_post=OuterRef("pk"))
+            .order_by()
+            .values("blog_post")
+            .annotate(c=Count("pk"))
+            .values("c")
+        ),
+        0,
+    )
+
+
+def pending_state(post_ids, session_key=None):
+    """
+    未反映の LikeEvent から、記事ごとのいいね数の増減と
+    そのセッションの最新の操作（True: いいね / False: 解除）を求める
+
+    増減は SQL で合計し、最新の操作はそのセッションの行だけを
+    (セッション, 記事, 通し番号) の一意インデックスで引く。
+    """
+    events = LikeEvent.objects.filter(blog_post_id__in=post_ids).order_by()
+    deltas = dict(
+        events.values("blog_post_id")
+        .annotate(
+            delta=Sum(Case(When(action=LikeEvent.Action.ADD, then=Value(1)), default=Value(-1)))
+        )
+        .values_list("blog_post_id", "delta")
+    )
+    latest = {}
+    if session_key is not None:
+        rows = events.filter(session_key=session_key).order_by("sequence")
+        for post_id, action in rows.values_list("blog_post_id", "action"):
+            latest[post_id] = action == LikeEvent.Action.ADD
+    return deltas, latest
+
+
+def _last_sequence(post, session_key):
+    """未反映の操作の最後の通し番号（なければ 0）"""
+    return (
+        LikeEvent.objects.filter(session_key=session_key, blog_post=post)
+        .order_by("-sequence")
+        .values_list("sequence", flat=True)
+        .first()
+        or 0
+    )
+
+
+def like_state(post, session_key):
+    """(いいね済みか, いいね数) を返す（ライトビハインド時は未反映分を含む）"""
+    is_liked = session_key is not None and Like.objects.filter(
+        session_key=session_key, blog_post=post
+    ).exists()
+    if not settings.LIKE_WRITE_BEHIND:
+        return is_liked, post.likes_count
+
+    deltas, latest = pending_state([post.pk], session_key)
+    is_liked = latest.get(post.pk, is_liked)
+    return is_liked, max(post.likes_count + deltas.get(post.pk, 0), 0)
+
+
+async def alike_state(post, session_key):
+    """like_state の非同期版"""
+    is_liked = session_key is not None and await Like.objects.filter(
+        session_key=session_key, blog_post=post
+    ).aexists()
+    if not settings.LIKE_WRITE_BEHIND:
+        return is_liked, post.likes_count
+
+    deltas, latest = await sync_to_async(pending_state)([post.pk], session_key)
+    is_liked = latest.get(post.pk, is_liked)
+    return is_liked, max(post.likes_count + deltas.get(post.pk, 0), 0)
+
+
+def add_like(post, session_key):
+    """いいねを追加し、(追加されたか, いいね数) を返す"""
+    if settings.LIKE_WRITE_BEHIND:
+        return _append_event(post, session_key, LikeEvent.Action.ADD)
+
+    with transaction.atomic():
+        like, created = Like.objects.get_or_create(session_key=session_key, blog_post=post)
+        if created:
+            BlogPost.objects.filter(pk=post.pk).update(
+                likes_count=F("likes_count") + 1,
+                trending_score=F("trending_score") + trending.like_weight(like.created_at),
+            )
+    post.refresh_from_db(fields=["likes_count"])
+    return created, post.likes_count
+
+
+def remove_like(post, session_key):
+    """いいねを解除し、(解除されたか, いいね数) を返す"""
+    if settings.LIKE_WRITE_BEHIND:
+        return _append_event(post, session_key, LikeEvent.Action.REMOVE)
+
+    with transaction.atomic():
+        # トレンドスコアから引く重みのため、削除するいいねの日時を先に読む
+        like = Like.objects.filter(session_key=session_key, blog_post=post).first()
+        if like is not None:
+            like.delete()
+            BlogPost.objects.filter(pk=post.pk, likes_count__gt=0).update(
+                likes_count=F("likes_count") - 1,
+                trending_score=Greatest(
+                    F("trending_score") - trending.like_weight(like.created_at), Value(0.0)
+                ),
+            )
+    post.refresh_from_db(fields=["likes_count"])
+    return like is not None, post.likes_count
+
+
+def _append_event(post, session_key, action):
+    """
+    状態が変わる場合だけ LikeEvent を追記し、楽観的ないいね数を返す
+
+    通し番号を状態より先に読み、次の番号で追記する。同じセッションの
+    同時のリクエストが先に追記していれば一意制約で失敗するので、
+    二重に数えずにその時点の状態を返す。
+    """
+    if session_key is None:
+        return False, like_state(post, session_key)[1]
+    sequence = _last_sequence(post, session_key) + 1
+    is_liked, likes_count = like_state(post, session_key)
+    wanted = action == LikeEvent.Action.ADD
+    if is_liked == wanted:
+        return False, likes_count
+
+    try:
+        with transaction.atomic():
+            LikeEvent.objects.create(
+                blog_post=post, session_key=session_key, action=action, sequence=sequence
+            )
+    except IntegrityError:
+        return False, like_state(post, session_key)[1]
+    return True, max(likes_count + (1 if wanted else -1), 0)
+
+
+async def aadd_like(post, session_key):
+    """add_like の非同期版（同期方式のトランザクションはスレッドで実行する）"""
+    if settings.LIKE_WRITE_BEHIND:
+        return await _aappend_event(post, session_key, LikeEvent.Action.ADD)
+    return await sync_to_async(add_like)(post, session_key)
+
+
+async def aremove_like(post, session_key):
+    """remove_like の非同期版"""
+    if settings.LIKE_WRITE_BEHIND:
+        return await _aappend_event(post, session_key, LikeEvent.Action.REMOVE)
+    return await sync_to_async(remove_like)(post, session_key)
+
+
+async def _aappend_event(post, session_key, action):
+    """_append_event の非同期版（一意制約の失敗を扱うためトランザクションはスレッドで実行する）"""
+    return await sync_to_async(_append_event)(post, session_key, action)
+
+
+def flush_like_events(batch_size=1000):
+    """
+    未反映の LikeEvent を古い順に最大 batch_size 件 Like テーブルへ反映する
+
+    同じ (セッション, 記事) の操作は最後のものだけを適用し、追加は
+    bulk_create(ignore_conflicts=True)、解除はまとめた DELETE で行う。
+    反映した件数を返す。
+    """
+    with transaction.atomic():
+        events = list(
+            LikeEvent.objects.select_for_update(skip_locked=True).order_by("id")[:batch_size]
+        )
+        if not events:
+            return 0
+
+        final = {}
+        for event in events:
+            final[(event.session_key, event.blog_post_id)] = event.action
+
+        Like.objects.bulk_create(
+            [
+                Like(session_key=session_key, blog_post_id=post_id)
+                for (session_key, post_id), action in final.items()
+                if action == LikeEvent.Action.ADD
+            ],
+            ignore_conflicts=True,
+            batch_size=DELETE_CHUNK_SIZE,
+        )
+
+        removals = [key for key, action in final.items() if action == LikeEvent.Action.REMOVE]
+        for start in range(0, len(removals), DELETE_CHUNK_SIZE):
+            condition = Q()
+            for session_key, post_id in removals[start:start + DELETE_CHUNK_SIZE]:
+                condition |= Q(session_key=session_key, blog_post_id=post_id)
+            # Like の post_delete は1行ごとにタグ名の取得と無効化を行うため、シグナルを送らずに消す
+            # （無効化は影響した記事ぶんを下でまとめて行う）
+            removed = Like.objects.filter(condition)
+            removed._raw_delete(removed.db)
+
+        # 競合で無視された追加もあるため、影響した記事は実件数で数え直す
+        affected = {post_id for _, post_id in final}
+        BlogPost.objects.filter(pk__in=affected).update(likes_count=actual_likes_count())
+        trending.refresh_scores(affected)
+        LikeEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+
+        tag_names = BlogPost.tags.through.objects.filter(
+            blogpost_id__in=affected
+        ).values_list("tag__name", flat=True)
+        cache.invalidate(
+            cache.POST_LIST,
+            *(cache.post_scope(post_id) for post_id in affected),
+            *(cache.tag_scope(name) for name in set(tag_names)),
+        )
+        snapshots.schedule(likes=affected)
+    return len(events)
@@ -0,0 +1,176 @@
+# blog/management/commands/benchmark_concurrency.py
+
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from blog.models import BlogPost
+from blog.seed import delete_sessions
+
+# 方式ごとの URLconf（設定の ASYNC_API_VIEWS に関係なく切り替える）
+URLCONFS = {"wsgi": "config.sync_urls", "asgi": "config.async_urls"}
+
+
+class Command(BaseCommand):
+    """
+    同時接続数を変えながら、WSGI（同期ビュー・スレッド）と ASGI（非同期ビュー・
+    イベントループ）のスループットとレイテンシを比べる
+
+    サーバーは起動せず、Django のリクエストハンドラーをプロセス内で直接呼ぶ。
+    WSGI は同時接続数ぶんのスレッド、ASGI は同時接続数ぶんのコルーチンで
+    リクエストを送る（ネットワークとサーバー実装の差は含まない）。
+
+    like はリクエストごとに新しいセッションでいいねするため、計測後に
+    そのセッション・いいね・未反映の操作を削除し、いいね数とトレンドスコアを数え直す。
+    """
+
+    help = "WSGI（同期）と ASGI（非同期ビュー）を同時接続数ごとに比較します"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", default="10,50,200", help="同時接続数（カンマ区切り）",
+        )
+        parser.add_argument("--requests", type=int, default=500, help="条件ごとのリクエスト数")
+        parser.add_argument(
+            "--endpoint", action="append", dest="endpoints",
+            choices=["list", "detail", "like_status", "like"],
+            help="計測するエンドポイント（複数指定可、既定はすべて）",
+        )
+        parser.add_argument(
+            "--cached", action="store_true",
+            help="APIレスポンスキャッシュを有効にしたまま計測する（既定は無効化）",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options["concurrency"].split(",")]
+        except ValueError:
+            raise CommandError("--concurrency は数値のカンマ区切りで指定してください")
+
+        post = BlogPost.objects.filter(is_published=True).order_by("-created_at").first()
+        if post is None:
+            raise CommandError("公開済みの記事がありません（seed_blog で作成できます）")
+
+        urls = {
+            "list": ("get", "/api/posts/"),
+            "detail": ("get", f"/api/posts/{post.pk}/"),
+            "like_status": ("get", f"/api/posts/{post.pk}/like_status/"),
+            "like": ("post", f"/api/posts/{post.pk}/like/"),
+        }
+        endpoints = options["endpoints"] or list(urls)
+        total = options["requests"]
+        host = next(
+            (h for h in settings.ALLOWED_HOSTS if h != "*" and not h.startswith(".")),
+            "localhost",
+        )
+
+        caches = dict(settings.CACHES)
+        if not options["cached"]:
+            caches[settings.API_CACHE_ALIAS] = {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+
+        self.stdout.write(
+            f"{'エンドポイント':<14}{'方式':<6}{'同時接続':>8}{'req/s':>10}"
+            f"{'p50(ms)':>10}{'p95(ms)':>10}{'失敗':>6}"
+        )
+        self.session_keys = set()
+        with override_settings(CACHES=caches):
+            try:
+                for name in endpoints:
+                    method, url = urls[name]
+                    for level in levels:
+                        for mode in ("wsgi", "asgi"):
+                            with override_settings(ROOT_URLCONF=URLCONFS[mode]):
+                                if mode == "wsgi":
+                                    elapsed, latencies, errors = self._run_wsgi(
+                                        method, url, total, level, host
+                                    )
+                                else:
+                                    elapsed, latencies, errors = asyncio.run(
+                                        self._run_asgi(method, url, total, level, host)
+                                    )
+                            self._report(name, mode, level, elapsed, latencies, errors)
+            finally:
+                self._cleanup()
+
+    def _cleanup(self):
+        """計測で作ったセッション・いいねを消し、記事のいいね数とトレンドスコアを戻す"""
+        if self.session_keys:
+            delete_sessions(self.session_keys)
+            self.stdout.write(f"計測で作成したセッション {len(self.session_keys)} 件といいねを削除しました")
+
+    def _remember_session(self, client):
+        cookie = client.cookies.get(settings.SESSION_COOKIE_NAME)
+        if cookie is not None and cookie.value:
+            self.session_keys.add(cookie.value)
+
+    def _split(self, total, concurrency):
+        per_worker = [total // concurrency] * concurrency
+        for i in range(total % concurrency):
+            per_worker[i] += 1
+        return [count for count in per_worker if count]
+
+    def _run_wsgi(self, method, url, total, concurrency, host):
+        def worker(count):
+            client = Client(HTTP_HOST=host, raise_request_exception=False)
+            latencies, errors = [], 0
+            try:
+                for _ in range(count):
+                    client.cookies.clear()
+                    start = time.perf_counter()
+                    response = getattr(client, method)(url, secure=True)
+                    self._remember_session(client)
+                    if response.status_code < 400:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    else:
+                        errors += 1
+            finally:
+                connections.close_all()
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(worker, self._split(total, concurrency)))
+        return self._collect(time.perf_counter() - start, results)
+
+    async def _run_asgi(self, method, url, total, concurrency, host):
+        async def worker(count):
+            client = AsyncClient(HTTP_HOST=host, raise_request_exception=False)
+            latencies, errors = [], 0
+            for _ in range(count):
+                client.cookies.clear()
+                start = time.perf_counter()
+                response = await getattr(client, method)(url, secure=True)
+                self._remember_session(client)
+                if response.status_code < 400:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors += 1
+            return latencies, errors
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(worker(count) for count in self._split(total, concurrency))
+        )
+        return self._collect(time.perf_counter() - start, results)
+
+    def _collect(self, elapsed, results):
+        latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+        errors = sum(worker_errors for _, worker_errors in results)
+        return elapsed, latencies, errors
+
+    def _report(self, name, mode, level, elapsed, latencies, errors):
+        ok = len(latencies)
+        p50 = statistics.median(latencies) if ok else 0
+        p95 = statistics.quantiles(latencies, n=20)[18] if ok > 1 else p50
+        self.stdout.write(
+            f"{name:<14}{mode:<6}{level:>8}{ok / elapsed:>10.1f}{p50:>10.1f}{p95:>10.1f}{errors:>6}"
+        )
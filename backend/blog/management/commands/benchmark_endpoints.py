@@ -0,0 +1,136 @@
+# blog/management/commands/benchmark_endpoints.py
+
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from blog.models import BlogPost, Tag
+from blog.seed import delete_posts, delete_sessions, seed_corpus
+
+
+class Command(BaseCommand):
+    """
+    データ量ごとに主要なAPIのレイテンシとクエリ数を計測する
+
+    記事が足りない分は公開記事として追加するため、DEBUG でないデータベースでは
+    --allow-seed を指定したときだけ作成する。追加した記事と、計測のリクエストが
+    作ったセッション・いいねは終了時に削除する（--keep-seeded で記事を残す）。
+    """
+
+    help = "記事一覧・詳細・タグ絞り込み・検索・いいね・いいね状態のAPIを計測します"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="100,1000,10000",
+            help="計測する記事数（カンマ区切り、足りない分はベンチマーク用記事を追加）",
+        )
+        parser.add_argument("--repeat", type=int, default=50, help="エンドポイントごとのリクエスト数")
+        parser.add_argument("--tags", type=int, default=50, help="ベンチマーク用タグの数")
+        parser.add_argument("--seed", type=int, default=0, help="データ生成の乱数シード")
+        parser.add_argument(
+            "--cached", action="store_true",
+            help="APIレスポンスキャッシュを有効にしたまま計測する（既定は無効化して素のコストを測る）",
+        )
+        parser.add_argument(
+            "--allow-seed", action="store_true",
+            help="DEBUG でなくても足りない記事を公開記事として作成する",
+        )
+        parser.add_argument("--keep-seeded", action="store_true", help="作成した記事を終了時に削除しない")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted(int(size) for size in options["sizes"].split(","))
+        except ValueError:
+            raise CommandError("--sizes は記事数のカンマ区切りで指定してください")
+
+        caches = dict(settings.CACHES)
+        if not options["cached"]:
+            caches[settings.API_CACHE_ALIAS] = {
+                "BACKEND": "django.core.cache.backends.dummy.DummyCache"
+            }
+
+        host = next(
+            (h for h in settings.ALLOWED_HOSTS if h != "*" and not h.startswith(".")),
+            "localhost",
+        )
+        self.client = Client(HTTP_HOST=host)
+
+        self.allow_seed = options["allow_seed"] or settings.DEBUG
+        self.seeded, self.session_keys = [], set()
+        try:
+            with override_settings(CACHES=caches):
+                for size in sizes:
+                    self._ensure_posts(size, options["tags"], options["seed"] + size)
+                    self.stdout.write(f"\n記事数: {BlogPost.objects.count()}")
+                    self.stdout.write(
+                        f"{'エンドポイント':<14}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'クエリ':>8}"
+                    )
+                    for label, method, url in self._endpoints():
+                        timings, queries = self._measure(method, url, options["repeat"])
+                        quantiles = (
+                            statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+                        )
+                        self.stdout.write(
+                            f"{label:<14}{statistics.median(timings):>10.1f}"
+                            f"{quantiles[94]:>10.1f}{quantiles[98]:>10.1f}{max(queries):>8}"
+                        )
+        finally:
+            self._cleanup(options["keep_seeded"])
+
+    def _ensure_posts(self, target, tags, seed):
+        missing = target - BlogPost.objects.count()
+        if missing <= 0:
+            return
+        if not self.allow_seed:
+            raise CommandError(
+                f"記事が {missing} 件足りません。このデータベースに公開記事を作成してよければ"
+                " --allow-seed を指定してください"
+            )
+        self.stdout.write(f"ベンチマーク用記事を {missing} 件作成します...")
+        self.seeded += seed_corpus(missing, tags=tags, seed=seed)
+
+    def _cleanup(self, keep_seeded):
+        """計測で作ったセッション・いいねと、作成した記事を削除する"""
+        delete_sessions(self.session_keys)
+        if self.seeded and not keep_seeded:
+            self.stdout.write(f"ベンチマーク用記事 {len(self.seeded)} 件を削除します...")
+            delete_posts(self.seeded)
+
+    def _endpoints(self):
+        post = BlogPost.objects.filter(is_published=True).order_by("-likes_count").first()
+        tag = Tag.objects.order_by("-published_post_count").first()
+        if post is None:
+            raise CommandError("公開済みの記事がありません")
+        endpoints = [
+            ("list", "get", "/api/posts/"),
+            ("list (page 5)", "get", "/api/posts/?page=5"),
+            ("detail", "get", f"/api/posts/{post.pk}/"),
+            ("search", "get", "/api/posts/?search=京都"),
+            ("like_status", "get", f"/api/posts/{post.pk}/like_status/"),
+            ("like", "post", f"/api/posts/{post.pk}/like/"),
+        ]
+        if tag is not None:
+            endpoints.insert(3, ("tag", "get", f"/api/posts/?tag={tag.name}"))
+        return endpoints
+
+    def _measure(self, method, url, repeat):
+        """毎回新しい訪問者としてリクエストし、(レイテンシ[ms], クエリ数) の一覧を返す"""
+        timings, queries = [], []
+        for _ in range(repeat):
+            self.client.cookies.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(self.client, method)(url, secure=True)
+                timings.append((time.perf_counter() - start) * 1000)
+            cookie = self.client.cookies.get(settings.SESSION_COOKIE_NAME)
+            if cookie is not None and cookie.value:
+                self.session_keys.add(cookie.value)
+            if response.status_code >= 400:
+                raise CommandError(f"{method.upper()} {url} が {response.status_code} を返しました")
+            queries.append(len(captured))
+        return timings, queries
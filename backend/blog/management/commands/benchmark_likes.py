@@ -0,0 +1,100 @@
+# blog/management/commands/benchmark_likes.py
+
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from blog.likes import flush_like_events
+from blog.models import BlogPost, Like
+
+
+class Command(BaseCommand):
+    """1つの記事にいいねが殺到した状況で、同期方式とライトビハインド方式のスループットを比べる"""
+
+    help = "いいねAPIの負荷テスト（同期トランザクション方式 vs ライトビハインド方式）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="方式ごとのいいね回数")
+        parser.add_argument("--concurrency", type=int, default=16, help="同時接続数（スレッド数）")
+        parser.add_argument(
+            "--mode", choices=["sync", "write-behind", "both"], default="both",
+            help="計測する方式",
+        )
+
+    def handle(self, *args, **options):
+        modes = ["sync", "write-behind"] if options["mode"] == "both" else [options["mode"]]
+        author, _ = User.objects.get_or_create(username="benchmark")
+
+        self.stdout.write(
+            f"{'方式':<14}{'件数':>8}{'失敗':>6}{'req/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'反映後':>8}"
+        )
+        for mode in modes:
+            post = BlogPost.objects.create(
+                author=author, title=f"benchmark likes ({mode})", description="benchmark"
+            )
+            try:
+                with override_settings(LIKE_WRITE_BEHIND=mode == "write-behind"):
+                    elapsed, latencies, errors = self._run(
+                        post, options["requests"], options["concurrency"]
+                    )
+                while flush_like_events():
+                    pass
+                post.refresh_from_db(fields=["likes_count"])
+
+                ok = len(latencies)
+                quantiles = statistics.quantiles(latencies, n=20) if ok > 1 else [0] * 19
+                self.stdout.write(
+                    f"{mode:<14}{ok:>8}{errors:>6}{ok / elapsed:>10.1f}"
+                    f"{statistics.median(latencies) if ok else 0:>10.1f}{quantiles[18]:>10.1f}"
+                    f"{post.likes_count:>8}"
+                )
+            finally:
+                Session.objects.filter(
+                    session_key__in=Like.objects.filter(blog_post=post).values("session_key")
+                ).delete()
+                post.delete()
+
+    def _run(self, post, requests, concurrency):
+        """concurrency 本のスレッドから、毎回新しい訪問者としていいねを送る"""
+        url = f"/api/posts/{post.pk}/like/"
+        host = next(
+            (h for h in settings.ALLOWED_HOSTS if h != "*" and not h.startswith(".")),
+            "localhost",
+        )
+        per_worker = [requests // concurrency] * concurrency
+        for i in range(requests % concurrency):
+            per_worker[i] += 1
+
+        def worker(count):
+            client = Client(HTTP_HOST=host)
+            latencies = []
+            errors = 0
+            try:
+                for _ in range(count):
+                    client.cookies.clear()
+                    start = time.perf_counter()
+                    response = client.post(url, secure=True)
+                    if response.status_code == 201:
+                        latencies.append((time.perf_counter() - start) * 1000)
+                    else:
+                        errors += 1
+            finally:
+                connections.close_all()
+            return latencies, errors
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            results = list(executor.map(worker, per_worker))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency for worker_latencies, _ in results for latency in worker_latencies]
+        errors = sum(worker_errors for _, worker_errors in results)
+        return elapsed, latencies, errors
@@ -0,0 +1,86 @@
+# blog/management/commands/benchmark_list_serialization.py
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from blog.models import BlogPost
+from blog.serializers import BlogPostListSerializer, list_row_fields, serialize_list_rows
+
+
+class Command(BaseCommand):
+    """記事一覧1ページ分のシリアライズ時間を ModelSerializer と values() 高速パスで比べる"""
+
+    help = "一覧シリアライズの計測（BlogPostListSerializer vs serialize_list_rows）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--page-size", type=int, default=9, help="1ページの記事数")
+        parser.add_argument("--pages", type=int, default=10, help="計測するページ数")
+        parser.add_argument("--repeat", type=int, default=20, help="ページごとの試行回数")
+        parser.add_argument("--q", default="", help="検索語（ハイライト込みで計測する場合）")
+
+    def handle(self, *args, **options):
+        page_size = options["page_size"]
+        request = Request(APIRequestFactory().get("/api/posts/"))
+        context = {"request": request, "session_key": None, "search_query": options["q"]}
+
+        queryset = BlogPost.objects.filter(is_published=True).order_by("-created_at", "-id")
+        ids = list(queryset.values_list("id", flat=True)[: page_size * options["pages"]])
+        if not ids:
+            raise CommandError("公開済みの記事がありません")
+        pages = [ids[i:i + page_size] for i in range(0, len(ids), page_size)]
+
+        serializer_ms, fast_ms = [], []
+        serializer_queries = fast_queries = 0
+        for page_ids in pages:
+            page = queryset.filter(pk__in=page_ids)
+
+            def model_serializer():
+                posts = page.prefetch_related("tags", "image_variants")
+                return BlogPostListSerializer(posts, many=True, context=context).data
+
+            def fast_path():
+                return serialize_list_rows(page.values(*list_row_fields(context)), context)
+
+            expected, queries = self._run_once(model_serializer)
+            serializer_queries = max(serializer_queries, queries)
+            actual, queries = self._run_once(fast_path)
+            fast_queries = max(fast_queries, queries)
+            if [dict(item) for item in expected] != actual:
+                raise CommandError(f"出力が一致しません（記事ID: {page_ids}）")
+
+            serializer_ms.append(self._measure(model_serializer, options["repeat"]))
+            fast_ms.append(self._measure(fast_path, options["repeat"]))
+
+        self.stdout.write(f"ページ数: {len(pages)} / 1ページ {page_size} 件 / 試行回数: {options['repeat']}")
+        self.stdout.write(f"{'方式':<20}{'中央値(ms)':>12}{'最大(ms)':>10}{'クエリ数':>10}")
+        for label, timings, queries in (
+            ("ModelSerializer", serializer_ms, serializer_queries),
+            ("values() 高速パス", fast_ms, fast_queries),
+        ):
+            self.stdout.write(
+                f"{label:<20}{statistics.median(timings):>12.2f}{max(timings):>10.2f}{queries:>10}"
+            )
+        self.stdout.write(
+            f"高速化: {statistics.median(serializer_ms) / statistics.median(fast_ms):.1f} 倍"
+        )
+
+    def _run_once(self, func):
+        """1回実行して (出力, 発行したクエリ数) を返す"""
+        with CaptureQueriesContext(connection) as captured:
+            data = func()
+        return data, len(captured)
+
+    def _measure(self, func, repeat):
+        """取得からシリアライズまでの1ページあたりの時間（ミリ秒の中央値）"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
@@ -0,0 +1,136 @@
+# blog/management/commands/benchmark_search.py
+
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from blog.models import BlogPost
+from blog.search import is_supported, rebuild_search_vectors, search_posts
+from blog.seed import delete_posts
+
+# ベンチマーク用の本文を組み立てる語彙
+WORDS = [
+    "東京", "京都", "旅行", "写真", "カメラ", "料理", "レシピ", "プログラミング",
+    "パイソン", "データベース", "検索", "インデックス", "猫", "散歩", "季節",
+    "桜", "紅葉", "ラーメン", "コーヒー", "読書", "映画", "音楽", "Django",
+    "PostgreSQL", "React", "Next.js", "開発", "設計", "性能", "改善",
+]
+DEFAULT_TERMS = ["プログラミング", "京都 写真", "PostgreSQL", "紅葉"]
+PAGE_SIZE = 9
+
+
+class Command(BaseCommand):
+    """
+    ?search=（ILIKE）と ?q=（tsvector + GIN）の検索速度を比較する
+
+    記事が足りない分は公開記事として追加するため、DEBUG でないデータベースでは
+    --allow-seed を指定したときだけ作成し、終了時に削除する（--keep-seeded で残す）。
+    """
+
+    help = "従来の SearchFilter 検索と全文検索の実行時間を比較します"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--posts", type=int, default=100_000,
+            help="記事数がこれに満たなければベンチマーク用記事を追加する",
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="各検索語の試行回数")
+        parser.add_argument("--term", action="append", dest="terms", help="検索語（複数指定可）")
+        parser.add_argument("--seed", type=int, default=0, help="本文生成の乱数シード")
+        parser.add_argument(
+            "--allow-seed", action="store_true",
+            help="DEBUG でなくても足りない記事を公開記事として作成する",
+        )
+        parser.add_argument("--keep-seeded", action="store_true", help="作成した記事を終了時に削除しない")
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            self.stdout.write(self.style.WARNING("全文検索の比較にはPostgreSQLが必要です"))
+
+        allow_seed = options["allow_seed"] or settings.DEBUG
+        seeded = self._ensure_posts(options["posts"], options["seed"], allow_seed)
+        try:
+            self._compare(options["terms"] or DEFAULT_TERMS, options["repeat"])
+        finally:
+            if seeded and not options["keep_seeded"]:
+                self.stdout.write(f"ベンチマーク用記事 {len(seeded)} 件を削除します...")
+                delete_posts(seeded)
+
+    def _compare(self, terms, repeat):
+        queryset = BlogPost.objects.filter(is_published=True)
+        self.stdout.write(f"記事数: {queryset.count()} / 試行回数: {repeat}")
+        self.stdout.write(f"{'検索語':<16}{'ILIKE(ms)':>12}{'全文検索(ms)':>14}{'件数':>10}")
+        for term in terms:
+            ilike_ms = self._measure(lambda: self._ilike_page(queryset, term), repeat)
+            fts_ms = self._measure(lambda: self._fulltext_page(queryset, term), repeat)
+            hits = search_posts(queryset, term).count()
+            self.stdout.write(f"{term:<16}{ilike_ms:>12.1f}{fts_ms:>14.1f}{hits:>10}")
+
+    def _ilike_page(self, queryset, term):
+        """SearchFilter と同じ条件で1ページ分と総件数を取得"""
+        condition = Q()
+        for word in term.split():
+            condition &= Q(title__icontains=word) | Q(description__icontains=word)
+        filtered = queryset.filter(condition)
+        filtered.count()
+        list(filtered.order_by("-created_at")[:PAGE_SIZE])
+
+    def _fulltext_page(self, queryset, term):
+        """?q= と同じ条件で1ページ分と総件数を取得"""
+        filtered = search_posts(queryset, term)
+        filtered.count()
+        if is_supported():
+            filtered = filtered.order_by("-search_rank", "-created_at")
+        list(filtered[:PAGE_SIZE])
+
+    def _measure(self, func, repeat):
+        """中央値（ミリ秒）を返す"""
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def _ensure_posts(self, target, seed, allow_seed):
+        """
+        記事数が target に満たなければ bulk_create で補充し、作成した記事のIDを返す
+        （画像処理は通さない）
+        """
+        missing = target - BlogPost.objects.count()
+        if missing <= 0:
+            return []
+        if not allow_seed:
+            raise CommandError(
+                f"記事が {missing} 件足りません。このデータベースに公開記事を作成してよければ"
+                " --allow-seed を指定してください"
+            )
+
+        rng = random.Random(seed)
+        author, _ = User.objects.get_or_create(username="benchmark")
+        self.stdout.write(f"ベンチマーク用記事を {missing} 件作成します...")
+
+        post_ids = []
+        batch_size = 2000
+        for offset in range(0, missing, batch_size):
+            posts = [
+                BlogPost(
+                    author=author,
+                    title="".join(rng.choices(WORDS, k=3)),
+                    description="。".join(
+                        "".join(rng.choices(WORDS, k=8)) for _ in range(rng.randint(20, 80))
+                    ),
+                    is_published=True,
+                )
+                for _ in range(min(batch_size, missing - offset))
+            ]
+            created = BlogPost.objects.bulk_create(posts, batch_size=batch_size)
+            post_ids += [post.pk for post in created]
+
+        rebuild_search_vectors(BlogPost.objects.filter(pk__in=post_ids))
+        return post_ids
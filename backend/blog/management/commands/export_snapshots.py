@@ -0,0 +1,41 @@
+# blog/management/commands/export_snapshots.py
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.snapshots import Snapshot
+
+
+class Command(BaseCommand):
+    """
+    公開APIの静的JSONスナップショットをすべて書き出す（blog.snapshots を参照）
+
+    初回の配置、seed_blog などシグナルを通さない一括更新の後、
+    SNAPSHOT_MAX_PAGES や SNAPSHOT_BASE_URL を変えたときに実行する。
+    """
+
+    help = "記事一覧・タグ別一覧・記事詳細・タグ一覧のJSONを書き出します"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--root", help="書き出し先（既定は SNAPSHOT_ROOT）")
+        parser.add_argument(
+            "--max-pages", type=int, help="一覧を書き出す最大ページ数（既定は SNAPSHOT_MAX_PAGES）",
+        )
+
+    def handle(self, *args, **options):
+        root = options["root"] or settings.SNAPSHOT_ROOT
+        if not root:
+            raise CommandError("SNAPSHOT_ROOT を設定するか --root を指定してください")
+
+        started = time.perf_counter()
+        snapshot = Snapshot(root=root, max_pages=options["max_pages"])
+        with snapshot.lock():
+            snapshot.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{root} に {snapshot.written} ファイルを書き出し、{snapshot.removed} ファイルを削除しました"
+                f"（{time.perf_counter() - started:.1f} 秒）"
+            )
+        )
@@ -0,0 +1,31 @@
+# blog/management/commands/flush_like_events.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.likes import flush_like_events
+
+
+class Command(BaseCommand):
+    """ライトビハインド方式で溜めたいいね操作（LikeEvent）を Like テーブルへ反映する"""
+
+    help = "未反映のいいね操作をまとめて Like テーブルに反映します（既定は溜まっている分をすべて）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="1トランザクションで反映する件数")
+        parser.add_argument("--loop", action="store_true", help="終了せずに定期的に反映し続ける")
+        parser.add_argument("--interval", type=float, default=2.0, help="--loop時の反映間隔（秒）")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            flushed = flush_like_events(options["batch_size"])
+            total += flushed
+            if flushed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} 件のいいね操作を反映しました"))
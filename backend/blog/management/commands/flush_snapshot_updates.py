@@ -0,0 +1,31 @@
+# blog/management/commands/flush_snapshot_updates.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.snapshots import flush_updates
+
+
+class Command(BaseCommand):
+    """記事・タグの変更で積まれたスナップショットの更新待ち（SnapshotUpdate）を書き出す"""
+
+    help = "静的スナップショットの更新待ちをまとめて書き出します（既定は溜まっている分をすべて）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="1回にまとめて書き出す件数")
+        parser.add_argument("--loop", action="store_true", help="終了せずに定期的に書き出し続ける")
+        parser.add_argument("--interval", type=float, default=2.0, help="--loop時の書き出し間隔（秒）")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            flushed = flush_updates(options["batch_size"])
+            total += flushed
+            if flushed:
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
+
+        self.stdout.write(self.style.SUCCESS(f"{total} 件の更新待ちを書き出しました"))
@@ -0,0 +1,64 @@
+# blog/management/commands/process_image_jobs.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.jobs import claim_jobs, requeue_stale_jobs, retry_failed_jobs, run_jobs
+
+
+class Command(BaseCommand):
+    """画像処理ジョブ（ImageJob）のワーカー"""
+
+    help = "待機中の画像処理ジョブをプロセスプールで処理します（既定はキューが空になるまで）"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="画像処理に使うプロセス数（1ならプールを使わない）",
+        )
+        parser.add_argument("--batch-size", type=int, default=10, help="一度に取り出すジョブ数")
+        parser.add_argument("--loop", action="store_true", help="キューが空でも終了せずに待ち続ける")
+        parser.add_argument("--interval", type=float, default=5.0, help="--loop時のポーリング間隔（秒）")
+        parser.add_argument("--retry-failed", action="store_true", help="失敗したジョブを再試行待ちに戻す")
+        parser.add_argument(
+            "--requeue-stale", type=int, metavar="MINUTES",
+            help="指定分数以上処理中のままのジョブを再試行待ちに戻す",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            count = retry_failed_jobs()
+            self.stdout.write(f"{count} 件の失敗ジョブを再試行待ちに戻しました")
+        if options["requeue_stale"] is not None:
+            count = requeue_stale_jobs(options["requeue_stale"])
+            self.stdout.write(f"{count} 件の停滞ジョブを再試行待ちに戻しました")
+
+        executor = None
+        if options["workers"] > 1:
+            # フォーク前に接続を閉じ、子プロセスにDB接続を引き継がない
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=options["workers"])
+
+        total_done = total_failed = 0
+        try:
+            while True:
+                jobs = claim_jobs(options["batch_size"])
+                if not jobs:
+                    if not options["loop"]:
+                        break
+                    time.sleep(options["interval"])
+                    continue
+                done, failed = run_jobs(jobs, executor)
+                total_done += done
+                total_failed += failed
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"完了 {total_done} 件 / 失敗 {total_failed} 件")
+        )
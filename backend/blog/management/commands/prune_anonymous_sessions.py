@@ -0,0 +1,51 @@
+# blog/management/commands/prune_anonymous_sessions.py
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.models import Like, LikeEvent
+
+
+class Command(BaseCommand):
+    """閲覧だけで作られた匿名セッションを django_session から削除する"""
+
+    help = (
+        "データが空で、いいね（未反映の LikeEvent を含む）にも使われていないセッションを削除します"
+        "（期限切れのセッションは clearsessions で削除してください）"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="一度に削除する件数")
+        parser.add_argument("--dry-run", action="store_true", help="件数を数えるだけで削除しない")
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        # ライトビハインド方式では、いいねが LikeEvent にしかまだないことがある
+        unused = Session.objects.exclude(session_key__in=Like.objects.values("session_key")).exclude(
+            session_key__in=LikeEvent.objects.values("session_key")
+        )
+        candidates = unused.filter(expire_date__gt=timezone.now()).order_by("session_key")
+
+        deleted = scanned = 0
+        last_key = ""
+        while True:
+            batch = list(candidates.filter(session_key__gt=last_key)[:batch_size])
+            if not batch:
+                break
+            last_key = batch[-1].session_key
+            scanned += len(batch)
+
+            # 管理画面のログインなどデータを持つセッションは残す
+            empty = [session.session_key for session in batch if not session.get_decoded()]
+            if empty and not options["dry_run"]:
+                # 確認後にいいねしたセッションを消さないよう、削除時にも除外する
+                deleted += unused.filter(session_key__in=empty).delete()[0]
+            else:
+                deleted += len(empty)
+
+        if options["dry_run"]:
+            message = f"{scanned} 件中 {deleted} 件の匿名セッションが削除対象です（dry-run）"
+        else:
+            message = f"{scanned} 件中 {deleted} 件の匿名セッションを削除しました"
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,28 @@
+# blog/management/commands/rebuild_related_posts.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import related
+
+
+class Command(BaseCommand):
+    """
+    すべての公開記事の関連記事（RelatedPost）を作り直す（blog.related を参照）
+
+    初回の配置、シグナルを通さない一括更新の後（seed_blog は自動で作り直す）、
+    RELATED_POSTS_LIMIT・RELATED_CANDIDATES_PER_TAG を変えたときに実行する。
+    保存時の差分更新は他の記事の一覧を近似で済ませるため、定期的にも実行する。
+    """
+
+    help = "タグの重なりから全記事の関連記事を再計算します"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = related.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{created} 件の関連記事を保存しました（{time.perf_counter() - started:.1f} 秒）"
+            )
+        )
@@ -0,0 +1,25 @@
+# blog/management/commands/rebuild_search_index.py
+
+from django.core.management.base import BaseCommand
+
+from blog.models import BlogPost
+from blog.search import is_supported, rebuild_search_vectors
+
+
+class Command(BaseCommand):
+    """全記事の全文検索用 search_vector を再計算する"""
+
+    help = "BlogPost.search_vector を再構築します（トークン化規則の変更後や一括投入後に実行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="一度に更新する件数")
+
+    def handle(self, *args, **options):
+        if not is_supported():
+            self.stdout.write(self.style.WARNING("PostgreSQL以外のデータベースでは不要です"))
+            return
+
+        updated = rebuild_search_vectors(
+            BlogPost.objects.all(), batch_size=options["batch_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(f"{updated} 件の検索インデックスを更新しました"))
@@ -0,0 +1,28 @@
+# blog/management/commands/redecay_trending.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import cache, trending
+
+
+class Command(BaseCommand):
+    """
+    トレンドスコアの基準時刻を現在に進め、直近のいいねから数え直す（blog.trending を参照）
+
+    新しいいいねの重みは基準時刻から離れるほど大きくなるため、
+    cron などで半減期より短い間隔（1時間ごとなど）に実行する。
+    """
+
+    help = "トレンドスコアを現在時刻を基準に再計算します"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        scored = trending.redecay()
+        cache.invalidate(cache.POSTS)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{scored} 件の記事のトレンドスコアを再計算しました（{time.perf_counter() - started:.1f} 秒）"
+            )
+        )
@@ -0,0 +1,140 @@
+# blog/management/commands/reoptimize_images.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.images import settings_fingerprint
+from blog.jobs import run_jobs, start_reoptimize_jobs
+from blog.models import BackfillCheckpoint, BlogPost, ImageStatus
+
+CHECKPOINT_NAME = "reoptimize_images"
+
+
+def _size(storage, name):
+    try:
+        return storage.size(name)
+    except OSError:
+        return 0
+
+
+class Command(BaseCommand):
+    """
+    既存の記事画像を現在の設定で最適化し直す（blog.images・blog.jobs を参照）
+
+    最適化の導入前にアップロードされた画像や、幅・画質などの設定を変える前に
+    処理した画像が対象。処理時の設定の指紋（BlogPost.image_fingerprint）が
+    現在と同じ画像は読み飛ばし、同じ内容（同じハッシュ名）の画像は1回だけ処理する。
+    進捗はバッチごとに BackfillCheckpoint に記録するため、中断しても
+    再実行すれば続きの記事から再開する（設定が変わっていれば最初から）。
+    最後まで処理したら進捗を消し、次回は新たに対象になった画像を探し直す。
+
+    最適化後は元画像を残さないため、処理し直す元は前回の出力（JPEG など）になる。
+    画質を下げる変更はそのたびに劣化が重なり、MAX_WIDTH を広げても前回より
+    大きくはならない（元のアップロードに戻ることはできない）。
+    """
+
+    help = (
+        "既存の記事画像を現在の最適化設定で処理し直します（中断しても再開できます）。"
+        "元画像は残っていないため前回の出力を再エンコードします。画質は戻らず、"
+        "MAX_WIDTH を広げても前回より大きくはなりません"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="画像処理に使うプロセス数（1ならプールを使わない）",
+        )
+        parser.add_argument(
+            "--chunk-size", type=int, default=100,
+            help="一度に読み出して処理する記事数（進捗はこの単位で記録）",
+        )
+        parser.add_argument("--restart", action="store_true", help="記録した進捗を捨てて最初から処理する")
+        parser.add_argument("--dry-run", action="store_true", help="対象の件数を表示するだけで処理しない")
+
+    def handle(self, *args, **options):
+        fingerprint = settings_fingerprint()
+        # 処理待ち・処理中の画像はワーカーに任せる
+        targets = (
+            BlogPost.objects.filter(image_status=ImageStatus.READY)
+            .exclude(image="")
+            .exclude(image__isnull=True)
+        )
+        stale = targets.exclude(image_fingerprint=fingerprint)
+
+        if options["dry_run"]:
+            self.stdout.write(f"{stale.count()} 件の画像が再最適化の対象です（dry-run）")
+            return
+
+        checkpoint, _ = BackfillCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+        if options["restart"] or checkpoint.fingerprint != fingerprint:
+            checkpoint.fingerprint = fingerprint
+            checkpoint.last_pk = checkpoint.processed = checkpoint.failed = checkpoint.bytes_saved = 0
+            checkpoint.save()
+        elif checkpoint.last_pk:
+            self.stdout.write(f"記事ID {checkpoint.last_pk} の続きから再開します")
+        skipped = targets.filter(pk__gt=checkpoint.last_pk, image_fingerprint=fingerprint).count()
+
+        executor = None
+        if options["workers"] > 1:
+            # フォーク前に接続を閉じ、子プロセスにDB接続を引き継がない
+            connections.close_all()
+            executor = ProcessPoolExecutor(max_workers=options["workers"])
+
+        started = time.perf_counter()
+        # 削減量を数え済みの元画像（同じ画像を共有する記事で重複して数えない）
+        self.counted_names = set()
+        rows = (
+            stale.filter(pk__gt=checkpoint.last_pk)
+            .order_by("pk")
+            .values_list("pk", "image")
+            .iterator(chunk_size=options["chunk_size"])
+        )
+        try:
+            while batch := list(islice(rows, options["chunk_size"])):
+                self._run_batch(batch, checkpoint, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"完了 {checkpoint.processed} 件 / 失敗 {checkpoint.failed} 件 / "
+                f"設定が最新のため省略 {skipped} 件 / "
+                f"削減 {checkpoint.bytes_saved:,} バイト"
+                f"（{time.perf_counter() - started:.1f} 秒）"
+            )
+        )
+        checkpoint.delete()
+
+    def _run_batch(self, batch, checkpoint, executor):
+        """1バッチを処理して進捗を記録する"""
+        storage = BlogPost._meta.get_field("image").storage
+        # 差し替え後は元のファイルが消えうるため、先にサイズを控えておく
+        before = {name: _size(storage, name) for name in {name for _, name in batch}}
+
+        done, failed = run_jobs(start_reoptimize_jobs(batch), executor)
+
+        after = dict(
+            BlogPost.objects.filter(pk__in=[pk for pk, _ in batch]).values_list("pk", "image")
+        )
+        # 同じ画像を共有する記事は、元の1ファイルぶんだけ数える
+        outputs = {}
+        for pk, name in batch:
+            if name not in self.counted_names and after.get(pk) and after[pk] != name:
+                outputs.setdefault(name, after[pk])
+        self.counted_names.update(outputs)
+        saved = sum(before[name] - _size(storage, new_name) for name, new_name in outputs.items())
+
+        checkpoint.last_pk = batch[-1][0]
+        checkpoint.processed += done
+        checkpoint.failed += failed
+        checkpoint.bytes_saved += saved
+        checkpoint.save()
+        self.stdout.write(
+            f"記事ID {checkpoint.last_pk} まで: 完了 {done} 件 / 失敗 {failed} 件 / 削減 {saved:,} バイト"
+        )
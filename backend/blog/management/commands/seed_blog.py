@@ -0,0 +1,166 @@
+# blog/management/commands/seed_blog.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, time as dt_time
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.utils import timezone
+from tqdm import tqdm
+
+from blog import archive, cache, related, trending
+from blog.models import BlogPost, Like, Tag
+from blog.search import is_supported, rebuild_search_vectors
+from blog.seed import seed_chunk, seed_tags
+from blog.tags import actual_published_post_count
+
+
+def _init_worker():
+    """ワーカープロセスの初期化（親から引き継いだ接続は使わない）"""
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    """
+    本番規模の検証用データを生成する
+
+    記事・タグ付け・いいねを BlogPost.save() を通さずに流し込む
+    （PostgreSQL は COPY、それ以外は executemany）。いいね数は Zipf 型の
+    分布、タグも人気の偏りを持たせる。同じ --seed と --end なら同じデータになる。
+    """
+
+    help = "大量の記事・タグ付け・いいねを生成します（画像処理なし・乱数シードで再現可能）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=100_000, help="作成する記事数")
+        parser.add_argument("--tags", type=int, default=200, help="使うタグの数")
+        parser.add_argument(
+            "--tags-per-post", type=int, nargs=2, default=[1, 5], metavar=("MIN", "MAX"),
+            help="記事ごとのタグ数の範囲",
+        )
+        parser.add_argument(
+            "--sentences", type=int, nargs=2, default=[20, 200], metavar=("MIN", "MAX"),
+            help="本文の文数の範囲",
+        )
+        parser.add_argument("--likes-alpha", type=float, default=1.2, help="いいね数の分布の指数（小さいほど偏る）")
+        parser.add_argument("--max-likes", type=int, default=5000, help="1記事あたりのいいね数の上限")
+        parser.add_argument("--published-ratio", type=float, default=0.95, help="公開記事の割合")
+        parser.add_argument("--days", type=int, default=730, help="作成日時を散らばらせる日数")
+        parser.add_argument(
+            "--end", help="作成日時の上限（YYYY-MM-DD、既定は今日の0時）",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000, help="1回に書き込む記事数")
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count() or 1,
+            help="並列ワーカー数（PostgreSQL 以外では 1）",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+        parser.add_argument(
+            "--skip-search-index", action="store_true",
+            help="全文検索ベクトルを作らない（後で rebuild_search_index を実行する）",
+        )
+
+    def handle(self, *args, **options):
+        if options["posts"] <= 0 or options["chunk_size"] <= 0:
+            raise CommandError("--posts と --chunk-size は1以上を指定してください")
+
+        workers = max(options["workers"], 1)
+        if connection.vendor != "postgresql" and workers > 1:
+            self.stdout.write(self.style.WARNING("PostgreSQL 以外では並列に書き込めないため1ワーカーで実行します"))
+            workers = 1
+
+        author, _ = User.objects.get_or_create(username="seed")
+        params = {
+            "seed": options["seed"],
+            "end": self._end(options["end"]),
+            "days": options["days"],
+            "tag_ids": [tag.pk for tag in seed_tags(options["tags"])],
+            "tags_per_post": tuple(options["tags_per_post"]),
+            "sentences": tuple(options["sentences"]),
+            "likes_alpha": options["likes_alpha"],
+            "max_likes": options["max_likes"],
+            "published_ratio": options["published_ratio"],
+            "author_id": author.pk,
+        }
+
+        total = options["posts"]
+        chunk_size = options["chunk_size"]
+        chunks = [
+            (index, min(chunk_size, total - start))
+            for index, start in enumerate(range(0, total, chunk_size))
+        ]
+        first_pk = (BlogPost.objects.order_by("-pk").values_list("pk", flat=True).first() or 0) + 1
+
+        self.started = time.perf_counter()
+        counts = [0, 0, 0]
+        with tqdm(total=total, unit="記事", disable=options["verbosity"] < 1) as bar:
+            if workers == 1:
+                for index, size in chunks:
+                    self._progress(bar, counts, seed_chunk(index, size, params))
+            else:
+                # 子プロセスに接続をコピーしない
+                connections.close_all()
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                    futures = [
+                        executor.submit(seed_chunk, index, size, params) for index, size in chunks
+                    ]
+                    for future in as_completed(futures):
+                        self._progress(bar, counts, future.result())
+
+        self._finish(first_pk, options["skip_search_index"])
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"記事 {counts[0]} 件・タグ付け {counts[1]} 件・いいね {counts[2]} 件を"
+                f" {elapsed:.1f} 秒で作成しました"
+            )
+        )
+
+    def _end(self, value):
+        """作成日時の上限（再現性のため既定は今日の0時に丸める）"""
+        if value:
+            try:
+                day = datetime.strptime(value, "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--end は YYYY-MM-DD 形式で指定してください")
+        else:
+            day = timezone.localdate()
+        return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+    def _progress(self, bar, counts, result):
+        """チャンクの作成件数を合計し、進捗バー（標準エラー出力）を進める"""
+        for i, value in enumerate(result):
+            counts[i] += value
+        bar.set_postfix({"いいね": counts[2]}, refresh=False)
+        bar.update(result[0])
+
+    def _finish(self, first_pk, skip_search_index):
+        """生成後の集計値・検索ベクトル・統計情報の更新とキャッシュの無効化"""
+        self.stdout.write("タグの公開記事数を集計しています...")
+        Tag.objects.update(published_post_count=actual_published_post_count())
+
+        self.stdout.write("トレンドスコアを計算しています...")
+        trending.redecay()
+
+        self.stdout.write("月別アーカイブを集計しています...")
+        archive.rebuild()
+
+        self.stdout.write("関連記事を計算しています...")
+        related.rebuild()
+
+        if is_supported() and not skip_search_index:
+            self.stdout.write("全文検索ベクトルを作成しています...")
+            rebuild_search_vectors(BlogPost.objects.filter(pk__gte=first_pk))
+
+        if connection.vendor == "postgresql":
+            # 大量挿入の直後はプランナーの統計が古いままになる
+            with connection.cursor() as cursor:
+                for model in (BlogPost, BlogPost.tags.through, Like, Tag):
+                    cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+
+        cache.invalidate(cache.POSTS, cache.TAGS)
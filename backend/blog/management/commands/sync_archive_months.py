@@ -0,0 +1,42 @@
+# blog/management/commands/sync_archive_months.py
+
+from django.core.management.base import BaseCommand
+
+from blog.archive import actual_month_counts, store_counts
+from blog.models import ArchiveMonth
+
+
+class Command(BaseCommand):
+    """月別アーカイブ（ArchiveMonth）を公開記事の実件数に合わせる（ずれの確認・補正用）"""
+
+    help = "ArchiveMonth.post_count を月ごとの公開記事の実件数と同期します"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="ずれている月を表示するだけで更新しない",
+        )
+
+    def handle(self, *args, **options):
+        actual = actual_month_counts()
+        stored = dict(ArchiveMonth.objects.values_list("month", "post_count"))
+        drifted = {
+            month: actual.get(month, 0)
+            for month in sorted(actual.keys() | stored.keys())
+            if actual.get(month, 0) != stored.get(month, 0)
+        }
+
+        for month, counted in drifted.items():
+            self.stdout.write(f"{month:%Y-%m}: {stored.get(month, 0)} -> {counted}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("月別アーカイブのずれはありません"))
+            return
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(drifted)} 件のずれを検出しました（dry-run）")
+            return
+
+        store_counts(drifted)
+        self.stdout.write(self.style.SUCCESS(f"{len(drifted)} か月分の記事数を補正しました"))
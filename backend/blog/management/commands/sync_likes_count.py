@@ -0,0 +1,46 @@
+# blog/management/commands/sync_likes_count.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from blog import cache
+from blog.likes import actual_likes_count
+from blog.models import BlogPost
+
+
+class Command(BaseCommand):
+    """非正規化されたいいね数（BlogPost.likes_count）をLikeテーブルと突き合わせて補正する"""
+
+    help = "BlogPost.likes_count を Like テーブルの実件数と同期します"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="ずれている記事を表示するだけで更新しない",
+        )
+
+    def handle(self, *args, **options):
+        actual = actual_likes_count()
+        drifted = list(
+            BlogPost.objects.annotate(actual_likes=actual)
+            .exclude(likes_count=F("actual_likes"))
+            .values_list("pk", "likes_count", "actual_likes")
+        )
+
+        for pk, stored, counted in drifted:
+            self.stdout.write(f"記事 {pk}: {stored} -> {counted}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("いいね数のずれはありません"))
+            return
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(drifted)} 件のずれを検出しました（dry-run）")
+            return
+
+        BlogPost.objects.filter(pk__in=[pk for pk, _, _ in drifted]).update(
+            likes_count=actual
+        )
+        cache.invalidate(cache.POSTS)
+        self.stdout.write(self.style.SUCCESS(f"{len(drifted)} 件のいいね数を補正しました"))
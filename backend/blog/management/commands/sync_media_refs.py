@@ -0,0 +1,88 @@
+# blog/management/commands/sync_media_refs.py
+
+from collections import Counter
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.models import BlogPost, ImageVariant, MediaFile
+from blog.storage import is_hashed_name
+
+
+def referenced_names():
+    """画像フィールドから参照されているファイル名と参照数"""
+    counts = Counter()
+    for model in (BlogPost, ImageVariant):
+        names = model.objects.exclude(image="").exclude(image=None).values_list("image", flat=True)
+        counts.update(names.iterator(chunk_size=2000))
+    return counts
+
+
+class Command(BaseCommand):
+    """
+    メディアファイルの参照数（MediaFile.ref_count）を画像フィールドと突き合わせて補正する
+
+    参照されていないファイルは削除する。画像処理ジョブが保存したばかりで
+    まだ記事に紐付いていないファイルを消さないよう、--grace-minutes 以内に
+    更新された記録は削除しない。
+    """
+
+    help = "MediaFile.ref_count を実際の参照数と同期し、参照のないファイルを削除します"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="ずれているファイルを表示するだけで更新しない",
+        )
+        parser.add_argument(
+            "--grace-minutes", type=int, default=60,
+            help="この時間内に更新されたファイルは参照がなくても削除しない",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        threshold = timezone.now() - timedelta(minutes=options["grace_minutes"])
+        counts = referenced_names()
+        fixed = removed = freed = 0
+
+        for media_file in MediaFile.objects.iterator(chunk_size=2000):
+            actual = counts.pop(media_file.name, 0)
+            if actual == media_file.ref_count:
+                continue
+            if actual == 0 and media_file.updated_at >= threshold:
+                continue
+            self.stdout.write(f"{media_file.name}: {media_file.ref_count} -> {actual}")
+            if actual == 0:
+                removed += 1
+                freed += media_file.size
+                if not dry_run:
+                    media_file.delete()
+                    default_storage.delete(media_file.name)
+            else:
+                fixed += 1
+                if not dry_run:
+                    MediaFile.objects.filter(pk=media_file.pk).update(ref_count=actual)
+
+        # 参照数の記録がないハッシュ名のファイル（記録前に失われたものなど）
+        for name, actual in counts.items():
+            if not is_hashed_name(name) or not default_storage.exists(name):
+                continue
+            self.stdout.write(f"{name}: (記録なし) -> {actual}")
+            fixed += 1
+            if not dry_run:
+                MediaFile.objects.get_or_create(
+                    name=name, defaults={"ref_count": actual, "size": default_storage.size(name)}
+                )
+
+        if not fixed and not removed:
+            self.stdout.write(self.style.SUCCESS("参照数のずれはありません"))
+            return
+
+        summary = f"参照数 {fixed} 件・削除 {removed} 件（{freed / 1024 / 1024:.1f} MB）"
+        if dry_run:
+            self.stdout.write(f"{summary}を検出しました（dry-run）")
+            return
+        self.stdout.write(self.style.SUCCESS(f"{summary}を補正しました"))
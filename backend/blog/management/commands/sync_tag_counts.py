@@ -0,0 +1,41 @@
+# blog/management/commands/sync_tag_counts.py
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from blog.models import Tag
+from blog.tags import actual_published_post_count, refresh_published_post_counts
+
+
+class Command(BaseCommand):
+    """非正規化されたタグの公開記事数（Tag.published_post_count）を補正する"""
+
+    help = "Tag.published_post_count を公開記事の実件数と同期します"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="ずれているタグを表示するだけで更新しない",
+        )
+
+    def handle(self, *args, **options):
+        drifted = list(
+            Tag.objects.annotate(actual_count=actual_published_post_count())
+            .exclude(published_post_count=F("actual_count"))
+            .values_list("pk", "name", "published_post_count", "actual_count")
+        )
+
+        for _, name, stored, counted in drifted:
+            self.stdout.write(f"タグ {name}: {stored} -> {counted}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("公開記事数のずれはありません"))
+            return
+
+        if options["dry_run"]:
+            self.stdout.write(f"{len(drifted)} 件のずれを検出しました（dry-run）")
+            return
+
+        refresh_published_post_counts(Tag.objects.filter(pk__in=[pk for pk, *_ in drifted]))
+        self.stdout.write(self.style.SUCCESS(f"{len(drifted)} 件の公開記事数を補正しました"))
@@ -0,0 +1,91 @@
+# blog/middleware.py
+
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+
+from . import timing
+
+logger = logging.getLogger("blog.timing")
+
+
+class ServerTimingMiddleware:
+    """
+    リクエストの処理時間を計測する（blog.timing を参照）
+
+    SQLの件数と時間・シリアライズ・画像処理・セッション保存などの区間を
+    Server-Timing ヘッダーで返し（SERVER_TIMING_HEADER が True のとき）、
+    route ごとの集計に加える。SLOW_REQUEST_MS を超えたリクエストは
+    実行したSQLと一緒にログに出す。MIDDLEWARE の先頭に置く。
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            # ASGI では同期・非同期の切り替え（スレッドの受け渡し）を挟まない
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        timings, token = timing.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            timing.finish(token)
+        return self._finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings, token = timing.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timing.finish(token)
+        return self._finish(request, response, timings)
+
+    def _finish(self, request, response, timings):
+        total_ms = timings.total_ms()
+        route = self._route(request)
+        timing.record(route, timings, total_ms)
+        if settings.SERVER_TIMING_HEADER:
+            response["Server-Timing"] = timings.server_timing(total_ms)
+        if total_ms >= settings.SLOW_REQUEST_MS:
+            self._log_slow(route, request, timings, total_ms)
+        return response
+
+    def _route(self, request):
+        """集計のキー（URL名単位。IDなどの値ごとに分けない）"""
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            name = "(unresolved)"
+        else:
+            name = match.view_name or match.route
+        return f"{request.method} {name}"
+
+    def _log_slow(self, route, request, timings, total_ms):
+        lines = [f"{ms:8.1f}ms  {sql}" for ms, sql in timings.queries]
+        if timings.query_count > len(timings.queries):
+            lines.append(f"... 他 {timings.query_count - len(timings.queries)} 件")
+        logger.warning(
+            "遅いリクエスト %s (%s) %.1fms / SQL %d件 %.1fms\n%s",
+            route,
+            request.get_full_path(),
+            total_ms,
+            timings.query_count,
+            timings.query_ms,
+            "\n".join(lines),
+        )
+
+
+class TimedSessionMiddleware(SessionMiddleware):
+    """セッションの保存にかかった時間を Server-Timing の session 区間として計る"""
+
+    def process_response(self, request, response):
+        with timing.timed("session"):
+            return super().process_response(request, response)
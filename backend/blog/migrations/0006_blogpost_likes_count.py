@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:24
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_likes_count(apps, schema_editor):
+    """既存記事のいいね数をLikeテーブルから集計して埋める"""
+    BlogPost = apps.get_model("blog", "BlogPost")
+    Like = apps.get_model("blog", "Like")
+    counts = (
+        Like.objects.filter(blog_post=OuterRef("pk"))
+        .order_by()
+        .values("blog_post")
+        .annotate(c=Count("pk"))
+        .values("c")
+    )
+    BlogPost.objects.update(likes_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0005_remove_image2"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="likes_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="いいね数"
+            ),
+        ),
+        migrations.RunPython(backfill_likes_count, migrations.RunPython.noop),
+    ]
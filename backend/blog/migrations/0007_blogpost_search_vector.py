@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=["search_vector"], name="blog_post_search_gin"
+)
+
+
+def create_search_index(apps, schema_editor):
+    """GINインデックスの作成と既存記事の search_vector 埋め（PostgreSQLのみ）"""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    from blog.search import search_vector_for
+
+    BlogPost = apps.get_model("blog", "BlogPost")
+    schema_editor.add_index(BlogPost, SEARCH_INDEX)
+    for post in BlogPost.objects.only("pk", "title", "description").iterator():
+        BlogPost.objects.filter(pk=post.pk).update(
+            search_vector=search_vector_for(post.title, post.description)
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    BlogPost = apps.get_model("blog", "BlogPost")
+    schema_editor.remove_index(BlogPost, SEARCH_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0006_blogpost_likes_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        # SQLiteでのローカル検証でも適用できるよう、インデックスはPostgreSQLでのみ作成する
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name="blogpost", index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0007_blogpost_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="blogpost",
+            index=models.Index(
+                fields=["is_published", "-created_at", "-id"],
+                name="blog_post_feed_idx",
+            ),
+        ),
+    ]
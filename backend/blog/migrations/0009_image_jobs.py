@@ -0,0 +1,103 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0008_blogpost_feed_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="image_status",
+            field=models.CharField(
+                choices=[
+                    ("ready", "完了"),
+                    ("processing", "処理中"),
+                    ("failed", "失敗"),
+                ],
+                default="ready",
+                editable=False,
+                max_length=20,
+                verbose_name="画像処理状態",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ImageJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "source_name",
+                    models.CharField(max_length=255, verbose_name="元画像"),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "待機中"),
+                            ("running", "処理中"),
+                            ("done", "完了"),
+                            ("failed", "失敗"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="状態",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name="試行回数"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="エラー内容")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="登録日時"),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="開始日時"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="終了日時"
+                    ),
+                ),
+                (
+                    "blog_post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="image_jobs",
+                        to="blog.blogpost",
+                        verbose_name="ブログ記事",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "画像処理ジョブ",
+                "verbose_name_plural": "画像処理ジョブ",
+                "ordering": ["created_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"], name="blog_imagejob_queue_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0009_image_jobs"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageVariant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "image",
+                    models.ImageField(
+                        upload_to="blog_images/variants/", verbose_name="画像"
+                    ),
+                ),
+                ("width", models.PositiveIntegerField(verbose_name="幅")),
+                ("height", models.PositiveIntegerField(verbose_name="高さ")),
+                ("format", models.CharField(max_length=10, verbose_name="形式")),
+                (
+                    "blog_post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="image_variants",
+                        to="blog.blogpost",
+                        verbose_name="ブログ記事",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "画像バリアント",
+                "verbose_name_plural": "画像バリアント",
+                "ordering": ["format", "width"],
+            },
+        ),
+    ]
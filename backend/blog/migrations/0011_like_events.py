@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0010_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LikeEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "session_key",
+                    models.CharField(max_length=40, verbose_name="セッションキー"),
+                ),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[("add", "いいね"), ("remove", "いいね解除")],
+                        max_length=10,
+                        verbose_name="操作",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="操作日時"),
+                ),
+                (
+                    "blog_post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="like_events",
+                        to="blog.blogpost",
+                        verbose_name="ブログ記事",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "いいね操作（未反映）",
+                "verbose_name_plural": "いいね操作（未反映）",
+                "ordering": ["id"],
+                "indexes": [
+                    models.Index(
+                        fields=["session_key", "blog_post"],
+                        name="blog_likeevent_session_idx",
+                    )
+                ],
+            },
+        ),
+    ]
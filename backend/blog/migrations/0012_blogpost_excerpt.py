@@ -0,0 +1,39 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:37
+
+import re
+
+from django.db import migrations, models
+
+MARKDOWN_CHARS_RE = re.compile(r"[#*`_~\[\]()]")
+
+
+def backfill_excerpt(apps, schema_editor):
+    """既存記事の抜粋を本文から作る（blog.models.make_excerpt と同じ規則）"""
+    BlogPost = apps.get_model("blog", "BlogPost")
+    batch = []
+    for post in BlogPost.objects.only("pk", "description").iterator(chunk_size=500):
+        post.excerpt = MARKDOWN_CHARS_RE.sub("", post.description or "")[:150]
+        batch.append(post)
+        if len(batch) >= 500:
+            BlogPost.objects.bulk_update(batch, ["excerpt"])
+            batch = []
+    if batch:
+        BlogPost.objects.bulk_update(batch, ["excerpt"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0011_like_events"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blogpost",
+            name="excerpt",
+            field=models.CharField(
+                blank=True, editable=False, max_length=150, verbose_name="抜粋"
+            ),
+        ),
+        migrations.RunPython(backfill_excerpt, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_published_post_count(apps, schema_editor):
+    """既存タグの公開記事数を中間テーブルから集計して埋める"""
+    Tag = apps.get_model("blog", "Tag")
+    BlogPost = apps.get_model("blog", "BlogPost")
+    counts = (
+        BlogPost.tags.through.objects.filter(
+            tag_id=OuterRef("pk"), blogpost__is_published=True
+        )
+        .order_by()
+        .values("tag_id")
+        .annotate(c=Count("pk"))
+        .values("c")
+    )
+    Tag.objects.update(published_post_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0012_blogpost_excerpt"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tag",
+            name="published_post_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="公開記事数"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(
+                fields=["-published_post_count", "name"], name="blog_tag_popular_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_published_post_count, migrations.RunPython.noop),
+    ]
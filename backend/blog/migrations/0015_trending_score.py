@@ -0,0 +1,92 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:03
+
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_trending_score(apps, schema_editor):
+    """基準時刻を作り、直近のいいねから既存記事のトレンドスコアを埋める（blog.trending と同じ計算）"""
+    TrendingState = apps.get_model("blog", "TrendingState")
+    BlogPost = apps.get_model("blog", "BlogPost")
+    Like = apps.get_model("blog", "Like")
+
+    epoch = time.time()
+    half_life = getattr(settings, "TRENDING_HALF_LIFE_HOURS", 24) * 3600
+    since = timezone.now() - timedelta(seconds=half_life * 10)
+    scores = defaultdict(float)
+    for post_id, created_at in Like.objects.filter(created_at__gte=since).values_list(
+        "blog_post_id", "created_at"
+    ).iterator():
+        scores[post_id] += 2.0 ** ((created_at.timestamp() - epoch) / half_life)
+
+    BlogPost.objects.bulk_update(
+        [BlogPost(pk=pk, trending_score=score) for pk, score in scores.items()],
+        ["trending_score"],
+        batch_size=1000,
+    )
+    TrendingState.objects.create(epoch=epoch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0014_mediafile"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrendingState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("epoch", models.FloatField(verbose_name="基準時刻（UNIX秒）")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新日時"),
+                ),
+            ],
+            options={
+                "verbose_name": "トレンドスコアの基準時刻",
+                "verbose_name_plural": "トレンドスコアの基準時刻",
+            },
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="trending_score",
+            field=models.FloatField(
+                default=0, editable=False, verbose_name="トレンドスコア"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blogpost",
+            index=models.Index(
+                fields=["is_published", "-likes_count", "-created_at"],
+                name="blog_post_likes_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="blogpost",
+            index=models.Index(
+                fields=["is_published", "-trending_score", "-created_at"],
+                name="blog_post_trending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(fields=["created_at"], name="blog_like_created_idx"),
+        ),
+        migrations.RunPython(backfill_trending_score, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0015_trending_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RelatedPost",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="順位")),
+                ("score", models.FloatField(verbose_name="類似度（Jaccard）")),
+                (
+                    "blog_post",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_entries",
+                        to="blog.blogpost",
+                        verbose_name="ブログ記事",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_from",
+                        to="blog.blogpost",
+                        verbose_name="関連記事",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "関連記事",
+                "verbose_name_plural": "関連記事",
+                "ordering": ["blog_post", "rank"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("blog_post", "rank"), name="blog_related_rank_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:08
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def backfill_archive_months(apps, schema_editor):
+    """既存の公開記事から月ごとの記事数を数えて埋める"""
+    ArchiveMonth = apps.get_model("blog", "ArchiveMonth")
+    BlogPost = apps.get_model("blog", "BlogPost")
+    rows = (
+        BlogPost.objects.filter(is_published=True)
+        .annotate(month=TruncMonth("created_at"))
+        .order_by()
+        .values("month")
+        .annotate(c=Count("pk"))
+        .values_list("month", "c")
+    )
+    ArchiveMonth.objects.bulk_create(
+        [
+            ArchiveMonth(month=timezone.localtime(month).date().replace(day=1), post_count=count)
+            for month, count in rows
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0016_relatedpost"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchiveMonth",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(unique=True, verbose_name="月（1日）")),
+                (
+                    "post_count",
+                    models.PositiveIntegerField(default=0, verbose_name="公開記事数"),
+                ),
+            ],
+            options={
+                "verbose_name": "月別アーカイブ",
+                "verbose_name_plural": "月別アーカイブ",
+                "ordering": ["-month"],
+            },
+        ),
+        migrations.RunPython(backfill_archive_months, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0017_archivemonth"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="like",
+            name="blog_post",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="likes",
+                to="blog.blogpost",
+                verbose_name="ブログ記事",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="like",
+            index=models.Index(
+                fields=["blog_post", "-created_at"], name="blog_like_post_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0018_like_post_created_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BackfillCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100, unique=True, verbose_name="処理名"
+                    ),
+                ),
+                (
+                    "fingerprint",
+                    models.CharField(
+                        blank=True, max_length=64, verbose_name="設定の指紋"
+                    ),
+                ),
+                (
+                    "last_pk",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="処理済みの最後の記事ID"
+                    ),
+                ),
+                (
+                    "processed",
+                    models.PositiveIntegerField(default=0, verbose_name="処理件数"),
+                ),
+                (
+                    "failed",
+                    models.PositiveIntegerField(default=0, verbose_name="失敗件数"),
+                ),
+                (
+                    "bytes_saved",
+                    models.BigIntegerField(default=0, verbose_name="削減バイト数"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新日時"),
+                ),
+            ],
+            options={
+                "verbose_name": "一括処理の進捗",
+                "verbose_name_plural": "一括処理の進捗",
+            },
+        ),
+        migrations.AddField(
+            model_name="blogpost",
+            name="image_fingerprint",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                max_length=16,
+                verbose_name="最適化設定の指紋",
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0019_image_fingerprint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imagejob",
+            name="is_backfill",
+            field=models.BooleanField(default=False, verbose_name="一括再処理"),
+        ),
+    ]
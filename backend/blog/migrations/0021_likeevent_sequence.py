@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:30
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+def number_pending_events(apps, schema_editor):
+    """未反映の操作に (セッション, 記事) ごとの通し番号を古い順に振る"""
+    LikeEvent = apps.get_model("blog", "LikeEvent")
+    counts = Counter()
+    events = []
+    for event in LikeEvent.objects.order_by("id").iterator():
+        key = (event.session_key, event.blog_post_id)
+        counts[key] += 1
+        event.sequence = counts[key]
+        events.append(event)
+    LikeEvent.objects.bulk_update(events, ["sequence"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0020_imagejob_is_backfill"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="likeevent",
+            name="blog_likeevent_session_idx",
+        ),
+        migrations.AddField(
+            model_name="likeevent",
+            name="sequence",
+            field=models.PositiveIntegerField(default=1, verbose_name="通し番号"),
+        ),
+        migrations.RunPython(number_pending_events, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="likeevent",
+            constraint=models.UniqueConstraint(
+                fields=("session_key", "blog_post", "sequence"),
+                name="blog_likeevent_sequence_uniq",
+            ),
+        ),
+    ]
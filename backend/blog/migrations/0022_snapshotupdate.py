@@ -0,0 +1,54 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0021_likeevent_sequence"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SnapshotUpdate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("post", "記事"),
+                            ("likes", "いいね数"),
+                            ("tag_list", "タグ一覧"),
+                        ],
+                        max_length=10,
+                        verbose_name="種類",
+                    ),
+                ),
+                (
+                    "post_id",
+                    models.PositiveBigIntegerField(
+                        blank=True, null=True, verbose_name="記事ID"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="登録日時"),
+                ),
+            ],
+            options={
+                "verbose_name": "スナップショットの更新待ち",
+                "verbose_name_plural": "スナップショットの更新待ち",
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -1,13 +1,23 @@
 # blog/models.py
 
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.core.files.base import ContentFile
-from PIL import Image
-import pillow_heif
-import io
-import os
+from django.conf import settings
+from django_cleanup import cleanup
+from .search import update_search_vector
+import re
+
+# 抜粋の長さと、抜粋から取り除くMarkdownの記号
+EXCERPT_LENGTH = 150
+_MARKDOWN_CHARS_RE = re.compile(r"[#*`_~\[\]()]")
+
+
+def make_excerpt(description):
+    """本文からMarkdown記号を除いた先頭 EXCERPT_LENGTH 文字の抜粋を作る"""
+    return _MARKDOWN_CHARS_RE.sub("", description or "")[:EXCERPT_LENGTH]
 
 
 class Tag(models.Model):
@@ -15,16 +25,33 @@ class Tag(models.Model):
 
     name = models.CharField(max_length=50, unique=True, verbose_name="タグ名")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="作成日時")
+    # 公開記事の数（blog.tags がタグ付けと公開状態の変更に合わせて更新する）
+    published_post_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="公開記事数"
+    )
 
     class Meta:
         verbose_name = "タグ"
         verbose_name_plural = "タグ"
         ordering = ["name"]
+        indexes = [
+            models.Index(
+                fields=["-published_post_count", "name"], name="blog_tag_popular_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ImageStatus(models.TextChoices):
+    """記事画像の最適化状態"""
+
+    READY = "ready", "完了"
+    PROCESSING = "processing", "処理中"
+    FAILED = "failed", "失敗"
+
+
 class BlogPost(models.Model):
     """ブログ記事モデル：メインとなるブログ投稿"""
 
@@ -39,11 +66,25 @@ class BlogPost(models.Model):
     # 記事の基本情報
     title = models.CharField(max_length=200, verbose_name="タイトル")
     description = models.TextField(verbose_name="説明・本文")
+    excerpt = models.CharField(
+        max_length=EXCERPT_LENGTH, blank=True, editable=False, verbose_name="抜粋"
+    )
 
     # 画像
     image = models.ImageField(
         upload_to="blog_images/", blank=True, null=True, verbose_name="画像"
     )
+    image_status = models.CharField(
+        max_length=20,
+        choices=ImageStatus.choices,
+        default=ImageStatus.READY,
+        editable=False,
+        verbose_name="画像処理状態",
+    )
+    # 画像を最適化したときの設定の指紋（blog.images.settings_fingerprint。未処理なら空）
+    image_fingerprint = models.CharField(
+        max_length=16, blank=True, default="", editable=False, verbose_name="最適化設定の指紋"
+    )
 
     # タグ
     tags = models.ManyToManyField(
@@ -58,67 +99,106 @@ class BlogPost(models.Model):
     is_published = models.BooleanField(default=True, verbose_name="公開設定")
     published_at = models.DateTimeField(blank=True, null=True, verbose_name="公開日時")
 
+    # いいね数（Likeの件数を非正規化して保持）
+    likes_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="いいね数")
+    # 最近のいいねほど重いスコア（blog.trending がいいねのたびに加算し、定期的に数え直す）
+    trending_score = models.FloatField(default=0, editable=False, verbose_name="トレンドスコア")
+
+    # 全文検索用（blog.search でトークン化したタイトル・本文）
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         verbose_name = "ブログ記事"
         verbose_name_plural = "ブログ記事"
         ordering = ["-created_at"]
+        indexes = [
+            GinIndex(fields=["search_vector"], name="blog_post_search_gin"),
+            # 公開記事フィードのキーセットページネーション用
+            models.Index(
+                fields=["is_published", "-created_at", "-id"],
+                name="blog_post_feed_idx",
+            ),
+            # ?ordering=likes / ?ordering=trending 用
+            models.Index(
+                fields=["is_published", "-likes_count", "-created_at"],
+                name="blog_post_likes_idx",
+            ),
+            models.Index(
+                fields=["is_published", "-trending_score", "-created_at"],
+                name="blog_post_trending_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
-    def _optimize_image(self, image_field, max_width=1200):
-        """画像を最適化（HEIC変換 + リサイズ + 圧縮）"""
-        if not image_field:
-            return None
-
-        filename = image_field.name.lower()
-        is_heic = filename.endswith(('.heic', '.heif'))
-
-        try:
-            if is_heic:
-                heif_file = pillow_heif.read_heif(image_field)
-                pil_image = Image.frombytes(
-                    heif_file.mode,
-                    heif_file.size,
-                    heif_file.data,
-                    "raw",
-                )
-            else:
-                pil_image = Image.open(image_field)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # 保存時に検索ベクトルを更新するか判断するため、読み込んだ時点のタイトル・本文を控える
+        loaded = dict(zip(field_names, (value for value in values if value is not models.DEFERRED)))
+        if "title" in loaded and "description" in loaded:
+            instance._search_text = (loaded["title"], loaded["description"])
+        return instance
 
-            if pil_image.mode in ('RGBA', 'P'):
-                pil_image = pil_image.convert('RGB')
+    def _search_text_changed(self, update_fields):
+        """検索ベクトルの元になるタイトル・本文が読み込み（前回の更新）から変わったか"""
+        if update_fields is not None and not {"title", "description"} & set(update_fields):
+            return False
+        return getattr(self, "_search_text", None) != (self.title, self.description)
 
-            if pil_image.width > max_width:
-                ratio = max_width / pil_image.width
-                new_height = int(pil_image.height * ratio)
-                pil_image = pil_image.resize((max_width, new_height), Image.Resampling.LANCZOS)
+    def save(self, *args, **kwargs):
+        """
+        保存時の処理：抜粋・公開日時設定・検索インデックス更新・画像処理ジョブ登録
 
-            output = io.BytesIO()
-            pil_image.save(output, format='JPEG', quality=85, optimize=True)
-            output.seek(0)
+        検索ベクトルはタイトル・本文が変わったときだけ更新する（いいね数などの保存では
+        UPDATE を増やさない）。
 
-            new_filename = os.path.splitext(os.path.basename(image_field.name))[0] + '.jpg'
-            return ContentFile(output.read(), name=new_filename)
-        except Exception as e:
-            print(f"画像最適化エラー: {e}")
-            return None
+        新しくアップロードされた画像はそのまま保存し、最適化は
+        ImageJob としてバックグラウンドのワーカーに任せる。
+        """
+        # 未コミットのファイル＝このsaveで新たにアップロードされた画像
+        has_new_image = bool(self.image) and not self.image._committed
+        previous_image = None
+        if has_new_image:
+            self.image_status = ImageStatus.PROCESSING
+            if self.pk is not None:
+                previous_image = (
+                    BlogPost.objects.filter(pk=self.pk).values_list("image", flat=True).first()
+                )
 
-    def save(self, *args, **kwargs):
-        """保存時の処理：画像最適化と公開日時設定"""
-        if self.pk is None:
-            if self.image:
-                optimized = self._optimize_image(self.image)
-                if optimized:
-                    self.image = optimized
+        self.excerpt = make_excerpt(self.description)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "description" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "excerpt"}
 
         if self.is_published and not self.published_at:
             self.published_at = timezone.now()
+        search_text_changed = self._search_text_changed(kwargs.get("update_fields"))
         super().save(*args, **kwargs)
+        if search_text_changed:
+            update_search_vector(self)
+            self._search_text = (self.title, self.description)
+
+        if has_new_image and previous_image and self.image.name == previous_image:
+            # 今の画像と同じ内容（同じハッシュ名）の再アップロード。保存で参照が1つ増えたが、
+            # 名前が変わらないため django_cleanup は古い参照を解放しないので、ここで解放する
+            self.image.storage.delete(previous_image)
+
+        if has_new_image:
+            from .jobs import enqueue_image_job
+
+            run_now = not settings.IMAGE_PROCESSING_ASYNC
+            enqueue_image_job(self, run_now=run_now)
+            if run_now:
+                self.refresh_from_db(fields=["image", "image_status", "image_fingerprint"])
+                # 差し替え後の画像を django_cleanup の「元のファイル」にする
+                # （処理済みの元画像を次の保存で二重に解放しない）
+                cleanup.refresh(self)
 
     def get_likes_count(self):
-        """いいねの数を取得"""
-        return self.likes.count()
+        """いいねの数を取得（非正規化カラムを使用）"""
+        return self.likes_count
 
 
 class Like(models.Model):
@@ -128,6 +208,8 @@ class Like(models.Model):
         BlogPost,
         on_delete=models.CASCADE,
         related_name="likes",
+        # blog_like_post_created_idx が先頭の blog_post で代用できる
+        db_index=False,
         verbose_name="ブログ記事",
     )
     session_key = models.CharField(max_length=40, verbose_name="セッションキー")
@@ -138,6 +220,231 @@ class Like(models.Model):
         verbose_name_plural = "いいね"
         unique_together = ("session_key", "blog_post")
         ordering = ["-created_at"]
+        indexes = [
+            # トレンドスコアの数え直しで直近のいいねだけを読む
+            models.Index(fields=["created_at"], name="blog_like_created_idx"),
+            # 記事ごとのいいねを新しい順に読む（管理画面の絞り込み・スコアの数え直し）
+            models.Index(fields=["blog_post", "-created_at"], name="blog_like_post_created_idx"),
+        ]
 
     def __str__(self):
         return f"セッション {self.session_key[:8]}... が {self.blog_post.title} にいいね"
+
+
+class LikeEvent(models.Model):
+    """いいね操作の一時記録：ライトビハインド方式で後からLikeテーブルへ反映する"""
+
+    class Action(models.TextChoices):
+        ADD = "add", "いいね"
+        REMOVE = "remove", "いいね解除"
+
+    blog_post = models.ForeignKey(
+        BlogPost,
+        on_delete=models.CASCADE,
+        related_name="like_events",
+        verbose_name="ブログ記事",
+    )
+    session_key = models.CharField(max_length=40, verbose_name="セッションキー")
+    action = models.CharField(max_length=10, choices=Action.choices, verbose_name="操作")
+    # 同じ (セッション, 記事) の操作の通し番号。同時に同じ番号を追記した側は一意制約で失敗する
+    sequence = models.PositiveIntegerField(default=1, verbose_name="通し番号")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="操作日時")
+
+    class Meta:
+        verbose_name = "いいね操作（未反映）"
+        verbose_name_plural = "いいね操作（未反映）"
+        ordering = ["id"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["session_key", "blog_post", "sequence"], name="blog_likeevent_sequence_uniq"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.session_key[:8]}... {self.get_action_display()} {self.blog_post_id}"
+
+
+class ImageJob(models.Model):
+    """画像処理ジョブ：アップロード画像の最適化を行うデータベース上のキュー"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "待機中"
+        RUNNING = "running", "処理中"
+        DONE = "done", "完了"
+        FAILED = "failed", "失敗"
+
+    blog_post = models.ForeignKey(
+        BlogPost,
+        on_delete=models.CASCADE,
+        related_name="image_jobs",
+        verbose_name="ブログ記事",
+    )
+    source_name = models.CharField(max_length=255, verbose_name="元画像")
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name="状態",
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="試行回数")
+    # reoptimize_images が登録したジョブ。ワーカーは取り出さず、失敗しても再試行しない
+    is_backfill = models.BooleanField(default=False, verbose_name="一括再処理")
+    error = models.TextField(blank=True, verbose_name="エラー内容")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="登録日時")
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name="開始日時")
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name="終了日時")
+
+    class Meta:
+        verbose_name = "画像処理ジョブ"
+        verbose_name_plural = "画像処理ジョブ"
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "created_at"], name="blog_imagejob_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.blog_post_id}: {self.source_name} ({self.get_status_display()})"
+
+
+class ImageVariant(models.Model):
+    """画像バリアント：srcset用に幅・形式ごとに生成した記事画像"""
+
+    blog_post = models.ForeignKey(
+        BlogPost,
+        on_delete=models.CASCADE,
+        related_name="image_variants",
+        verbose_name="ブログ記事",
+    )
+    image = models.ImageField(upload_to="blog_images/variants/", verbose_name="画像")
+    width = models.PositiveIntegerField(verbose_name="幅")
+    height = models.PositiveIntegerField(verbose_name="高さ")
+    format = models.CharField(max_length=10, verbose_name="形式")
+
+    class Meta:
+        verbose_name = "画像バリアント"
+        verbose_name_plural = "画像バリアント"
+        ordering = ["format", "width"]
+
+    def __str__(self):
+        return f"{self.blog_post_id}: {self.width}w ({self.format})"
+
+
+class MediaFile(models.Model):
+    """メディアファイルの参照数：内容が同じファイルを共有するために blog.storage が使う"""
+
+    name = models.CharField(max_length=255, unique=True, verbose_name="ファイル名")
+    ref_count = models.PositiveIntegerField(default=0, verbose_name="参照数")
+    size = models.PositiveBigIntegerField(default=0, verbose_name="サイズ")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="作成日時")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新日時")
+
+    class Meta:
+        verbose_name = "メディアファイル"
+        verbose_name_plural = "メディアファイル"
+        ordering = ["name"]
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class TrendingState(models.Model):
+    """トレンドスコアの基準時刻（blog.trending。1行だけ持つ）"""
+
+    epoch = models.FloatField(verbose_name="基準時刻（UNIX秒）")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新日時")
+
+    class Meta:
+        verbose_name = "トレンドスコアの基準時刻"
+        verbose_name_plural = "トレンドスコアの基準時刻"
+
+    def __str__(self):
+        return f"基準時刻 {self.epoch:.0f}"
+
+
+class RelatedPost(models.Model):
+    """関連記事：タグの重なりで求めた記事ごとの近傍（blog.related が事前計算する）"""
+
+    blog_post = models.ForeignKey(
+        BlogPost,
+        on_delete=models.CASCADE,
+        related_name="related_entries",
+        db_index=False,
+        verbose_name="ブログ記事",
+    )
+    related = models.ForeignKey(
+        BlogPost,
+        on_delete=models.CASCADE,
+        related_name="related_from",
+        verbose_name="関連記事",
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name="順位")
+    score = models.FloatField(verbose_name="類似度（Jaccard）")
+
+    class Meta:
+        verbose_name = "関連記事"
+        verbose_name_plural = "関連記事"
+        ordering = ["blog_post", "rank"]
+        constraints = [
+            # 関連記事の取得はこのインデックスの範囲スキャン1回（blog_post の単独インデックスは不要）
+            models.UniqueConstraint(fields=["blog_post", "rank"], name="blog_related_rank_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.blog_post_id} -> {self.related_id} ({self.score:.2f})"
+
+
+class ArchiveMonth(models.Model):
+    """月別アーカイブ：月ごとの公開記事数（blog.archive が公開・非公開・削除のたびに数え直す）"""
+
+    month = models.DateField(unique=True, verbose_name="月（1日）")
+    post_count = models.PositiveIntegerField(default=0, verbose_name="公開記事数")
+
+    class Meta:
+        verbose_name = "月別アーカイブ"
+        verbose_name_plural = "月別アーカイブ"
+        ordering = ["-month"]
+
+    def __str__(self):
+        return f"{self.month:%Y-%m} ({self.post_count})"
+
+
+class BackfillCheckpoint(models.Model):
+    """一括処理コマンドの進捗：中断しても続きの記事から再開するために記録する"""
+
+    name = models.CharField(max_length=100, unique=True, verbose_name="処理名")
+    # 処理の設定が変わったら最初からやり直す
+    fingerprint = models.CharField(max_length=64, blank=True, verbose_name="設定の指紋")
+    last_pk = models.PositiveBigIntegerField(default=0, verbose_name="処理済みの最後の記事ID")
+    processed = models.PositiveIntegerField(default=0, verbose_name="処理件数")
+    failed = models.PositiveIntegerField(default=0, verbose_name="失敗件数")
+    bytes_saved = models.BigIntegerField(default=0, verbose_name="削減バイト数")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新日時")
+
+    class Meta:
+        verbose_name = "一括処理の進捗"
+        verbose_name_plural = "一括処理の進捗"
+
+    def __str__(self):
+        return f"{self.name}: {self.last_pk}"
+
+
+class SnapshotUpdate(models.Model):
+    """静的スナップショットの更新待ち：変更と同じトランザクションで積み、ワーカーが書き出す（blog.snapshots）"""
+
+    class Kind(models.TextChoices):
+        POST = "post", "記事"
+        LIKES = "likes", "いいね数"
+        TAG_LIST = "tag_list", "タグ一覧"
+
+    kind = models.CharField(max_length=10, choices=Kind.choices, verbose_name="種類")
+    # 削除された記事のファイルも消すため外部キーにしない
+    post_id = models.PositiveBigIntegerField(blank=True, null=True, verbose_name="記事ID")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="登録日時")
+
+    class Meta:
+        verbose_name = "スナップショットの更新待ち"
+        verbose_name_plural = "スナップショットの更新待ち"
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.post_id or ''}"
@@ -0,0 +1,235 @@
+# blog/pagination.py
+
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from .search import SEARCH_PARAM
+
+
+def estimate_count(queryset):
+    """
+    PostgreSQL の実行計画から推定行数を得る（推定できなければ None）
+
+    EXPLAIN はクエリを実行しないため、統計情報を引くだけのコストで済む。
+    """
+    if not isinstance(queryset, QuerySet):
+        return None
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.get_compiler(using=queryset.db).as_sql()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    管理画面の一覧用ページネーター
+
+    絞り込みのない一覧で、推定行数が ADMIN_ESTIMATED_COUNT_THRESHOLD 以上なら
+    COUNT(*) をせずに推定値を件数とする（大きなテーブルの全件走査を避ける）。
+    絞り込み・検索の結果は推定が大きく外れうるため、しきい値未満や
+    PostgreSQL 以外と同じく正確に数える。ModelAdmin 側でも
+    show_full_result_count = False にして絞り込み前の件数を数えないこと。
+    """
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet) or self.object_list.query.where:
+            return super().count
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+            return super().count
+        return estimate
+
+
+class KeysetPagination(BasePagination):
+    """
+    (created_at, id) の降順によるカーソル（キーセット）ページネーション
+
+    総件数の COUNT(*) も OFFSET も使わず、前ページ最後の記事より
+    古いものを page_size + 1 件だけ取得するため、どれだけ深く
+    スクロールしても1ページのコストは一定。並び順は新しい順に固定で、
+    ほかの並び順は BlogPostPagination が受け付けない。
+    """
+
+    page_size = 9
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "カーソルが不正です"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        results = list(self._page_queryset(queryset, request))
+        return self._set_page(results)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset の非同期版（blog.async_views 用）"""
+        results = [row async for row in self._page_queryset(queryset, request)]
+        return self._set_page(results)
+
+    def _page_queryset(self, queryset, request):
+        """次ページの有無を判定するため page_size + 1 件を取るクエリセット"""
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+
+        queryset = queryset.order_by("-created_at", "-id")
+        position = self.decode_cursor(request)
+        if position is not None:
+            created_at, pk = position
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+            )
+        return queryset[: self.page_size + 1]
+
+    def _set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, self.encode_cursor(last)
+        )
+
+    def encode_cursor(self, post):
+        """記事（モデルまたは values() の行）の (created_at, id) をURLセーフな文字列にする"""
+        if isinstance(post, dict):
+            created_at, pk = post["created_at"], post["id"]
+        else:
+            created_at, pk = post.created_at, post.pk
+        raw = json.dumps([created_at.isoformat(), pk])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, request):
+        """カーソル文字列を (created_at, id) に戻す（未指定なら None）"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            created_at, pk = json.loads(base64.urlsafe_b64decode(padded))
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class AsyncPageNumberPagination(PageNumberPagination):
+    """ページ番号方式（非同期ORMで件数とページを取得する apaginate_queryset 付き）"""
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset の非同期版（blog.async_views 用）"""
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # Paginator.count（cached_property）を非同期のCOUNTで先に埋めておく
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            number = paginator.validate_number(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            raise NotFound(msg)
+
+        bottom = (number - 1) * page_size
+        rows = [row async for row in queryset[bottom:bottom + page_size]]
+        self.page = paginator._get_page(rows, number, paginator)
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class BlogPostPagination(BasePagination):
+    """
+    記事一覧のページネーション
+
+    既定は従来どおりのページ番号方式。?pagination=cursor または
+    ?cursor= を付けたリクエストだけキーセット方式に切り替える。
+
+    キーセット方式は新しい順でしか辿れないため、?ordering=（-created_at 以外）や
+    ?ordering= なしの全文検索 ?q=（関連度順）と一緒に指定されたら、黙って
+    並び順を変えずに 400 を返す（ページ番号方式なら同じ条件で使える）。
+    """
+
+    mode_query_param = "pagination"
+    keyset_ordering = "-created_at"
+    unsupported_ordering_message = "カーソル方式は新しい順（ordering=-created_at）でのみ使えます"
+
+    def __init__(self):
+        self.page_number = AsyncPageNumberPagination()
+        self.keyset = KeysetPagination()
+        self.paginator = self.page_number
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self._select(request)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self._select(request)
+        return await self.paginator.apaginate_queryset(queryset, request, view)
+
+    def _select(self, request):
+        if (
+            request.query_params.get(self.mode_query_param) == "cursor"
+            or self.keyset.cursor_query_param in request.query_params
+        ):
+            self._check_keyset_ordering(request)
+            self.paginator = self.keyset
+        else:
+            self.paginator = self.page_number
+
+    def _check_keyset_ordering(self, request):
+        ordering = request.query_params.get("ordering", "").strip()
+        ranked = not ordering and request.query_params.get(SEARCH_PARAM, "").strip()
+        if ranked or ordering not in ("", self.keyset_ordering):
+            raise ParseError(self.unsupported_ordering_message)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.page_number.get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return self.page_number.get_schema_operation_parameters(view)
+
+    @property
+    def display_page_controls(self):
+        return getattr(self.paginator, "display_page_controls", False)
+
+    def to_html(self):
+        return self.paginator.to_html()
@@ -0,0 +1,191 @@
+# blog/related.py
+
+"""
+関連記事（RelatedPost）の事前計算
+
+公開記事どうしの類似度はタグ集合の Jaccard 係数 |A∩B| / |A∪B| とし、
+同点なら新しい記事を優先して、記事ごとに上位 RELATED_POSTS_LIMIT 件を保存する。
+リクエスト時は (blog_post, rank) のインデックスを1回引くだけになる。
+
+候補はタグごとに新しい RELATED_CANDIDATES_PER_TAG 件の公開記事に限る。
+記事の多いタグでも、1件あたりの計算量がタグの記事数に比例して増えないようにするため。
+
+タグ付けや公開状態が変わった記事は refresh で更新する。その記事自身の一覧は
+候補から数え直すが、候補側の記事の一覧には変わった記事の1行を入れる・外すだけで
+数え直さない（外した後の穴も埋めない）。候補側の一覧は近似になるため、
+rebuild_related_posts を定期的に実行して全件を作り直す。
+"""
+
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from . import cache
+from .models import BlogPost, RelatedPost
+
+CREATE_BATCH_SIZE = 1000
+
+
+def _published_tags(**filters):
+    """公開記事の中間テーブルの行（記事ID, タグID）"""
+    return (
+        BlogPost.tags.through.objects.filter(blogpost__is_published=True, **filters)
+        .order_by()
+        .values_list("blogpost_id", "tag_id")
+    )
+
+
+def _jaccard(shared, size, other_size):
+    return shared / (size + other_size - shared)
+
+
+def _entries(post_id, neighbors):
+    """[(係数, 作成日時, 記事ID)]（上位から）を RelatedPost の行にする"""
+    return [
+        RelatedPost(blog_post_id=post_id, related_id=other, rank=rank, score=score)
+        for rank, (score, _, other) in enumerate(neighbors, start=1)
+    ]
+
+
+def _candidates(tag_ids, post_id):
+    """タグごとに新しい公開記事を RELATED_CANDIDATES_PER_TAG 件まで集めた候補"""
+    limit = settings.RELATED_CANDIDATES_PER_TAG
+    candidates = set()
+    for tag_id in tag_ids:
+        candidates.update(
+            _published_tags(tag_id=tag_id)
+            .order_by("-blogpost__created_at", "-blogpost_id")
+            .values_list("blogpost_id", flat=True)[:limit]
+        )
+    candidates.discard(post_id)
+    return candidates
+
+
+def _scores(post_id, tag_ids):
+    """候補ごとの係数と作成日時 {記事ID: (係数, 作成日時)}"""
+    candidates = _candidates(tag_ids, post_id)
+    if not candidates:
+        return {}
+    through = BlogPost.tags.through.objects.order_by()
+    shared = dict(
+        through.filter(blogpost_id__in=candidates, tag_id__in=tag_ids)
+        .values("blogpost_id")
+        .annotate(n=Count("tag_id"))
+        .values_list("blogpost_id", "n")
+    )
+    sizes = dict(
+        through.filter(blogpost_id__in=candidates)
+        .values("blogpost_id")
+        .annotate(n=Count("tag_id"))
+        .values_list("blogpost_id", "n")
+    )
+    created = BlogPost.objects.filter(pk__in=candidates).values_list("pk", "created_at")
+    return {
+        pk: (_jaccard(shared[pk], len(tag_ids), sizes[pk]), created_at.timestamp())
+        for pk, created_at in created
+    }
+
+
+def refresh_post(post_id):
+    """
+    1件の記事のタグ・公開状態の変更を関連記事に反映する
+
+    この記事の一覧は候補から作り直す。候補の記事の一覧は、今の上位 N 件の
+    最下位とこの記事の係数を比べて入れ替えるだけにする。候補でなくなった記事
+    （タグを共有しなくなった・この記事が非公開になった）の一覧からはこの記事を外す。
+    """
+    limit = settings.RELATED_POSTS_LIMIT
+    tag_ids = set(_published_tags(blogpost_id=post_id).values_list("tag_id", flat=True))
+    scores = _scores(post_id, tag_ids)
+    own = heapq.nlargest(limit, ((score, created, pk) for pk, (score, created) in scores.items()))
+    post_created = (
+        BlogPost.objects.filter(pk=post_id).values_list("created_at", flat=True).first()
+        if scores else None
+    )
+
+    owners = set(scores).union(
+        RelatedPost.objects.filter(related_id=post_id).values_list("blog_post_id", flat=True)
+    )
+    current = defaultdict(list)
+    rows = RelatedPost.objects.filter(blog_post_id__in=owners).values_list(
+        "blog_post_id", "related_id", "score", "related__created_at"
+    )
+    for owner, other, score, created_at in rows:
+        current[owner].append((score, created_at.timestamp(), other))
+
+    changed = {}
+    for owner in owners:
+        before = sorted(current.get(owner, []), reverse=True)
+        entries = [entry for entry in before if entry[2] != post_id]
+        if owner in scores:
+            entries.append((scores[owner][0], post_created.timestamp(), post_id))
+        after = heapq.nlargest(limit, entries)
+        if after != before:
+            changed[owner] = after
+
+    with transaction.atomic():
+        RelatedPost.objects.filter(blog_post_id__in=[post_id, *changed]).delete()
+        RelatedPost.objects.bulk_create(
+            [
+                *_entries(post_id, own),
+                *(entry for owner, after in changed.items() for entry in _entries(owner, after)),
+            ],
+            batch_size=CREATE_BATCH_SIZE,
+        )
+
+
+def refresh(post_ids):
+    """記事のタグや公開状態が変わったとき、その記事ごとに refresh_post で反映する"""
+    for post_id in set(post_ids):
+        refresh_post(post_id)
+
+
+def compute():
+    """
+    すべての公開記事の関連記事を {記事ID: [(係数, 作成日時, 関連記事ID), ...]} で返す
+
+    候補は refresh_post と同じく、その記事の各タグで新しい順に上限件数までの記事。
+    """
+    limit = settings.RELATED_POSTS_LIMIT
+    per_tag = settings.RELATED_CANDIDATES_PER_TAG
+    created = {
+        pk: created_at.timestamp()
+        for pk, created_at in BlogPost.objects.filter(is_published=True).values_list("pk", "created_at")
+    }
+    tags_of = defaultdict(set)
+    posts_of = defaultdict(list)
+    for post_id, tag_id in _published_tags():
+        tags_of[post_id].add(tag_id)
+        posts_of[tag_id].append(post_id)
+    for tag_id, post_ids in posts_of.items():
+        if len(post_ids) > per_tag:
+            posts_of[tag_id] = heapq.nlargest(per_tag, post_ids, key=lambda pk: (created[pk], pk))
+
+    related = {}
+    for post_id, tag_ids in tags_of.items():
+        candidates = set().union(*(posts_of[tag_id] for tag_id in tag_ids))
+        candidates.discard(post_id)
+        scored = (
+            (
+                _jaccard(len(tag_ids & tags_of[other]), len(tag_ids), len(tags_of[other])),
+                created[other],
+                other,
+            )
+            for other in candidates
+        )
+        related[post_id] = heapq.nlargest(limit, scored)
+    return related
+
+
+def rebuild():
+    """すべての公開記事の関連記事を作り直し、保存した行数を返す"""
+    related = compute()
+    entries = [entry for post_id, neighbors in related.items() for entry in _entries(post_id, neighbors)]
+    with transaction.atomic():
+        RelatedPost.objects.all().delete()
+        RelatedPost.objects.bulk_create(entries, batch_size=CREATE_BATCH_SIZE)
+    cache.invalidate(cache.POSTS)
+    return len(entries)
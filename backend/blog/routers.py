@@ -0,0 +1,78 @@
+# blog/routers.py
+
+"""
+読み取りレプリカへの振り分け
+
+レプリカ（settings.DATABASE_REPLICAS）を読むのは、記事・タグのビューセットが
+キャッシュにないレスポンスを作るとき（blog.cache.CachedResponseMixin）だけ。
+それ以外の読み取り（いいね・いいね状態・管理画面・コマンド・シグナル）と
+すべての書き込みはプライマリ（default）で行う。
+
+レスポンスが依存するスコープ（blog.cache）が REPLICA_LAG_SECONDS 以内に
+無効化されていた場合もプライマリを読む。いいねや記事の更新の直後に
+レプリカの遅れた値を返したり、それをキャッシュに載せたりしないため。
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# レプリカから読んでよいアプリ（セッション・ユーザーは常にプライマリ）
+REPLICA_APP_LABELS = {"blog"}
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def can_read_replica(last_modified):
+    """最後の無効化（UNIX秒）からレプリカの遅延の上限を過ぎているか"""
+    if not settings.DATABASE_REPLICAS:
+        return False
+    if last_modified is None:
+        return True
+    return last_modified < time.time() - settings.REPLICA_LAG_SECONDS
+
+
+@contextmanager
+def read_from_replica(enabled=True):
+    """with の中の読み取りをレプリカに振り分ける（enabled が False なら何もしない）"""
+    if not enabled:
+        yield
+        return
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    """read_from_replica() の中の blog の読み取りだけをレプリカに送るルーター"""
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _replica_reads.get():
+            return None
+        if model._meta.app_label not in REPLICA_APP_LABELS:
+            return None
+        # トランザクション中は書き込んだ内容が見えるようにプライマリを読む
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # レプリカから読んだオブジェクトを保存するときもプライマリに書く
+        instance = hints.get("instance")
+        if instance is not None and instance._state.db in settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # レプリカはプライマリの複製なので、どちらから読んだオブジェクトも関連付けてよい
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,195 @@
+# blog/search.py
+
+"""
+記事の全文検索
+
+PostgreSQLの標準パーサーは日本語を単語に分割できないため、
+本文をPython側で正規化し「英数字は単語単位・それ以外は文字バイグラム」に
+分解したトークン列を 'simple' 設定の tsvector として保存する。
+検索語も同じ規則でトークン化し、同じ連続文字列から得たバイグラムは
+隣接演算子 (<->) で、別の語同士は AND (&) で結んで GIN インデックスを引く。
+"""
+
+import html
+import re
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q, TextField, Value
+from rest_framework.filters import BaseFilterBackend
+
+SEARCH_CONFIG = "simple"
+SEARCH_PARAM = "q"
+
+# 英数字の連続は1トークン、それ以外の文字（かな・漢字など）の連続はバイグラムに分割
+_WORD_RE = re.compile(r"[0-9a-z]+|[^\W0-9a-z_]+")
+
+
+def normalize(text):
+    """全角・半角や大文字小文字の揺れを吸収する"""
+    return unicodedata.normalize("NFKC", text or "").lower()
+
+
+def _split_runs(text):
+    """正規化済みテキストを英数字・非英数字の連続（ラン）に分ける"""
+    return _WORD_RE.findall(normalize(text))
+
+
+def _run_tokens(run):
+    """1つのランをトークン列に変換する"""
+    if run.isascii():
+        return [run]
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text):
+    """テキストを検索用トークンのリストに変換する"""
+    tokens = []
+    for run in _split_runs(text):
+        tokens.extend(_run_tokens(run))
+    return tokens
+
+
+def build_tsquery(query):
+    """
+    検索語から to_tsquery 用の文字列を組み立てる（該当なしなら空文字）
+
+    英単語と1文字だけの語は前方一致 (:*) にする。1文字の語は
+    その文字で始まるバイグラムにのみ一致する点に注意。
+    """
+    clauses = []
+    for run in _split_runs(query):
+        tokens = _run_tokens(run)
+        if run.isascii() or len(run) == 1:
+            clauses.append("'%s':*" % tokens[0])
+        else:
+            clauses.append(" <-> ".join("'%s'" % token for token in tokens))
+    return " & ".join(clauses)
+
+
+def search_vector_for(title, description):
+    """タイトル（重みA）と本文（重みB）から tsvector の式を作る"""
+    return SearchVector(
+        Value(" ".join(tokenize(title)), output_field=TextField()),
+        weight="A",
+        config=SEARCH_CONFIG,
+    ) + SearchVector(
+        Value(" ".join(tokenize(description)), output_field=TextField()),
+        weight="B",
+        config=SEARCH_CONFIG,
+    )
+
+
+def is_supported():
+    """tsvector による検索が使えるデータベースかどうか"""
+    return connection.vendor == "postgresql"
+
+
+def update_search_vector(post):
+    """1件の記事の search_vector を更新する"""
+    if not is_supported():
+        return
+    type(post).objects.filter(pk=post.pk).update(
+        search_vector=search_vector_for(post.title, post.description)
+    )
+
+
+def rebuild_search_vectors(queryset, batch_size=500):
+    """クエリセット内の記事の search_vector をまとめて再計算し、更新件数を返す"""
+    if not is_supported():
+        return 0
+    model = queryset.model
+    updated = 0
+    batch = []
+    for post in queryset.only("pk", "title", "description").iterator(chunk_size=batch_size):
+        post.search_vector = search_vector_for(post.title, post.description)
+        batch.append(post)
+        if len(batch) >= batch_size:
+            updated += model.objects.bulk_update(batch, ["search_vector"])
+            batch = []
+    if batch:
+        updated += model.objects.bulk_update(batch, ["search_vector"])
+    return updated
+
+
+def search_posts(queryset, query):
+    """記事クエリセットを検索語で絞り込み、関連度 (search_rank) を付与する"""
+    tsquery = build_tsquery(query)
+    if not tsquery:
+        return queryset.none()
+
+    if not is_supported():
+        # PostgreSQL以外（ローカルのSQLiteなど）では従来どおりの部分一致検索
+        condition = Q()
+        for term in query.split():
+            condition &= Q(title__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(condition)
+
+    search_query = SearchQuery(tsquery, search_type="raw", config=SEARCH_CONFIG)
+    return queryset.filter(search_vector=search_query).annotate(
+        search_rank=SearchRank(F("search_vector"), search_query)
+    )
+
+
+def highlight(text, query, width=80):
+    """
+    本文から検索語の周辺を抜き出し、一致箇所を <mark> で囲んだスニペットを返す
+
+    ts_headline は日本語を分割できないため、ページ内の記事に対してのみ
+    Python側で生成する。戻り値はHTMLエスケープ済み。
+    """
+    terms = sorted({term for term in normalize(query).split() if term}, key=len, reverse=True)
+    if not text or not terms:
+        return None
+
+    # 表示用はNFKCのみ、照合用はさらに小文字化（文字数が変わる場合は大小区別で照合）
+    text = unicodedata.normalize("NFKC", text)
+    normalized = text.lower()
+    if len(normalized) != len(text):
+        normalized = text
+
+    positions = [normalized.find(term) for term in terms]
+    positions = [pos for pos in positions if pos >= 0]
+    if not positions:
+        return None
+
+    first = min(positions)
+    start = max(first - width // 2, 0)
+    end = min(start + width, len(text))
+    snippet = text[start:end]
+    lowered = normalized[start:end]
+
+    pattern = re.compile("|".join(re.escape(term) for term in terms))
+    parts = []
+    last = 0
+    for match in pattern.finditer(lowered):
+        parts.append(html.escape(snippet[last:match.start()]))
+        parts.append("<mark>%s</mark>" % html.escape(snippet[match.start():match.end()]))
+        last = match.end()
+    parts.append(html.escape(snippet[last:]))
+
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(text) else ""
+    return prefix + "".join(parts) + suffix
+
+
+class FullTextSearchFilter(BaseFilterBackend):
+    """
+    ?q= による全文検索フィルター
+
+    ordering パラメータが指定されていなければ関連度順に並べ替える。
+    OrderingFilter より後ろに置くこと。
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(SEARCH_PARAM, "").strip()
+        if not query:
+            return queryset
+
+        queryset = search_posts(queryset, query)
+        if not request.query_params.get("ordering") and is_supported():
+            queryset = queryset.order_by("-search_rank", "-created_at")
+        return queryset
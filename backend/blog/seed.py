@@ -0,0 +1,301 @@
+# blog/seed.py
+
+"""
+ベンチマーク・テスト用のデータ生成
+
+BlogPost.save() を通さずに記事・タグ付け・いいねを作る（画像処理や
+シグナルを走らせない）。抜粋・検索ベクトル・いいね数・タグの公開記事数など
+save() やシグナルが維持する値は生成時に計算するか、まとめて埋め直す。
+同じ seed なら同じ内容になる。
+
+seed_corpus はテストや小規模なベンチマーク向け（bulk_create）。ベンチマークは
+計測後に delete_posts・delete_sessions で作ったデータを消す。
+seed_chunk は seed_blog コマンドが数百万件を作るための塊単位の生成で、
+PostgreSQL では COPY で流し込み、ワーカープロセスから並列に呼ばれる。
+"""
+
+import csv
+import io
+import random
+import uuid
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.db import connection, transaction
+
+from . import archive, cache, related, trending
+from .likes import actual_likes_count
+from .models import BlogPost, ImageStatus, Like, LikeEvent, Tag, make_excerpt
+from .search import is_supported, rebuild_search_vectors
+from .tags import actual_published_post_count
+
+# 本文を組み立てる語彙
+WORDS = [
+    "東京", "京都", "旅行", "写真", "カメラ", "料理", "レシピ", "プログラミング",
+    "パイソン", "データベース", "検索", "インデックス", "猫", "散歩", "季節",
+    "桜", "紅葉", "ラーメン", "コーヒー", "読書", "映画", "音楽", "Django",
+    "PostgreSQL", "React", "Next.js", "開発", "設計", "性能", "改善",
+]
+
+BATCH_SIZE = 2000
+
+
+def make_title(rng):
+    return "".join(rng.choices(WORDS, k=3))
+
+
+def make_body(rng, sentences=(20, 80)):
+    """Markdown の見出しを含む日本語の本文"""
+    lines = [f"# {make_title(rng)}"]
+    lines += ["".join(rng.choices(WORDS, k=8)) + "。" for _ in range(rng.randint(*sentences))]
+    return "\n".join(lines)
+
+
+def seed_tags(count):
+    """seed-tag-0001 形式のタグを count 個用意して返す"""
+    names = [f"seed-tag-{i:04d}" for i in range(1, count + 1)]
+    Tag.objects.bulk_create([Tag(name=name) for name in names], ignore_conflicts=True)
+    return list(Tag.objects.filter(name__in=names).order_by("name"))
+
+
+def seed_corpus(posts, tags=20, tags_per_post=(1, 3), likes_per_post=(0, 5), seed=0):
+    """
+    記事 posts 件と、そのタグ付け・いいねを作成し、作成した記事のIDを返す
+
+    タグは tags 個の中から記事ごとに tags_per_post の範囲で選び、
+    いいねは likes_per_post の範囲の件数を別々のセッションキーで付ける。
+    """
+    rng = random.Random(seed)
+    author, _ = User.objects.get_or_create(username="benchmark")
+    tag_ids = [tag.pk for tag in seed_tags(tags)] if tags else []
+    through = BlogPost.tags.through
+
+    post_ids = []
+    for offset in range(0, posts, BATCH_SIZE):
+        batch = []
+        for _ in range(min(BATCH_SIZE, posts - offset)):
+            description = make_body(rng)
+            batch.append(
+                BlogPost(
+                    author=author,
+                    title=make_title(rng),
+                    description=description,
+                    excerpt=make_excerpt(description),
+                    is_published=rng.random() < 0.95,
+                )
+            )
+        created = BlogPost.objects.bulk_create(batch)
+        if created and created[0].pk is None:
+            # 主キーを返せないDBでは作成直後の最新 len(batch) 件を対象にする
+            created = list(BlogPost.objects.order_by("-pk")[: len(batch)])[::-1]
+
+        links, like_rows = [], []
+        for post in created:
+            if tag_ids:
+                count = min(rng.randint(*tags_per_post), len(tag_ids))
+                links += [
+                    through(blogpost_id=post.pk, tag_id=tag_id)
+                    for tag_id in rng.sample(tag_ids, count)
+                ]
+            like_rows += [
+                Like(blog_post_id=post.pk, session_key=uuid.UUID(int=rng.getrandbits(128)).hex)
+                for _ in range(rng.randint(*likes_per_post))
+            ]
+        through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+        Like.objects.bulk_create(like_rows, batch_size=BATCH_SIZE, ignore_conflicts=True)
+        post_ids += [post.pk for post in created]
+
+    refresh_denormalized(post_ids)
+    return post_ids
+
+
+def refresh_denormalized(post_ids):
+    """
+    bulk_create では維持されない集計値・トレンドスコア・月別アーカイブ・関連記事と
+    検索ベクトルを埋め直し、キャッシュを無効化する
+    """
+    if not post_ids:
+        return
+    new_posts = BlogPost.objects.filter(pk__range=(min(post_ids), max(post_ids)))
+    new_posts.update(likes_count=actual_likes_count())
+    Tag.objects.update(published_post_count=actual_published_post_count())
+    trending.redecay()
+    archive.rebuild()
+    related.rebuild()
+    if is_supported():
+        rebuild_search_vectors(new_posts)
+    cache.invalidate(cache.POSTS, cache.TAGS)
+
+
+def delete_posts(post_ids):
+    """生成した記事をいいね・タグ付けごと削除する（ベンチマークの後片付け）"""
+    post_ids = list(post_ids)
+    for start in range(0, len(post_ids), BATCH_SIZE):
+        BlogPost.objects.filter(pk__in=post_ids[start:start + BATCH_SIZE]).delete()
+
+
+def delete_sessions(session_keys):
+    """
+    計測のリクエストが作ったセッションと、そのいいね・未反映の操作を削除する
+
+    いいねされていた記事はいいね数とトレンドスコアを数え直す。
+    """
+    keys = list(session_keys)
+    if not keys:
+        return
+    post_ids = set(Like.objects.filter(session_key__in=keys).values_list("blog_post_id", flat=True))
+    post_ids.update(LikeEvent.objects.filter(session_key__in=keys).values_list("blog_post_id", flat=True))
+    LikeEvent.objects.filter(session_key__in=keys).delete()
+    Like.objects.filter(session_key__in=keys).delete()
+    Session.objects.filter(session_key__in=keys).delete()
+    BlogPost.objects.filter(pk__in=post_ids).update(likes_count=actual_likes_count())
+    trending.refresh_scores(post_ids)
+    cache.invalidate(cache.POSTS)
+
+
+def zipf_likes(rng, alpha, limit):
+    """
+    いいね数をべき分布（Zipf 型）から引く
+
+    大半の記事は 0〜数件で、ごく一部の記事に数千件が集中する。
+    alpha が小さいほど裾が重い。
+    """
+    return min(int(rng.paretovariate(alpha)) - 1, limit)
+
+
+def tag_weights(count, exponent=1.1):
+    """人気順位に対する Zipf 型の重み（rng.choices の cum_weights 用）"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def generate_chunk(index, size, params):
+    """
+    index 番目の塊（size 件）の記事・タグ付け・いいねの行を作る
+
+    乱数は (seed, index) から作るので、ワーカー数や実行順に関係なく同じ内容になる。
+    記事はまだIDを持たないため、タグ付けといいねは塊内の記事番号で返す。
+    """
+    rng = random.Random(f"{params['seed']}:{index}")
+    end = params["end"]
+    span = int(timedelta(days=params["days"]).total_seconds())
+    tag_ids = params["tag_ids"]
+    cum_weights = tag_weights(len(tag_ids)) if tag_ids else None
+    min_tags, max_tags = params["tags_per_post"]
+
+    posts, links, likes = [], [], []
+    for number in range(size):
+        created_at = end - timedelta(seconds=rng.randrange(span))
+        is_published = rng.random() < params["published_ratio"]
+        description = make_body(rng, params["sentences"])
+        like_count = zipf_likes(rng, params["likes_alpha"], params["max_likes"])
+        posts.append({
+            "title": make_title(rng),
+            "description": description,
+            "excerpt": make_excerpt(description),
+            "created_at": created_at,
+            "updated_at": created_at + timedelta(seconds=rng.randrange(86400)),
+            "is_published": is_published,
+            "published_at": created_at if is_published else None,
+            "likes_count": like_count,
+        })
+        if tag_ids:
+            chosen = rng.choices(tag_ids, cum_weights=cum_weights, k=rng.randint(min_tags, max_tags))
+            links += [(number, tag_id) for tag_id in dict.fromkeys(chosen)]
+        elapsed = max(int((end - created_at).total_seconds()), 1)
+        likes += [
+            (
+                number,
+                uuid.UUID(int=rng.getrandbits(128)).hex,
+                created_at + timedelta(seconds=rng.randrange(elapsed)),
+            )
+            for _ in range(like_count)
+        ]
+    return posts, links, likes
+
+
+def seed_chunk(index, size, params):
+    """塊を生成してデータベースに書き込み、(記事数, タグ付け数, いいね数) を返す"""
+    posts, links, likes = generate_chunk(index, size, params)
+    ids = _allocate_ids(BlogPost, len(posts))
+    author_id = params["author_id"]
+
+    post_columns = [
+        "id", "author_id", "title", "description", "excerpt", "image", "image_status",
+        "image_fingerprint", "created_at", "updated_at", "is_published", "published_at", "likes_count",
+        "trending_score",
+    ]
+    post_rows = [
+        (
+            pk, author_id, post["title"], post["description"], post["excerpt"], "",
+            ImageStatus.READY, "", post["created_at"], post["updated_at"],
+            post["is_published"], post["published_at"], post["likes_count"], 0.0,
+        )
+        for pk, post in zip(ids, posts)
+    ]
+    link_rows = [(ids[number], tag_id) for number, tag_id in links]
+    like_rows = [(ids[number], key, created_at) for number, key, created_at in likes]
+
+    through = BlogPost.tags.through
+    with transaction.atomic():
+        _insert_rows(BlogPost, post_columns, post_rows)
+        _insert_rows(through, ["blogpost_id", "tag_id"], link_rows)
+        _insert_rows(Like, ["blog_post_id", "session_key", "created_at"], like_rows)
+    return len(post_rows), len(link_rows), len(like_rows)
+
+
+def _allocate_ids(model, count):
+    """
+    これから挿入する count 件の主キーを確保する
+
+    PostgreSQL ではシーケンスから取るので並列のワーカー同士でも重複しない。
+    それ以外のDB（SQLite など）は単一ワーカーで使う前提で最大値の続きを振る。
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [table, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"SELECT MAX(id) FROM {connection.ops.quote_name(table)}")
+        start = (cursor.fetchone()[0] or 0) + 1
+    return list(range(start, start + count))
+
+
+def _insert_rows(model, columns, rows):
+    """PostgreSQL では COPY、それ以外は executemany で行をまとめて挿入する"""
+    if not rows:
+        return
+    table = connection.ops.quote_name(model._meta.db_table)
+    quoted = ", ".join(connection.ops.quote_name(column) for column in columns)
+
+    if connection.vendor == "postgresql":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        buffer.seek(0)
+        # CSV では空文字列と NULL を区別できないため、NOT NULL の文字列カラムを指定する
+        fields = {field.column: field for field in model._meta.concrete_fields}
+        not_null = [
+            connection.ops.quote_name(column)
+            for column in columns
+            if not fields[column].null
+            and fields[column].get_internal_type() in ("CharField", "TextField", "FileField")
+        ]
+        options = "FORMAT csv"
+        if not_null:
+            options += f", FORCE_NOT_NULL ({', '.join(not_null)})"
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} ({quoted}) FROM STDIN WITH ({options})", buffer)
+        return
+
+    adapt = connection.ops.adapt_datetimefield_value
+    rows = [
+        tuple(adapt(value) if hasattr(value, "tzinfo") else value for value in row)
+        for row in rows
+    ]
+    placeholders = ", ".join(["%s"] * len(columns))
+    with connection.cursor() as cursor:
+        cursor.executemany(f"INSERT INTO {table} ({quoted}) VALUES ({placeholders})", rows)
@@ -1,7 +1,8 @@
 # blog/serializers.py
 
 from rest_framework import serializers
-from .models import BlogPost, Tag
+from .models import BlogPost, ImageVariant, Tag
+from .search import highlight
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -12,37 +13,176 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
-class BlogPostListSerializer(serializers.ModelSerializer):
+class TagWithCountSerializer(TagSerializer):
+    """
+    タグ一覧用のシリアライザー（公開記事数付き）
+
+    記事に埋め込むタグには含めない（他の記事の公開で記事のキャッシュまで
+    無効化しなくて済むように）。
+    """
+    class Meta(TagSerializer.Meta):
+        fields = ['id', 'name', 'published_post_count', 'created_at']
+        read_only_fields = ['published_post_count', 'created_at']
+
+
+class ImagesMixin:
+    """記事画像のバリアントを srcset 形式で返す images フィールドの実装"""
+
+    def get_images(self, obj):
+        """形式ごとの srcset 文字列（例: {'webp': 'url 320w, url 640w'}）"""
+        request = self.context.get('request')
+        srcset = {}
+        # prefetch_related済みの一覧を使う（追加のクエリを発行しない）
+        for variant in obj.image_variants.all():
+            url = variant.image.url
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            srcset.setdefault(variant.format, []).append(f"{url} {variant.width}w")
+        return {fmt: ', '.join(entries) for fmt, entries in srcset.items()}
+
+
+class BlogPostListSerializer(ImagesMixin, serializers.ModelSerializer):
     """ブログ記事一覧用のシリアライザー"""
     tags = TagSerializer(many=True, read_only=True)
     likes_count = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
+    highlight = serializers.SerializerMethodField()
 
     class Meta:
         model = BlogPost
         fields = [
-            'id', 'title', 'description', 'image',
-            'tags', 'likes_count',
+            'id', 'title', 'excerpt', 'image', 'image_status', 'images',
+            'tags', 'likes_count', 'highlight',
             'created_at', 'updated_at', 'is_published'
         ]
 
     def get_likes_count(self, obj):
-        """いいねの数を取得（annotateでキャッシュされた値を使用）"""
-        return getattr(obj, 'likes_count_cached', obj.likes.count())
+        """いいねの数を取得（非正規化カラムの値を使用）"""
+        return obj.likes_count
 
+    def get_highlight(self, obj):
+        """?q= 検索時のみ、一致箇所を <mark> で囲んだ本文スニペットを返す"""
+        query = self.context.get('search_query')
+        if not query:
+            return None
+        return highlight(obj.description, query)
 
-class BlogPostDetailSerializer(serializers.ModelSerializer):
+
+class BlogPostDetailSerializer(ImagesMixin, serializers.ModelSerializer):
     """ブログ記事詳細用のシリアライザー"""
     tags = TagSerializer(many=True, read_only=True)
     likes_count = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = BlogPost
         fields = [
-            'id', 'title', 'description', 'image',
+            'id', 'title', 'description', 'image', 'image_status', 'images',
             'tags', 'likes_count',
             'created_at', 'updated_at', 'is_published', 'published_at'
         ]
 
     def get_likes_count(self, obj):
-        """いいねの数を取得（annotateでキャッシュされた値を使用）"""
-        return getattr(obj, 'likes_count_cached', obj.likes.count())
+        """いいねの数を取得（非正規化カラムの値を使用）"""
+        return obj.likes_count
+
+
+# serialize_list_rows が values() で取得するカラム
+LIST_ROW_FIELDS = (
+    'id', 'title', 'excerpt', 'image', 'image_status', 'likes_count',
+    'created_at', 'updated_at', 'is_published',
+)
+
+
+def list_row_fields(context):
+    """一覧の高速パスで values() に渡すカラム（検索時はハイライト用に本文も取る）"""
+    if context.get('search_query'):
+        return (*LIST_ROW_FIELDS, 'description')
+    return LIST_ROW_FIELDS
+
+
+def _list_tag_rows(ids):
+    return (
+        BlogPost.tags.through.objects.filter(blogpost_id__in=ids)
+        .order_by('tag__name')
+        .values_list('blogpost_id', 'tag_id', 'tag__name', 'tag__created_at')
+    )
+
+
+def _list_variant_rows(ids):
+    return ImageVariant.objects.filter(blog_post_id__in=ids).values_list(
+        'blog_post_id', 'image', 'width', 'format'
+    )
+
+
+def serialize_list_rows(rows, context):
+    """
+    values() の行から BlogPostListSerializer と同じ形の一覧データを作る
+
+    記事ごとにモデルインスタンスとネストしたシリアライザーを作らずに済むよう、
+    タグとバリアントはページ内の記事IDでまとめて2クエリで取得する。
+    """
+    rows = list(rows)
+    if not rows:
+        return []
+    ids = [row['id'] for row in rows]
+    return build_list_data(
+        rows, list(_list_tag_rows(ids)), list(_list_variant_rows(ids)), context
+    )
+
+
+async def aserialize_list_rows(rows, context):
+    """serialize_list_rows の非同期版（タグとバリアントを非同期ORMで取得する）"""
+    if not rows:
+        return []
+    ids = [row['id'] for row in rows]
+    tag_rows = [row async for row in _list_tag_rows(ids)]
+    variant_rows = [row async for row in _list_variant_rows(ids)]
+    return build_list_data(rows, tag_rows, variant_rows, context)
+
+
+def build_list_data(rows, tag_rows, variant_rows, context):
+    """記事の行と、その記事のタグ・バリアントの行から一覧データを組み立てる（DBに触れない）"""
+    request = context.get('request')
+    query = context.get('search_query')
+    datetime_field = serializers.DateTimeField()
+    image_storage = BlogPost._meta.get_field('image').storage
+    variant_storage = ImageVariant._meta.get_field('image').storage
+
+    def absolute_url(url):
+        return request.build_absolute_uri(url) if request is not None else url
+
+    tags = {}
+    for post_id, tag_id, name, created_at in tag_rows:
+        tags.setdefault(post_id, []).append({
+            'id': tag_id,
+            'name': name,
+            'created_at': datetime_field.to_representation(created_at),
+        })
+
+    srcsets = {}
+    for post_id, name, width, fmt in variant_rows:
+        url = absolute_url(variant_storage.url(name))
+        srcsets.setdefault(post_id, {}).setdefault(fmt, []).append(f"{url} {width}w")
+
+    data = []
+    for row in rows:
+        post_id = row['id']
+        data.append({
+            'id': post_id,
+            'title': row['title'],
+            'excerpt': row['excerpt'],
+            'image': absolute_url(image_storage.url(row['image'])) if row['image'] else None,
+            'image_status': row['image_status'],
+            'images': {
+                fmt: ', '.join(entries)
+                for fmt, entries in srcsets.get(post_id, {}).items()
+            },
+            'tags': tags.get(post_id, []),
+            'likes_count': row['likes_count'],
+            'highlight': highlight(row['description'], query) if query else None,
+            'created_at': datetime_field.to_representation(row['created_at']),
+            'updated_at': datetime_field.to_representation(row['updated_at']),
+            'is_published': row['is_published'],
+        })
+    return data
@@ -0,0 +1,129 @@
+# blog/signals.py
+
+"""
+モデルの変更に合わせてAPIレスポンスキャッシュ（blog.cache）を無効化し、
+タグの公開記事数（blog.tags）・関連記事（blog.related）・月別アーカイブ（blog.archive）を
+数え直して、静的スナップショット（blog.snapshots）を更新する
+"""
+
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import archive, cache, related, snapshots
+from .models import BlogPost, Like, Tag
+from .tags import refresh_published_post_counts
+
+
+def _tag_names(post_id):
+    return list(Tag.objects.filter(blog_posts=post_id).values_list("name", flat=True))
+
+
+@receiver(pre_save, sender=BlogPost)
+def remember_published(sender, instance, update_fields=None, **kwargs):
+    # 関連記事は公開状態が変わったときだけ更新するため、保存前の値を控えておく
+    instance._was_published = None
+    if instance._state.adding:
+        return
+    if update_fields is not None and "is_published" not in update_fields:
+        instance._was_published = instance.is_published
+        return
+    instance._was_published = (
+        BlogPost.objects.filter(pk=instance.pk).values_list("is_published", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=BlogPost)
+def invalidate_post_on_save(sender, instance, created, **kwargs):
+    tag_names = _tag_names(instance.pk)
+    cache.invalidate(*cache.post_scopes(instance.pk, tag_names))
+    # 公開・非公開の切り替えでタグの公開記事数が変わる
+    refresh_published_post_counts(Tag.objects.filter(name__in=tag_names))
+    # 作成直後はタグがまだ無く、タグ付けは m2m_changed で反映する
+    if not created and instance.is_published != getattr(instance, "_was_published", None):
+        related.refresh([instance.pk])
+    archive.refresh_months([archive.month_of(instance.created_at)])
+    snapshots.schedule(posts=[instance.pk])
+
+
+@receiver(pre_delete, sender=BlogPost)
+def remember_post_tags(sender, instance, **kwargs):
+    # 削除後は中間テーブルの行も消えているため、先にタグ名を控えておく
+    instance._cache_tag_names = _tag_names(instance.pk)
+
+
+@receiver(post_delete, sender=BlogPost)
+def invalidate_post_on_delete(sender, instance, **kwargs):
+    tag_names = getattr(instance, "_cache_tag_names", [])
+    cache.invalidate(*cache.post_scopes(instance.pk, tag_names))
+    refresh_published_post_counts(Tag.objects.filter(name__in=tag_names))
+    # この記事を指す関連記事の行は CASCADE で消える（空いた順位は rebuild_related_posts で埋まる）
+    archive.refresh_months([archive.month_of(instance.created_at)])
+    snapshots.schedule(posts=[instance.pk])
+
+
+@receiver(m2m_changed, sender=BlogPost.tags.through)
+def invalidate_post_tags(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # clear() の post_clear では pk_set が渡されないため控えておく
+        if reverse:
+            instance._cache_cleared = list(instance.blog_posts.values_list("pk", flat=True))
+        else:
+            instance._cache_cleared = _tag_names(instance.pk)
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if action == "post_clear":
+        changed = getattr(instance, "_cache_cleared", [])
+    elif reverse:
+        changed = list(pk_set or [])
+    else:
+        changed = list(
+            Tag.objects.filter(pk__in=pk_set or []).values_list("name", flat=True)
+        )
+
+    if reverse:
+        # Tag側からの変更：instance はタグ、changed は記事ID
+        scopes = [cache.POST_LIST, cache.tag_scope(instance.name)]
+        scopes += [cache.post_scope(pk) for pk in changed]
+        tags = Tag.objects.filter(pk=instance.pk)
+        post_ids = changed
+    else:
+        scopes = cache.post_scopes(instance.pk, changed)
+        tags = Tag.objects.filter(name__in=changed)
+        post_ids = [instance.pk]
+    cache.invalidate(*scopes)
+    refresh_published_post_counts(tags)
+    related.refresh(post_ids)
+    snapshots.schedule(posts=post_ids)
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_post_on_like(sender, instance, **kwargs):
+    # いいね数は一覧・詳細の両方に含まれる
+    post_id = instance.blog_post_id
+    cache.invalidate(*cache.post_scopes(post_id, _tag_names(post_id)))
+    snapshots.schedule(likes=[post_id])
+
+
+@receiver(pre_delete, sender=Tag)
+def remember_tag_posts(sender, instance, **kwargs):
+    # 削除時の中間テーブルの行には m2m_changed が送られないため記事を控えておく
+    instance._deleted_post_ids = list(instance.blog_posts.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag(sender, instance, **kwargs):
+    # タグ名は記事のレスポンスにも埋め込まれているため記事系もまとめて無効化
+    cache.invalidate(cache.TAGS, cache.POSTS)
+    deleted_post_ids = getattr(instance, "_deleted_post_ids", None)
+    if deleted_post_ids:
+        # タグの削除で記事のタグ集合が変わる
+        related.refresh(deleted_post_ids)
+    if snapshots.is_enabled():
+        post_ids = deleted_post_ids
+        if post_ids is None:
+            post_ids = instance.blog_posts.values_list("pk", flat=True)
+        snapshots.schedule(posts=post_ids, tag_list=True)
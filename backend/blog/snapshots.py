@@ -0,0 +1,414 @@
+# blog/snapshots.py
+
+r"""
+公開APIの静的JSONスナップショット
+
+記事一覧（タグ絞り込みを含む）・記事詳細・タグ一覧のレスポンスを
+settings.SNAPSHOT_ROOT にJSONファイルとして書き出し、nginx から直接
+配信できるようにする。中身はビューセットが返すものと同じバイト列になる。
+
+    posts/page-<N>.json              /api/posts/?page=N（N=1 は /api/posts/）
+    posts/tag/<タグ名>/page-<N>.json  /api/posts/?tag=<タグ名>&page=N
+    posts/<ID>.json                  /api/posts/<ID>/
+    tags.json                        /api/tags/
+
+タグ名はURLエンコードした形（%E6%97%A5... のような大文字の16進）で
+ディレクトリ名にする。一覧は先頭 SNAPSHOT_MAX_PAGES ページまでで、
+それより深いページ・検索・並べ替え・カーソル方式などはファイルが
+ないため Django が応答する（nginx の try_files でフォールバックさせる）。
+
+記事・タグ付け・タグの変更は、同じトランザクションで SnapshotUpdate に
+積むだけにして（blog.signals）、flush_snapshot_updates コマンドのワーカーが
+まとめて書き出す（リクエストの応答を書き出しで待たせない）。
+変わった記事の詳細と、その記事を含むページだけを書き直し、公開記事の増減で
+件数（count）が変わった一覧は全ページを書き直す。いいね数は
+SNAPSHOT_LIKES_TOLERANCE を超えて変わったときだけ書き直す（正確な値は
+like_status / bulk_like_status で取得する）。全体の書き出しは
+export_snapshots コマンドで行う。
+
+フロントエンド（frontend/src/lib/api-functions.ts）は一覧の空のパラメータと既定値
+（page=1・ordering=-created_at）を送らないため、絞り込み・検索のない一覧は
+クエリ文字列が下の map の形になる。それ以外（month・search・ordering 付き、
+スペースなどを + でエンコードしたタグ名）は Django が応答する。
+
+nginx の設定例（クエリ文字列がスナップショットの形と一致するときだけファイルを返す）:
+
+    map $args $posts_snapshot {
+        ""                                   /posts/page-1.json;
+        "~^page=(?<p>\d+)$"                 /posts/page-$p.json;
+        "~^tag=(?<t>[^&]+)$"                 /posts/tag/$t/page-1.json;
+        "~^page=(?<p>\d+)&tag=(?<t>[^&]+)$"  /posts/tag/$t/page-$p.json;
+        "~^tag=(?<t>[^&]+)&page=(?<p>\d+)$"  /posts/tag/$t/page-$p.json;
+        default                              /-;
+    }
+    location = /api/posts/ {
+        root <SNAPSHOT_ROOT>;
+        default_type application/json;
+        try_files $posts_snapshot @django;
+    }
+    location ~ ^/api/posts/(\d+)/$ {
+        root <SNAPSHOT_ROOT>;
+        default_type application/json;
+        try_files /posts/$1.json @django;
+    }
+"""
+
+import fcntl
+import json
+import logging
+import os
+import re
+import shutil
+from contextlib import contextmanager
+from importlib import import_module
+from urllib.parse import quote, urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.http import HttpRequest, QueryDict
+from rest_framework.mixins import ListModelMixin
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .models import BlogPost, SnapshotUpdate, Tag
+
+logger = logging.getLogger(__name__)
+
+PAGE_FILE_RE = re.compile(r"^page-(\d+)\.json$")
+DETAIL_CHUNK_SIZE = 500
+
+FLUSH_BATCH_SIZE = 1000
+
+
+def is_enabled():
+    return bool(settings.SNAPSHOT_ROOT)
+
+
+def schedule(posts=(), likes=(), tag_list=False):
+    """
+    スナップショットの更新を SnapshotUpdate に積む
+
+    posts は内容・公開状態・タグが変わった（かもしれない）記事のID、
+    likes はいいね数だけが変わった記事のID。呼び出し元のトランザクションで
+    登録するので、ロールバックされた変更は書き出されない。
+    SNAPSHOT_UPDATE_ASYNC が False ならコミット後にその場で書き出す。
+    """
+    if not is_enabled():
+        return
+    Kind = SnapshotUpdate.Kind
+    rows = [SnapshotUpdate(kind=Kind.POST, post_id=pk) for pk in set(posts)]
+    rows += [SnapshotUpdate(kind=Kind.LIKES, post_id=pk) for pk in set(likes)]
+    if tag_list:
+        rows.append(SnapshotUpdate(kind=Kind.TAG_LIST))
+    if not rows:
+        return
+    SnapshotUpdate.objects.bulk_create(rows, batch_size=FLUSH_BATCH_SIZE)
+    if not settings.SNAPSHOT_UPDATE_ASYNC:
+        transaction.on_commit(_flush_now)
+
+
+def _flush_now():
+    try:
+        while flush_updates():
+            pass
+    except Exception:
+        # 書き出しの失敗でコミット済みのリクエストをエラーにしない（更新待ちは残る）
+        logger.exception("スナップショットの更新に失敗しました")
+
+
+def flush_updates(batch_size=FLUSH_BATCH_SIZE):
+    """
+    更新待ちを古い順に最大 batch_size 件書き出し、処理した件数を返す
+
+    書き出しに失敗したら更新待ちを消さずに残し、次の呼び出しで処理し直す。
+    """
+    with transaction.atomic():
+        rows = list(
+            SnapshotUpdate.objects.select_for_update(skip_locked=True).order_by("id")[:batch_size]
+        )
+        if not rows:
+            return 0
+        Kind = SnapshotUpdate.Kind
+        update(
+            posts={row.post_id for row in rows if row.kind == Kind.POST},
+            likes={row.post_id for row in rows if row.kind == Kind.LIKES},
+            tag_list=any(row.kind == Kind.TAG_LIST for row in rows),
+        )
+        SnapshotUpdate.objects.filter(pk__in=[row.pk for row in rows]).delete()
+    return len(rows)
+
+
+class _SnapshotRequest(HttpRequest):
+    """レスポンスの生成に使う最小限の GET リクエスト（SNAPSHOT_BASE_URL のスキーム・ホストで URL を作る）"""
+
+    def __init__(self, base_url, path, params=None):
+        super().__init__()
+        query = urlencode(params or {})
+        self.method = "GET"
+        self.path = self.path_info = path
+        self.GET = QueryDict(query)
+        self.META = {
+            "HTTP_HOST": base_url.netloc,
+            "HTTP_ACCEPT": "application/json",
+            "QUERY_STRING": query,
+        }
+        self._scheme = base_url.scheme
+
+    def _get_scheme(self):
+        return self._scheme
+
+
+class Snapshot:
+    """スナップショットのディレクトリへの読み書きとAPIレスポンスの生成"""
+
+    def __init__(self, root=None, max_pages=None):
+        self.root = os.fspath(root or settings.SNAPSHOT_ROOT)
+        self.max_pages = max_pages or settings.SNAPSHOT_MAX_PAGES
+        self.page_size = api_settings.PAGE_SIZE
+        self.written = self.removed = 0
+
+        self._base_url = urlsplit(settings.SNAPSHOT_BASE_URL)
+        self._session_store = import_module(settings.SESSION_ENGINE).SessionStore
+
+    # --- ファイル ---
+
+    def detail_path(self, pk):
+        return os.path.join(self.root, "posts", f"{pk}.json")
+
+    def list_dir(self, tag=None):
+        if tag is None:
+            return os.path.join(self.root, "posts")
+        return os.path.join(self.root, "posts", "tag", quote(tag, safe=""))
+
+    def read(self, path):
+        try:
+            with open(path, "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def write(self, path, content):
+        """一時ファイルに書いてから置き換える（配信中に途中のファイルを見せない）"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+        self.written += 1
+
+    def remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        self.removed += 1
+
+    @contextmanager
+    def lock(self):
+        """
+        同時に書き出さないようにする（後から書く側が最新のDBを読む）
+
+        同じホストのプロセス間でだけ有効（SNAPSHOT_ROOT は1台のローカルディスクに置く）。
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # --- レスポンスの生成 ---
+
+    def _request(self, path, params=None):
+        request = _SnapshotRequest(self._base_url, path, params)
+        # 閲覧者に依存しない（セッションなし・未ログインの）レスポンスにする
+        request.session = self._session_store()
+        request.user = AnonymousUser()
+        return request
+
+    def _viewset(self, viewset_class, action, path, params=None):
+        view = viewset_class(
+            action_map={"get": action}, action=action, args=(), kwargs={}, format_kwarg=None
+        )
+        view.request = view.initialize_request(self._request(path, params))
+        return view
+
+    def render_details(self, pks):
+        """公開中の記事の詳細データ（{ID: dict}。非公開・削除済みは含まない）"""
+        from .views import BlogPostViewSet
+
+        view = self._viewset(BlogPostViewSet, "retrieve", "/api/posts/")
+        details = {}
+        for start in range(0, len(pks), DETAIL_CHUNK_SIZE):
+            queryset = (
+                BlogPost.objects.filter(is_published=True, pk__in=pks[start:start + DETAIL_CHUNK_SIZE])
+                .prefetch_related("tags", "image_variants")
+            )
+            for post in queryset:
+                details[post.pk] = view.get_serializer(post).data
+        return details
+
+    # レスポンスキャッシュ（blog.cache）は通さず、常にDBから作る
+
+    def render_page(self, number, tag=None):
+        from .views import BlogPostViewSet
+
+        params = {"tag": tag} if tag is not None else {}
+        if number > 1:
+            params["page"] = number
+        view = self._viewset(BlogPostViewSet, "list", "/api/posts/", params)
+        return JSONRenderer().render(view._list_rows(view.request).data)
+
+    def render_tags(self):
+        from .views import TagViewSet
+
+        view = self._viewset(TagViewSet, "list", "/api/tags/")
+        return JSONRenderer().render(ListModelMixin.list(view, view.request).data)
+
+    # --- 一覧 ---
+
+    def _published(self, tag=None):
+        queryset = BlogPost.objects.filter(is_published=True)
+        if tag is not None:
+            queryset = queryset.filter(tags__name=tag)
+        return queryset
+
+    def write_list(self, tag=None):
+        """一覧の全ページ（先頭 max_pages まで）を書き直し、なくなったページを消す"""
+        directory = self.list_dir(tag)
+        count = self._published(tag).count()
+        if count == 0 and tag is not None:
+            # 記事のないタグはディレクトリごと消す（Django が空の一覧を返す）
+            if os.path.isdir(directory):
+                shutil.rmtree(directory)
+                self.removed += 1
+            return
+        pages = min(max(1, -(-count // self.page_size)), self.max_pages)
+        for number in range(1, pages + 1):
+            self.write(os.path.join(directory, f"page-{number}.json"), self.render_page(number, tag))
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                match = PAGE_FILE_RE.match(name)
+                if match and int(match.group(1)) > pages:
+                    self.remove(os.path.join(directory, name))
+
+    def write_pages_of(self, created_at, tag=None):
+        """作成日時が created_at の記事を含むページだけを書き直す"""
+        published = self._published(tag)
+        newer = published.filter(created_at__gt=created_at).count()
+        through = published.filter(created_at__gte=created_at).count()
+        first = newer // self.page_size + 1
+        last = max(through - 1, newer) // self.page_size + 1
+        for number in range(first, min(last, self.max_pages) + 1):
+            self.write(
+                os.path.join(self.list_dir(tag), f"page-{number}.json"),
+                self.render_page(number, tag),
+            )
+
+    def write_tags(self):
+        self.write(os.path.join(self.root, "tags.json"), self.render_tags())
+
+    # --- 更新 ---
+
+    def likes_drifted(self, exported, current):
+        """書き出し済みのいいね数が許容範囲を超えてずれたか"""
+        tolerance = max(1, exported * settings.SNAPSHOT_LIKES_TOLERANCE)
+        return abs(current - exported) >= tolerance
+
+    def _changed(self, old, new):
+        if old is None or new is None:
+            return old is not new
+        if self.likes_drifted(old["likes_count"], new["likes_count"]):
+            return True
+        return {**old, "likes_count": None} != {**new, "likes_count": None}
+
+    def update(self, posts=(), likes=(), tag_list=False):
+        """変わった記事の詳細と、その影響を受ける一覧・タグ一覧を書き直す"""
+        posts = set(posts)
+        if likes:
+            current = dict(
+                BlogPost.objects.filter(pk__in=set(likes) - posts, is_published=True)
+                .values_list("pk", "likes_count")
+            )
+            for pk, likes_count in current.items():
+                old = self.read(self.detail_path(pk))
+                if old is not None and self.likes_drifted(old["likes_count"], likes_count):
+                    posts.add(pk)
+        if not posts and not tag_list:
+            return
+
+        details = self.render_details(sorted(posts))
+        full_lists, page_updates = set(), set()
+        for pk in sorted(posts):
+            old = self.read(self.detail_path(pk))
+            new = details.get(pk)
+            if not self._changed(old, new):
+                continue
+
+            path = self.detail_path(pk)
+            if new is None:
+                self.remove(path)
+            else:
+                self.write(path, JSONRenderer().render(new))
+
+            old_tags = {tag["name"] for tag in old["tags"]} if old else set()
+            new_tags = {tag["name"] for tag in new["tags"]} if new else set()
+            if (old is None) != (new is None):
+                # 公開記事の増減で件数と以降のページの中身が変わる
+                full_lists.add(None)
+                full_lists.update(old_tags | new_tags)
+            else:
+                full_lists.update(old_tags ^ new_tags)
+                page_updates.update(
+                    (new["created_at"], tag) for tag in (None, *(old_tags & new_tags))
+                )
+            if (old is None) != (new is None) or old_tags != new_tags:
+                tag_list = True
+
+        for tag in full_lists:
+            self.write_list(tag)
+        for created_at, tag in page_updates:
+            if tag not in full_lists:
+                self.write_pages_of(created_at, tag)
+        if tag_list:
+            self.write_tags()
+
+    def rebuild(self):
+        """すべてのスナップショットを書き直し、対応するデータのないファイルを消す"""
+        published = list(
+            BlogPost.objects.filter(is_published=True).order_by("pk").values_list("pk", flat=True)
+        )
+        published_set = set(published)
+        for start in range(0, len(published), DETAIL_CHUNK_SIZE):
+            chunk = published[start:start + DETAIL_CHUNK_SIZE]
+            for pk, data in self.render_details(chunk).items():
+                self.write(self.detail_path(pk), JSONRenderer().render(data))
+
+        posts_dir = self.list_dir()
+        if os.path.isdir(posts_dir):
+            for name in os.listdir(posts_dir):
+                stem, ext = os.path.splitext(name)
+                if ext == ".json" and stem.isdigit() and int(stem) not in published_set:
+                    self.remove(os.path.join(posts_dir, name))
+
+        self.write_list()
+        tag_names = list(Tag.objects.filter(published_post_count__gt=0).values_list("name", flat=True))
+        for tag in tag_names:
+            self.write_list(tag)
+        tags_dir = os.path.join(self.root, "posts", "tag")
+        if os.path.isdir(tags_dir):
+            expected = {quote(tag, safe="") for tag in tag_names}
+            for name in os.listdir(tags_dir):
+                if name not in expected:
+                    shutil.rmtree(os.path.join(tags_dir, name))
+                    self.removed += 1
+        self.write_tags()
+
+
+def update(posts=(), likes=(), tag_list=False):
+    snapshot = Snapshot()
+    with snapshot.lock():
+        snapshot.update(posts=posts, likes=likes, tag_list=tag_list)
+    return snapshot
@@ -0,0 +1,130 @@
+# blog/storage.py
+
+"""
+内容のハッシュでファイル名を決めるメディアストレージ
+
+保存するファイルの名前を「アップロード先/ハッシュ先頭2文字/ハッシュ.拡張子」に
+置き換える。同じ内容のファイルは同じ名前になるため、再アップロードや
+同じ写真を使う記事があっても実体は1つだけ保存する。名前が変わらない限り
+内容も変わらないので、ブラウザ・CDNに immutable で長期間キャッシュさせられる
+（blog.views.media を参照）。
+
+同じファイルを複数の記事・バリアントから参照するため、参照数を MediaFile に
+記録する。save() は参照数を1増やし、delete() は1減らして0になったときだけ
+実体を削除する。django_cleanup は画像の差し替え・記事の削除のたびに
+storage.delete() を呼ぶので、そのまま参照の解放として扱える。
+参照数がずれた場合は sync_media_refs コマンドで補正する。
+"""
+
+import hashlib
+import os
+import re
+
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+# ファイル名に使うハッシュ（SHA-256）の桁数
+HASH_LENGTH = 32
+
+HASHED_NAME_RE = re.compile(
+    r"(?:^|/)(?P<prefix>[0-9a-f]{2})/(?P=prefix)[0-9a-f]{%d}\.[0-9a-z]+$" % (HASH_LENGTH - 2)
+)
+
+
+def is_hashed_name(name):
+    """内容のハッシュで決めた名前か（中身が変わらないので長期キャッシュしてよい）"""
+    return bool(HASHED_NAME_RE.search(name))
+
+
+def content_hash(content):
+    """ファイルの内容の SHA-256（16進）。読み終えたら先頭に戻す"""
+    digest = hashlib.sha256()
+    if hasattr(content, "seek"):
+        content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    if hasattr(content, "seek"):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    """アップロード先のディレクトリと拡張子を残し、ベース名をハッシュに置き換える"""
+    directory = os.path.dirname(name)
+    ext = os.path.splitext(name)[1].lower()
+    digest = digest[:HASH_LENGTH]
+    return "/".join(part for part in (directory, digest[:2], digest + ext) if part)
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """内容のハッシュで名前を付け、同じ内容を参照数付きで共有するストレージ"""
+
+    def __init__(self, **kwargs):
+        # 同じ名前なら中身も同じなので、同時に書き込まれても上書きしてよい
+        kwargs.setdefault("allow_overwrite", True)
+        super().__init__(**kwargs)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        validate_file_name(name, allow_relative_path=True)
+
+        name = hashed_name(name, content_hash(content))
+        if max_length is not None and len(name) > max_length:
+            raise SuspiciousFileOperation(
+                f'Storage can not find an available filename for "{name}". '
+                "Please make sure that the corresponding file field "
+                'allows sufficient "max_length".'
+            )
+        validate_file_name(name, allow_relative_path=True)
+        self._add_ref(name, content)
+        return name
+
+    def _add_ref(self, name, content):
+        from .models import MediaFile
+
+        with transaction.atomic():
+            # 既存の行を更新できた場合はその行のロックで delete() と競合しない
+            referenced = MediaFile.objects.filter(name=name).update(
+                ref_count=F("ref_count") + 1, updated_at=timezone.now()
+            )
+            if referenced and self.exists(name):
+                return
+            self._save(name, content)
+            if referenced:
+                return
+            try:
+                with transaction.atomic():
+                    MediaFile.objects.create(name=name, ref_count=1, size=content.size)
+            except IntegrityError:
+                # 同じ内容が同時に保存された
+                MediaFile.objects.filter(name=name).update(
+                    ref_count=F("ref_count") + 1, updated_at=timezone.now()
+                )
+
+    def delete(self, name):
+        from .models import MediaFile
+
+        if not name:
+            raise ValueError("The name must be given to delete().")
+
+        with transaction.atomic():
+            media_file = MediaFile.objects.select_for_update().filter(name=name).first()
+            if media_file is None:
+                # 参照数の記録がないファイル（導入前に保存されたものなど）
+                super().delete(name)
+                return
+            if media_file.ref_count > 1:
+                MediaFile.objects.filter(pk=media_file.pk).update(
+                    ref_count=F("ref_count") - 1, updated_at=timezone.now()
+                )
+                return
+            media_file.delete()
+            super().delete(name)
@@ -0,0 +1,39 @@
+# blog/tags.py
+
+"""
+タグごとの公開記事数（Tag.published_post_count）の維持
+
+記事のタグ付け・公開状態の変更・削除のたびに blog.signals から
+refresh_published_post_counts を呼び、影響したタグだけを実件数で数え直す。
+増減ではなく数え直すので、並行した更新があってもずれが残らない。
+"""
+
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from . import cache
+from .models import BlogPost
+
+
+def actual_published_post_count():
+    """タグごとの公開記事の実件数（Tag のクエリセットで使うサブクエリ式）"""
+    return Coalesce(
+        Subquery(
+            BlogPost.tags.through.objects.filter(
+                tag_id=OuterRef("pk"), blogpost__is_published=True
+            )
+            .order_by()
+            .values("tag_id")
+            .annotate(c=Count("pk"))
+            .values("c")
+        ),
+        0,
+    )
+
+
+def refresh_published_post_counts(tags):
+    """タグ（Tag のクエリセット）の公開記事数を数え直し、タグ一覧のキャッシュを無効化する"""
+    updated = tags.update(published_post_count=actual_published_post_count())
+    if updated:
+        cache.invalidate(cache.TAGS)
+    return updated
@@ -1,3 +1,1041 @@
-from django.test import TestCase
+import io
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import zlib
+from datetime import timedelta
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from django.utils import timezone
+from unittest import mock, skipUnless
+from PIL import Image
+
+from . import archive, async_views, cache, likes, related, timing, trending
+from .images import MAX_DECODE_PIXELS, MAX_PIXELS, ImageTooLarge, open_image, process_image, settings_fingerprint
+from .jobs import (
+    claim_jobs, fail_job, requeue_stale_jobs, retry_failed_jobs, run_jobs, start_reoptimize_jobs,
+)
+from .models import (
+    ArchiveMonth, BackfillCheckpoint, BlogPost, ImageJob, ImageStatus, ImageVariant, Like, LikeEvent, MediaFile,
+    RelatedPost, SnapshotUpdate, Tag,
+)
+from .pagination import EstimatedCountPaginator
+from .search import build_tsquery, highlight, tokenize
+from .seed import seed_corpus
+from .snapshots import Snapshot, flush_updates
+from .storage import ContentAddressedStorage, is_hashed_name
+
+# 子プロセスで画像処理を行い、最大RSS（VmHWM, KB）を出力するスクリプト
+PEAK_RSS_SCRIPT = """
+import sys
+from blog.images import process_image
+if sys.argv[1] != "-":
+    process_image(sys.argv[1], sys.argv[1])
+with open("/proc/self/status") as status:
+    print(next(line.split()[1] for line in status if line.startswith("VmHWM:")))
+"""
+
+
+class ImageMemoryTests(SimpleTestCase):
+    """巨大な画像でもワーカーのメモリ使用量が抑えられることの確認"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        # 48MPのスマートフォン写真相当のJPEG
+        cls.large_jpeg = os.path.join(cls.tmpdir.name, "large.jpg")
+        Image.new("RGB", (8000, 6000), (120, 80, 40)).save(cls.large_jpeg, quality=90)
+        # 縮小デコードできない形式で、デコードの上限ちょうどの画像
+        cls.large_png = os.path.join(cls.tmpdir.name, "large.png")
+        Image.new("RGBA", (4000, 3000), (120, 80, 40, 200)).save(cls.large_png)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def _peak_rss_mb(self, path):
+        output = subprocess.run(
+            [sys.executable, "-c", PEAK_RSS_SCRIPT, path],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        return int(output.strip()) / 1024
+
+    def test_large_jpeg_is_decoded_in_draft_mode(self):
+        pil_image = open_image(self.large_jpeg)
+        self.assertLessEqual(pil_image.width, 8000 // 4)
+
+    @skipUnless(os.path.exists("/proc/self/status"), "Linuxの /proc が必要")
+    def test_large_jpeg_peak_memory(self):
+        baseline = self._peak_rss_mb("-")
+        peak = self._peak_rss_mb(self.large_jpeg)
+        # 全画素をデコードすると 8000x6000x3 = 約137MB 必要になる
+        self.assertLess(peak - baseline, 64)
+
+    @skipUnless(os.path.exists("/proc/self/status"), "Linuxの /proc が必要")
+    def test_large_png_peak_memory(self):
+        baseline = self._peak_rss_mb("-")
+        peak = self._peak_rss_mb(self.large_png)
+        # PNG は全画素をデコードするため、上限（12MP の RGBA）で RGB への変換を含めて見積もる
+        self.assertLess(peak - baseline, 128)
+
+    def test_rejects_png_above_decode_budget(self):
+        path = os.path.join(self.tmpdir.name, "huge.png")
+        # ヘッダーの上限（MAX_PIXELS）より小さくても、縮小できない形式はデコードしない
+        Image.new("1", (5000, 4000)).save(path)
+        self.assertGreater(5000 * 4000, MAX_DECODE_PIXELS)
+        with self.assertRaises(ImageTooLarge):
+            open_image(path)
+
+    def test_process_image_output(self):
+        processed = process_image(self.large_jpeg, "large.jpg")
+        self.assertEqual(processed.filename, "large.jpg")
+        self.assertEqual(max(v.width for v in processed.variants), 1200)
+
+    def test_rejects_decompression_bomb_before_decoding(self):
+        path = os.path.join(self.tmpdir.name, "bomb.png")
+        # ヘッダーの寸法だけを偽装したPNG（IHDRの幅・高さとCRCを書き換える）
+        Image.new("1", (1, 1)).save(path)
+        with open(path, "r+b") as f:
+            data = bytearray(f.read())
+            side = int(MAX_PIXELS ** 0.5) + 1
+            data[16:24] = side.to_bytes(4, "big") * 2
+            data[29:33] = zlib.crc32(bytes(data[12:29])).to_bytes(4, "big")
+            f.seek(0)
+            f.write(data)
+        with self.assertRaises((ImageTooLarge, Image.DecompressionBombError)):
+            open_image(path)
+
+
+class SearchTests(TestCase):
+    """日本語のバイグラム分割・tsquery の組み立て・ハイライトと、検索ベクトルの更新条件の確認"""
+
+    def test_tokenize(self):
+        # 全角・半角と大文字小文字を揃え、英数字は単語、それ以外は2文字ずつに分ける
+        self.assertEqual(
+            tokenize("Ｄｊａｎｇｏ入門ｶﾞｲﾄﾞ 2024年"), ["django", "入門", "門ガ", "ガイ", "イド", "2024", "年"]
+        )
+        self.assertEqual(tokenize(""), [])
+
+    def test_build_tsquery(self):
+        self.assertEqual(build_tsquery("京都旅行 Django 京"), "'京都' <-> '都旅' <-> '旅行' & 'django':* & '京':*")
+        # 引用符や演算子は語に含めない（利用者の入力が tsquery の構文にならない）
+        self.assertEqual(build_tsquery("a' | !b & (c):* <-> d\\"), "'a':* & 'b':* & 'c':* & 'd':*")
+        self.assertEqual(build_tsquery("!!! ?"), "")
+
+    def test_highlight(self):
+        self.assertEqual(
+            highlight("<b>Django</b> と京都の旅", "DJANGO 京都"),
+            "&lt;b&gt;<mark>Django</mark>&lt;/b&gt; と<mark>京都</mark>の旅",
+        )
+        self.assertEqual(highlight("あ" * 100 + "京都" + "い" * 100, "京都", width=10), "…あああああ<mark>京都</mark>いいい…")
+        self.assertIsNone(highlight("本文", "大阪"))
+        self.assertIsNone(highlight("本文", " "))
+
+    def test_vector_updated_only_when_text_changes(self):
+        author = User.objects.create(username="author")
+        with mock.patch("blog.models.update_search_vector") as update:
+            post = BlogPost.objects.create(author=author, title="京都", description="本文")
+            self.assertEqual(update.call_count, 1)
+
+            post = BlogPost.objects.get(pk=post.pk)
+            post.likes_count = 3
+            post.save()
+            post.save(update_fields=["likes_count"])
+            self.assertEqual(update.call_count, 1)
+
+            post.description = "新しい本文"
+            post.save()
+            self.assertEqual(update.call_count, 2)
+            post.save()
+            self.assertEqual(update.call_count, 2)
+
+
+# レスポンスキャッシュを通さず、毎回ビューとシリアライザーのコストを測る
+# 新しい訪問者のいいね（9件）: 記事・セッションキーの重複確認・セッション作成・
+# Like の検索と作成・キャッシュ無効化用のタグ名・カウンタ更新・再読込・セッション保存。
+# TestCase 内ではトランザクションが SAVEPOINT になり件数が実行経路で変わるため、
+# SAVEPOINT / RELEASE 文は数えない
+LIKE_BUDGET = 9
+
+NO_API_CACHE = {
+    **settings.CACHES,
+    settings.API_CACHE_ALIAS: {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+}
+
+
+@override_settings(CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False)
+class QueryBudgetTests(TestCase):
+    """
+    主要なAPIのクエリ数の上限（N+1の混入を検出する）
+
+    上限は記事数・タグ数・バリアントの数に依存しないこと。
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_corpus(12, tags=8, tags_per_post=(2, 4), likes_per_post=(1, 3), seed=1)
+        cls.post = BlogPost.objects.filter(is_published=True).first()
+        cls.tag = Tag.objects.order_by("-published_post_count").first()
+        for post in BlogPost.objects.all():
+            for width in (320, 640):
+                ImageVariant.objects.create(
+                    blog_post=post, image=f"blog_images/variants/{post.pk}-{width}.webp",
+                    width=width, height=width, format="webp",
+                )
+
+    def assertBudget(self, budget, method, url):
+        with self.assertNumQueries(budget):
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 400)
+        return response
+
+    def test_list(self):
+        # 件数・記事・タグ・バリアント
+        self.assertBudget(4, "get", "/api/posts/")
+
+    def test_list_does_not_grow_with_data(self):
+        seed_corpus(30, tags=8, tags_per_post=(4, 6), seed=2)
+        self.assertBudget(4, "get", "/api/posts/")
+        self.assertBudget(4, "get", "/api/posts/?page=2")
+
+    def test_list_cursor(self):
+        # 件数を数えない
+        self.assertBudget(3, "get", "/api/posts/?pagination=cursor")
+
+    def test_tag_filter(self):
+        self.assertBudget(4, "get", f"/api/posts/?tag={self.tag.name}")
+
+    def test_search(self):
+        self.assertBudget(4, "get", "/api/posts/?search=京都")
+        self.assertBudget(4, "get", "/api/posts/?q=京都")
+
+    def test_popular_ordering(self):
+        self.assertBudget(4, "get", "/api/posts/?ordering=likes")
+        self.assertBudget(4, "get", "/api/posts/?ordering=trending")
+
+    def test_detail(self):
+        self.assertBudget(3, "get", f"/api/posts/{self.post.pk}/")
+
+    def test_related(self):
+        related.rebuild()
+        # 関連記事・タグ・バリアント
+        response = self.assertBudget(3, "get", f"/api/posts/{self.post.pk}/related/")
+        self.assertTrue(response.json())
+
+    def test_archive(self):
+        self.assertBudget(1, "get", "/api/posts/archive/")
+        self.assertBudget(4, "get", f"/api/posts/?month={self.post.created_at:%Y-%m}")
+
+    def test_tags(self):
+        self.assertBudget(1, "get", "/api/tags/")
+
+    def test_like_status_without_session(self):
+        self.assertBudget(1, "get", f"/api/posts/{self.post.pk}/like_status/")
+
+    def test_bulk_like_status(self):
+        ids = ",".join(str(pk) for pk in BlogPost.objects.values_list("pk", flat=True))
+        self.assertBudget(1, "get", f"/api/posts/like_status/?ids={ids}")
+
+    def test_like(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(f"/api/posts/{self.post.pk}/like/")
+        self.assertEqual(response.status_code, 201)
+        statements = [
+            query["sql"] for query in captured.captured_queries
+            if not query["sql"].startswith(("SAVEPOINT", "RELEASE SAVEPOINT"))
+        ]
+        self.assertEqual(len(statements), LIKE_BUDGET, "\n".join(statements))
+        # いいね済みのセッション: セッション読み込み・記事・状態確認
+        self.assertBudget(3, "get", f"/api/posts/{self.post.pk}/like_status/")
+
+
+@override_settings(CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False)
+class KeysetPaginationTests(TestCase):
+    """カーソル方式で最後まで辿ると、作成日時が同じ記事があっても重複・欠落がないことの確認"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username="author")
+        posts = BlogPost.objects.bulk_create(
+            BlogPost(author=author, title=f"post {i}", description="本文", is_published=True) for i in range(25)
+        )
+        # 3件ずつ同じ作成日時にする（ページの境目でも同時刻の記事が分かれる）
+        now = timezone.now()
+        for i, post in enumerate(posts):
+            BlogPost.objects.filter(pk=post.pk).update(created_at=now - timedelta(minutes=i // 3))
+
+    def test_follow_next_cursor(self):
+        expected = list(BlogPost.objects.order_by("-created_at", "-id").values_list("pk", flat=True))
+        seen = []
+        url = "/api/posts/?pagination=cursor"
+        while url:
+            body = self.client.get(url).json()
+            seen += [row["id"] for row in body["results"]]
+            url = body["next"]
+        self.assertEqual(seen, expected)
+
+    def test_rejects_other_orderings(self):
+        for query in ("ordering=likes", "ordering=created_at", "q=本文"):
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/posts/?pagination=cursor&{query}")
+                self.assertEqual(response.status_code, 400)
+        response = self.client.get("/api/posts/?pagination=cursor&ordering=-created_at&q=本文")
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False)
+class TrendingTests(TestCase):
+    """トレンドスコアがいいねに合わせて増減し、新しいいいねほど上位になることの確認"""
+
+    def setUp(self):
+        author = User.objects.create(username="author")
+        self.old, self.new = (
+            BlogPost.objects.create(author=author, title=title, description="本文", is_published=True)
+            for title in ("old", "new")
+        )
+
+    def ordered_titles(self, ordering):
+        response = self.client.get(f"/api/posts/?ordering={ordering}")
+        return [post["title"] for post in response.json()["results"]]
+
+    def test_like_and_unlike_update_score(self):
+        self.client.post(f"/api/posts/{self.new.pk}/like/")
+        self.new.refresh_from_db()
+        self.assertGreater(self.new.trending_score, 0)
+        self.assertEqual(self.ordered_titles("trending"), ["new", "old"])
+
+        self.client.delete(f"/api/posts/{self.new.pk}/like/")
+        self.new.refresh_from_db()
+        self.assertAlmostEqual(self.new.trending_score, 0)
+        self.assertEqual(self.new.likes_count, 0)
+
+    def test_recent_likes_outrank_old_likes(self):
+        for i in range(3):
+            Like.objects.create(blog_post=self.old, session_key=f"old{i}")
+        Like.objects.filter(blog_post=self.old).update(
+            created_at=timezone.now() - timedelta(hours=settings.TRENDING_HALF_LIFE_HOURS * 3)
+        )
+        Like.objects.create(blog_post=self.new, session_key="new")
+        BlogPost.objects.filter(pk=self.old.pk).update(likes_count=3)
+        BlogPost.objects.filter(pk=self.new.pk).update(likes_count=1)
+        trending.redecay()
+
+        self.assertEqual(self.ordered_titles("trending"), ["new", "old"])
+        self.assertEqual(self.ordered_titles("likes"), ["old", "new"])
+
+
+@override_settings(
+    CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False, LIKE_WRITE_BEHIND=True,
+)
+class LikeWriteBehindTests(TestCase):
+    """ライトビハインド方式のいいねが二重に数えられず、反映後に実件数と一致することの確認"""
+
+    def setUp(self):
+        author = User.objects.create(username="author")
+        self.post = BlogPost.objects.create(author=author, title="post", description="本文", is_published=True)
+
+    def test_like_is_counted_once(self):
+        self.assertEqual(likes.add_like(self.post, "session"), (True, 1))
+        self.assertEqual(likes.add_like(self.post, "session"), (False, 1))
+        self.assertEqual(likes.add_like(self.post, "other"), (True, 2))
+        self.assertEqual(likes.remove_like(self.post, "other"), (True, 1))
+        self.assertEqual(
+            likes.pending_state([self.post.pk], "session"), ({self.post.pk: 1}, {self.post.pk: True})
+        )
+
+        likes.flush_like_events()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+        self.assertEqual(likes.like_state(self.post, "session"), (True, 1))
+
+    def test_flush_does_not_grow_with_removals(self):
+        def flush_queries(count):
+            keys = [f"remove-{count}-{i}" for i in range(count)]
+            Like.objects.bulk_create([Like(blog_post=self.post, session_key=key) for key in keys])
+            LikeEvent.objects.bulk_create(
+                LikeEvent(blog_post=self.post, session_key=key, action=LikeEvent.Action.REMOVE, sequence=1)
+                for key in keys
+            )
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(likes.flush_like_events(), count)
+            self.assertFalse(Like.objects.filter(session_key__in=keys).exists())
+            return len(captured)
+
+        self.assertEqual(flush_queries(10), flush_queries(50))
+
+    def test_concurrent_like_from_same_session(self):
+        # 同じセッションの別のリクエストが、通し番号を読んだ後に先に追記した
+        def append_first(post, session_key):
+            LikeEvent.objects.create(
+                blog_post=post, session_key=session_key, action=LikeEvent.Action.ADD, sequence=1
+            )
+            return 0
+
+        with mock.patch("blog.likes._last_sequence", append_first):
+            self.assertEqual(likes.add_like(self.post, "session"), (False, 1))
+        self.assertEqual(LikeEvent.objects.count(), 1)
+
+
+@override_settings(
+    CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False, LIKE_WRITE_BEHIND=True,
+)
+class AnonymousSessionTests(TestCase):
+    """閲覧だけではセッションを作らず、いいね（未反映を含む）に使われたセッションは整理で消さないことの確認"""
+
+    def setUp(self):
+        author = User.objects.create(username="author")
+        self.post = BlogPost.objects.create(author=author, title="post", description="本文", is_published=True)
+
+    def test_reads_do_not_create_session(self):
+        for url in ("/api/posts/", f"/api/posts/{self.post.pk}/", f"/api/posts/{self.post.pk}/like_status/"):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(Session.objects.exists())
+
+    def test_prune_keeps_sessions_with_pending_likes(self):
+        self.assertEqual(self.client.post(f"/api/posts/{self.post.pk}/like/").status_code, 201)
+        liked = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+        self.assertFalse(Like.objects.exists())
+        SessionStore().create()
+
+        call_command("prune_anonymous_sessions", stdout=io.StringIO())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), [liked])
+        status = self.client.get(f"/api/posts/{self.post.pk}/like_status/").json()
+        self.assertEqual(status, {"is_liked": True, "likes_count": 1})
+
+
+@override_settings(CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False)
+class AsyncViewTests(TestCase):
+    """非同期ビュー（blog.async_views）が同期のビューセットと同じステータスと本文を返すことの確認"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_corpus(15, tags=4, seed=5)
+        author = User.objects.create(username="author")
+        cls.sync_post, cls.async_post = (
+            BlogPost.objects.create(author=author, title=title, description="本文", is_published=True)
+            for title in ("sync", "async")
+        )
+
+    def sync_request(self, method, url):
+        with override_settings(ROOT_URLCONF="config.sync_urls"):
+            response = getattr(self.client, method)(url)
+        return response.status_code, response.json()
+
+    def async_request(self, method, url):
+        with override_settings(ASYNC_API_VIEWS=True, ROOT_URLCONF="config.async_urls"):
+            response = async_to_sync(getattr(self.async_client, method))(url)
+        return response.status_code, response.json()
+
+    def test_reads_match_viewset(self):
+        self.assertIs(resolve("/api/posts/", urlconf="config.async_urls").func, async_views.post_list)
+        post = BlogPost.objects.filter(is_published=True).first()
+        for url in (
+            "/api/posts/",
+            "/api/posts/?page=2",
+            "/api/posts/?page=999",
+            "/api/posts/?pagination=cursor&ordering=likes",
+            f"/api/posts/{post.pk}/",
+            "/api/posts/0/",
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.async_request("get", url), self.sync_request("get", url))
+
+    def test_likes_match_viewset(self):
+        def run(request, post):
+            return [
+                request(method, f"/api/posts/{post.pk}/{path}/")
+                for method, path in [
+                    ("get", "like_status"), ("post", "like"), ("post", "like"), ("get", "like_status"),
+                    ("delete", "like"), ("delete", "like"), ("get", "like_status"),
+                ]
+            ]
+
+        self.assertEqual(run(self.async_request, self.async_post), run(self.sync_request, self.sync_post))
+
+    def test_like_enforces_csrf_like_viewset(self):
+        user = User.objects.create_user(username="reader", password="password")
+
+        def like(client, urlconf, post, login):
+            if login:
+                client.force_login(user)
+            with override_settings(ASYNC_API_VIEWS=True, ROOT_URLCONF=urlconf):
+                response = async_to_sync(client.post)(f"/api/posts/{post.pk}/like/")
+            return response.status_code, response.json()
+
+        for login in (True, False):
+            with self.subTest(login=login):
+                sync = like(AsyncClient(enforce_csrf_checks=True), "config.sync_urls", self.sync_post, login)
+                self.assertEqual(sync[0], 403 if login else 201)
+                self.assertEqual(
+                    like(AsyncClient(enforce_csrf_checks=True), "config.async_urls", self.async_post, login), sync
+                )
+
+    @override_settings(SERVER_TIMING_HEADER=True)
+    def test_server_timing_counts_queries_under_asgi(self):
+        # ORM は sync_to_async のスレッドで実行されるため、その接続のSQLも数えること
+        for urlconf in ("config.async_urls", "config.sync_urls"):
+            with self.subTest(urlconf=urlconf), override_settings(ROOT_URLCONF=urlconf):
+                response = async_to_sync(self.async_client.get)("/api/posts/")
+                count = re.search(r'db;dur=[\d.]+;desc="(\d+) queries"', response["Server-Timing"])
+                self.assertGreater(int(count.group(1)), 0)
+
+
+class SeedTests(TestCase):
+    """生成データが現在のスキーマに入り、集計値・トレンドスコア・月別アーカイブ・関連記事が埋まることの確認"""
+
+    def assertSeeded(self):
+        self.assertTrue(BlogPost.objects.filter(trending_score__gt=0).exists())
+        for post in BlogPost.objects.all():
+            self.assertEqual(post.likes_count, post.likes.count())
+        self.assertEqual(
+            dict(ArchiveMonth.objects.values_list("month", "post_count")), archive.actual_month_counts()
+        )
+        self.assertTrue(ArchiveMonth.objects.exists())
+        self.assertTrue(RelatedPost.objects.exists())
+
+    def test_seed_corpus(self):
+        post_ids = seed_corpus(10, tags=4, likes_per_post=(1, 2), seed=4)
+        self.assertEqual(BlogPost.objects.filter(pk__in=post_ids).count(), 10)
+        self.assertSeeded()
+
+    def test_seed_blog(self):
+        call_command(
+            "seed_blog", posts=30, tags=4, days=2, max_likes=5, likes_alpha=0.5, chunk_size=8,
+            workers=1, verbosity=0, stdout=io.StringIO(),
+        )
+        self.assertEqual(BlogPost.objects.count(), 30)
+        self.assertSeeded()
+
+
+@override_settings(CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False)
+class RelatedPostTests(TestCase):
+    """関連記事がタグの Jaccard 係数の順に並び、タグ付けの変更で更新されることの確認"""
+
+    def setUp(self):
+        author = User.objects.create(username="author")
+        self.tags = {name: Tag.objects.create(name=name) for name in "abcd"}
+
+        def post(title, tags):
+            post = BlogPost.objects.create(author=author, title=title, description="本文", is_published=True)
+            post.tags.set([self.tags[name] for name in tags])
+            return post
+
+        self.base = post("base", "abc")
+        self.half = post("half", "ab")
+        self.same = post("same", "abc")
+        self.other = post("other", "d")
+
+    def related_titles(self, post):
+        response = self.client.get(f"/api/posts/{post.pk}/related/")
+        return [row["title"] for row in response.json()]
+
+    def test_ranked_by_tag_overlap(self):
+        self.assertEqual(self.related_titles(self.base), ["same", "half"])
+        # 記事ごとの差分更新の結果は全件の作り直しと一致する
+        stored = list(RelatedPost.objects.order_by("blog_post", "rank").values_list("blog_post", "related", "score"))
+        related.rebuild()
+        self.assertEqual(
+            list(RelatedPost.objects.order_by("blog_post", "rank").values_list("blog_post", "related", "score")),
+            stored,
+        )
+
+    def test_refreshed_only_when_publication_changes(self):
+        with mock.patch("blog.related.refresh") as refresh:
+            self.base.title = "renamed"
+            self.base.save()
+            refresh.assert_not_called()
+            self.base.is_published = False
+            self.base.save()
+            refresh.assert_called_once_with([self.base.pk])
+
+    @override_settings(RELATED_CANDIDATES_PER_TAG=1)
+    def test_candidates_capped_per_tag(self):
+        # タグごとに最も新しい記事だけが候補になる（a, b, c とも same が最新）
+        related.rebuild()
+        self.assertEqual(self.related_titles(self.base), ["same"])
+
+    def test_incremental_update(self):
+        # 同じ係数なら新しい記事が先
+        self.other.tags.set([self.tags["a"], self.tags["b"], self.tags["c"]])
+        self.assertEqual(self.related_titles(self.base), ["other", "same", "half"])
+
+        self.same.is_published = False
+        self.same.save()
+        self.assertEqual(self.related_titles(self.base), ["other", "half"])
+
+        self.tags["c"].delete()
+        self.assertEqual(self.related_titles(self.base), ["other", "half"])
+        self.assertEqual(
+            list(RelatedPost.objects.filter(blog_post=self.base).values_list("score", flat=True)),
+            [1.0, 1.0],
+        )
+
+
+@override_settings(CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False)
+class ArchiveTests(TestCase):
+    """月別アーカイブの記事数が公開・非公開・削除に合わせて更新されることの確認"""
+
+    def setUp(self):
+        author = User.objects.create(username="author")
+        self.posts = [
+            BlogPost.objects.create(author=author, title=f"post{i}", description="本文", is_published=True)
+            for i in range(3)
+        ]
+        # 1件を前の月に移して数え直す（作成日時は通常変わらないため直接更新する）
+        self.this_month = archive.month_of(timezone.now())
+        self.last_month = archive.month_of(
+            timezone.localtime().replace(day=1) - timedelta(days=1)
+        )
+        BlogPost.objects.filter(pk=self.posts[0].pk).update(
+            created_at=archive.month_range(self.last_month)[0]
+        )
+        archive.refresh_months([self.this_month, self.last_month])
+
+    def buckets(self):
+        return [(row["month"], row["count"]) for row in self.client.get("/api/posts/archive/").json()]
+
+    def test_counts_follow_publish_and_delete(self):
+        self.assertEqual(self.buckets(), [(self.this_month.month, 2), (self.last_month.month, 1)])
+
+        self.posts[1].is_published = False
+        self.posts[1].save()
+        self.posts[0].refresh_from_db()
+        self.posts[0].delete()
+        self.assertEqual(self.buckets(), [(self.this_month.month, 1)])
+
+    def test_month_filter(self):
+        response = self.client.get(f"/api/posts/?month={self.last_month:%Y-%m}")
+        self.assertEqual([post["title"] for post in response.json()["results"]], ["post0"])
+        self.assertEqual(self.client.get("/api/posts/?month=2024-13").status_code, 400)
+
+
+@override_settings(ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False)
+class AdminChangelistTests(TestCase):
+    """管理画面の一覧が大きなテーブル向けのクエリ（DISTINCT なし・閲覧のみ）になることの確認"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "password")
+        cls.tag = Tag.objects.create(name="京都")
+        cls.post = BlogPost.objects.create(author=cls.admin, title="tagged", description="本文", is_published=True)
+        cls.post.tags.add(cls.tag)
+        BlogPost.objects.create(author=cls.admin, title="untagged", description="本文", is_published=True)
+        Like.objects.create(blog_post=cls.post, session_key="s" * 32)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_tag_filter_and_search(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"/admin/blog/blogpost/?tag={self.tag.pk}&q=本文")
+        self.assertContains(response, "tagged")
+        self.assertNotContains(response, "untagged")
+        self.assertFalse([query for query in queries if "DISTINCT" in query["sql"]])
+
+    def test_estimated_count_only_without_filters(self):
+        with mock.patch("blog.pagination.estimate_count", return_value=10 ** 6):
+            self.assertEqual(EstimatedCountPaginator(BlogPost.objects.all(), 100).count, 10 ** 6)
+            self.assertEqual(EstimatedCountPaginator(BlogPost.objects.filter(tags=self.tag), 100).count, 1)
+
+    def test_like_admin_is_read_only(self):
+        response = self.client.get(f"/admin/blog/like/?blog_post__id__exact={self.post.pk}")
+        self.assertContains(response, "tagged")
+        self.assertEqual(self.client.get("/admin/blog/like/add/").status_code, 403)
+
+
+class ReoptimizeImagesTests(TestCase):
+    """既存画像の再最適化が同じ内容を1回だけ処理し、処理済みの画像を読み飛ばすことの確認"""
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=tmpdir.name, SNAPSHOT_ROOT="")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        storage = BlogPost._meta.get_field("image").storage
+        author = User.objects.create(username="author")
+        for i, color in enumerate(["red", "red", "blue"]):
+            buffer = io.BytesIO()
+            Image.new("RGB", (2000, 1500), color).save(buffer, "PNG")
+            name = storage.save("blog_images/original.png", ContentFile(buffer.getvalue()))
+            post = BlogPost.objects.create(author=author, title=f"post{i}", description="本文")
+            # 最適化の導入前にアップロードされた画像（指紋なし）
+            BlogPost.objects.filter(pk=post.pk).update(image=name)
+
+    def reoptimize(self):
+        out = io.StringIO()
+        call_command("reoptimize_images", workers=1, chunk_size=2, stdout=out)
+        return out.getvalue()
+
+    def test_reoptimize_and_resume(self):
+        batches = []
+
+        def interrupt_after_first_batch(jobs, executor):
+            # 1バッチ目だけ処理して中断する
+            if batches:
+                raise KeyboardInterrupt
+            batches.append(jobs)
+            return run_jobs(jobs, executor)
+
+        with mock.patch(
+            "blog.management.commands.reoptimize_images.run_jobs", interrupt_after_first_batch
+        ), self.assertRaises(KeyboardInterrupt):
+            self.reoptimize()
+        with mock.patch("blog.jobs.process_image", wraps=process_image) as processed:
+            output = self.reoptimize()
+        # 同じ内容の2件は1バッチ目で1回だけ処理し、2バッチ目から再開する
+        self.assertIn("続きから再開", output)
+        self.assertEqual(processed.call_count, 1)
+        self.assertRegex(output, r"完了 3 件 .* 削減 [1-9][0-9,]* バイト")
+        self.assertFalse(BackfillCheckpoint.objects.exists())
+
+        posts = BlogPost.objects.order_by("pk")
+        self.assertEqual({post.image_fingerprint for post in posts}, {settings_fingerprint()})
+        self.assertTrue(all(post.image.name.endswith(".jpg") for post in posts))
+        self.assertEqual(posts[0].image.name, posts[1].image.name)
+        self.assertEqual(posts[0].image_variants.count(), 6)
+
+        with mock.patch("blog.jobs.process_image") as processed:
+            output = self.reoptimize()
+        processed.assert_not_called()
+        self.assertIn("省略 3 件", output)
+
+    def test_bytes_saved_counts_shared_images_once(self):
+        storage = BlogPost._meta.get_field("image").storage
+        sources = dict(BlogPost.objects.values_list("pk", "image"))
+        before = {name: storage.size(name) for name in set(sources.values())}
+        self.assertEqual(len(before), 2)
+
+        output = self.reoptimize()
+        outputs = {sources[pk]: name for pk, name in BlogPost.objects.values_list("pk", "image")}
+        expected = sum(size - storage.size(outputs[name]) for name, size in before.items())
+        self.assertIn(f"削減 {expected:,} バイト（", output)
+
+    def test_backfill_jobs_are_not_requeued(self):
+        post = BlogPost.objects.first()
+        failed, stale = start_reoptimize_jobs([(post.pk, post.image.name)] * 2)
+        fail_job(failed, OSError("読み込めません"))
+        ImageJob.objects.filter(pk=stale.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        requeue_stale_jobs(10)
+        retry_failed_jobs()
+
+        self.assertEqual(claim_jobs(10), [])
+        self.assertEqual(
+            set(ImageJob.objects.values_list("status", flat=True)), {ImageJob.Status.FAILED}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image_status, ImageStatus.READY)
+
+
+class ContentAddressedStorageTests(TestCase):
+    """同じ内容のファイルを1つだけ保存し、参照がなくなったときに削除することの確認"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.storage = ContentAddressedStorage(location=self.tmpdir.name)
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save("blog_images/a.JPG", ContentFile(b"photo"))
+        second = self.storage.save("blog_images/b.jpg", ContentFile(b"photo"))
+        other = self.storage.save("blog_images/a.jpg", ContentFile(b"other"))
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith("blog_images/") and first.endswith(".jpg"))
+        self.assertTrue(is_hashed_name(first))
+        self.assertEqual(MediaFile.objects.get(name=first).ref_count, 2)
+
+    def test_file_is_deleted_with_last_reference(self):
+        name = self.storage.save("blog_images/a.jpg", ContentFile(b"photo"))
+        self.storage.save("blog_images/b.jpg", ContentFile(b"photo"))
+
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+
+    def test_reupload_of_same_content_keeps_one_reference(self):
+        with override_settings(MEDIA_ROOT=self.tmpdir.name, IMAGE_PROCESSING_ASYNC=True, SNAPSHOT_ROOT=""):
+            post = BlogPost.objects.create(
+                author=User.objects.create(username="author"), title="post", description="本文",
+                image=ContentFile(b"photo", name="a.jpg"),
+            )
+            post.image = ContentFile(b"photo", name="b.jpg")
+            post.save()
+            self.assertEqual(MediaFile.objects.get(name=post.image.name).ref_count, 1)
+
+            # django_cleanup はコミット後にファイルを削除する
+            with self.captureOnCommitCallbacks(execute=True):
+                post.delete()
+            self.assertFalse(MediaFile.objects.filter(name=post.image.name).exists())
+
+
+@override_settings(
+    CACHES=NO_API_CACHE, ALLOWED_HOSTS=["testserver"], SECURE_SSL_REDIRECT=False,
+    SNAPSHOT_BASE_URL="http://testserver", SNAPSHOT_MAX_PAGES=3,
+)
+class SnapshotTests(TestCase):
+    """静的スナップショットがAPIのレスポンスと同じ内容で書き出し・更新されることの確認"""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_corpus(30, tags=4, tags_per_post=(1, 2), seed=3)
+
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.root = tmpdir.name
+        settings_override = override_settings(SNAPSHOT_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        Snapshot().rebuild()
+
+    def assertSnapshot(self, url, path):
+        with open(os.path.join(self.root, path), "rb") as f:
+            self.assertEqual(f.read(), self.client.get(url).content)
+
+    def test_rebuild_matches_api(self):
+        post = BlogPost.objects.filter(is_published=True).first()
+        self.assertSnapshot("/api/posts/", "posts/page-1.json")
+        self.assertSnapshot("/api/posts/?page=2", "posts/page-2.json")
+        self.assertSnapshot(f"/api/posts/{post.pk}/", f"posts/{post.pk}.json")
+        self.assertSnapshot("/api/tags/", "tags.json")
+
+    def test_unpublish_updates_affected_files(self):
+        post = BlogPost.objects.filter(is_published=True).order_by("-created_at")[10]
+        tag = post.tags.first()
+        post.is_published = False
+        post.save()
+        # 保存では書き出さず、ワーカーが更新待ちを処理する
+        self.assertTrue(os.path.exists(os.path.join(self.root, f"posts/{post.pk}.json")))
+        self.assertGreater(flush_updates(), 0)
+        self.assertFalse(SnapshotUpdate.objects.exists())
+
+        self.assertFalse(os.path.exists(os.path.join(self.root, f"posts/{post.pk}.json")))
+        self.assertSnapshot("/api/posts/", "posts/page-1.json")
+        self.assertSnapshot("/api/posts/?page=3", "posts/page-3.json")
+        self.assertSnapshot(f"/api/posts/?tag={tag.name}", f"posts/tag/{tag.name}/page-1.json")
+        self.assertSnapshot("/api/tags/", "tags.json")
+
+
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        settings.API_CACHE_ALIAS: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "response-cache-tests",
+        },
+    },
+    ALLOWED_HOSTS=["testserver"],
+    SECURE_SSL_REDIRECT=False,
+)
+class ResponseCacheTests(TestCase):
+    """キャッシュ済みのレスポンスが記事・タグ付け・いいねの変更で作り直され、ETag が変わることの確認"""
+
+    def setUp(self):
+        caches[settings.API_CACHE_ALIAS].clear()
+        self.tag = Tag.objects.create(name="京都")
+        author = User.objects.create(username="author")
+        self.post = BlogPost.objects.create(author=author, title="post", description="本文", is_published=True)
+        self.post.tags.add(self.tag)
+
+    def assertRefreshed(self, urls, change):
+        """urls をキャッシュに載せてから change を実行し、作り直されたレスポンスを返す"""
+        etags = {}
+        for url in urls:
+            self.client.get(url)
+            response = self.client.get(url)
+            self.assertEqual(response["X-Cache"], "HIT")
+            etags[url] = response["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        responses = {}
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response["X-Cache"], "MISS", url)
+            self.assertNotEqual(response["ETag"], etags[url], url)
+            responses[url] = response.json()
+        return responses
+
+    def test_post_save_refreshes_list_and_detail(self):
+        def rename():
+            self.post.title = "renamed"
+            self.post.save()
+
+        detail, listed, tagged = f"/api/posts/{self.post.pk}/", "/api/posts/", f"/api/posts/?tag={self.tag.name}"
+        responses = self.assertRefreshed([detail, listed, tagged], rename)
+        self.assertEqual(responses[detail]["title"], "renamed")
+        self.assertEqual(responses[listed]["results"][0]["title"], "renamed")
+        self.assertEqual(responses[tagged]["results"][0]["title"], "renamed")
+
+    def test_tagging_refreshes_list_and_detail(self):
+        other = Tag.objects.create(name="奈良")
+        detail, tagged = f"/api/posts/{self.post.pk}/", f"/api/posts/?tag={other.name}"
+        responses = self.assertRefreshed([detail, tagged], lambda: self.post.tags.add(other))
+        self.assertEqual({tag["name"] for tag in responses[detail]["tags"]}, {"京都", "奈良"})
+        self.assertEqual([row["id"] for row in responses[tagged]["results"]], [self.post.pk])
+
+    def test_like_refreshes_list_and_detail(self):
+        detail, listed = f"/api/posts/{self.post.pk}/", "/api/posts/"
+        responses = self.assertRefreshed(
+            [detail, listed], lambda: self.client.post(f"/api/posts/{self.post.pk}/like/")
+        )
+        self.assertEqual(responses[detail]["likes_count"], 1)
+        self.assertEqual(responses[listed]["results"][0]["likes_count"], 1)
+
+    def test_only_etag_answers_not_modified(self):
+        response = self.client.get("/api/tags/")
+        etag, last_modified = response["ETag"], response["Last-Modified"]
+        self.assertEqual(self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # 同じ秒の中で更新されても Last-Modified は変わらない
+        with self.captureOnCommitCallbacks(execute=True):
+            Tag.objects.create(name="大阪")
+        response = self.client.get("/api/tags/", HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({tag["name"] for tag in response.json()}, {"京都", "大阪"})
+        self.assertEqual(self.client.get("/api/tags/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        settings.API_CACHE_ALIAS: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "request-stats-tests",
+        },
+    },
+    ALLOWED_HOSTS=["testserver"],
+    SECURE_SSL_REDIRECT=False,
+    SERVER_TIMING_HEADER=True,
+)
+class RequestStatsTests(TestCase):
+    """Server-Timing ヘッダーと、計測・キャッシュの集計エンドポイント（管理者のみ）の確認"""
+
+    def setUp(self):
+        caches[settings.API_CACHE_ALIAS].clear()
+        cache.reset_stats()
+        timing.reset_stats()
+        seed_corpus(5, tags=3, seed=6)
+        self.admin = User.objects.create_user(username="admin", password="password", is_staff=True)
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get("/api/posts/")
+        header = response["Server-Timing"]
+        self.assertRegex(header, r'^db;dur=\d+\.\d;desc="\d+ queries"(, [a-z]+;dur=\d+\.\d)*, total;dur=\d+\.\d$')
+        self.assertEqual(int(re.search(r'"(\d+) queries"', header).group(1)), len(captured))
+        self.assertIn("serialize;dur=", header)
+
+        with override_settings(SERVER_TIMING_HEADER=False):
+            self.assertNotIn("Server-Timing", self.client.get("/api/posts/"))
+
+    def test_stats_are_admin_only(self):
+        reader = User.objects.create_user(username="reader", password="password")
+        for user in (None, reader):
+            if user:
+                self.client.force_login(user)
+            for url in ("/api/stats/requests/", "/api/cache/stats/"):
+                with self.subTest(user=user, url=url):
+                    self.assertEqual(self.client.get(url).status_code, 403)
+                    self.assertEqual(self.client.delete(url).status_code, 403)
+
+    def test_stats_shape_and_reset(self):
+        self.client.get("/api/posts/")
+        self.assertEqual(self.client.get("/api/posts/")["X-Cache"], "HIT")
+        self.client.force_login(self.admin)
+
+        routes = self.client.get("/api/stats/requests/").json()
+        route = routes["GET blog:blogpost-list"]
+        self.assertEqual(route["count"], 2)
+        self.assertEqual(set(route["ms"]), {"p50", "p95", "p99"})
+        self.assertEqual(set(route["queries"]), {"p50", "p95", "p99", "max"})
+        self.assertGreater(route["queries"]["max"], 0)
+        self.assertIn("db_ms_mean", route)
+
+        stats = self.client.get("/api/cache/stats/").json()
+        self.assertEqual(
+            {key: stats[key] for key in ("hits", "misses", "hit_ratio")}, {"hits": 1, "misses": 1, "hit_ratio": 0.5}
+        )
+
+        for url in ("/api/stats/requests/", "/api/cache/stats/"):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertNotIn("GET blog:blogpost-list", self.client.get("/api/stats/requests/").json())
+        self.assertEqual(self.client.get("/api/cache/stats/").json()["hits"], 0)
+
+
+@skipUnless("replica" in settings.DATABASES, "レプリカ用のデータベースは config.test_settings で設定する")
+@override_settings(
+    CACHES={
+        **settings.CACHES,
+        settings.API_CACHE_ALIAS: {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "replica-routing-tests",
+        },
+    },
+    ALLOWED_HOSTS=["testserver"],
+    SECURE_SSL_REDIRECT=False,
+    DATABASE_REPLICAS=["replica"],
+    REPLICA_LAG_SECONDS=0,
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    記事・タグの読み取りだけがレプリカに振り分けられることの確認
+
+    プライマリとレプリカに別々の記事を置き、どちらから読んだかを見分ける。
+    トランザクション中はプライマリを読むため TestCase ではなく TransactionTestCase を使う。
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        author = User.objects.create(username="primary")
+        self.post = BlogPost.objects.create(
+            author=author, title="primary", description="本文", is_published=True
+        )
+        replica_author = User.objects.db_manager("replica").create(username="replica")
+        BlogPost.objects.using("replica").bulk_create(
+            [BlogPost(pk=self.post.pk + 1000, author=replica_author, title="replica", is_published=True)]
+        )
+        caches[settings.API_CACHE_ALIAS].clear()
+
+    def titles(self):
+        return [post["title"] for post in self.client.get("/api/posts/").json()["results"]]
+
+    def test_list_reads_replica(self):
+        self.assertEqual(self.titles(), ["replica"])
+
+    def test_like_reads_and_writes_primary(self):
+        response = self.client.post(f"/api/posts/{self.post.pk}/like/")
+        self.assertEqual(response.status_code, 201)
+        status = self.client.get(f"/api/posts/{self.post.pk}/like_status/").json()
+        self.assertEqual(status, {"is_liked": True, "likes_count": 1})
+        self.assertFalse(Like.objects.using("replica").exists())
+
+    @override_settings(REPLICA_LAG_SECONDS=3600)
+    def test_recently_changed_scope_reads_primary(self):
+        self.assertEqual(self.titles(), ["primary"])
@@ -0,0 +1,155 @@
+# blog/timing.py
+
+"""
+リクエストごとの処理時間の計測
+
+ServerTimingMiddleware（blog.middleware）がリクエストの開始時に
+RequestTimings を用意し、各処理は timed("serialize") のように区間を計る。
+SQL は各スレッドの接続に connection_created で入れておく実行ラッパー
+（record_query）が、計測中のリクエストの件数・時間・文として記録する。
+ASGI では ORM が sync_to_async のスレッドで実行されるため、リクエストを
+受けたスレッドの接続だけを包むと数え漏れる。RequestTimings は ContextVar で
+渡し、sync_to_async はコンテキストを引き継ぐので、どのスレッドからでも同じ
+リクエストの記録に加わる。
+
+終了したリクエストは route（URLパターン）ごとに直近 REQUEST_STATS_WINDOW 件を
+保持し、stats() でパーセンタイルを返す。集計はプロセスごとのメモリ上にあり、
+複数ワーカー構成ではワーカーごとの値になる。
+"""
+
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# 遅いリクエストのログに載せるSQLの最大件数
+MAX_LOGGED_QUERIES = 50
+
+_current = ContextVar("request_timings", default=None)
+_lock = threading.Lock()
+_routes = {}
+
+
+class RequestTimings:
+    """1リクエスト分の区間ごとの時間（ミリ秒）とSQLの記録"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.queries = []
+
+    def add(self, name, ms):
+        self.durations[name] = self.durations.get(name, 0.0) + ms
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper 用：SQLの件数・時間・文を記録する"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - start) * 1000
+            self.query_count += 1
+            self.query_ms += ms
+            if len(self.queries) < MAX_LOGGED_QUERIES:
+                self.queries.append((ms, sql))
+
+    def server_timing(self, total_ms):
+        """Server-Timing ヘッダーの値"""
+        entries = [f'db;dur={self.query_ms:.1f};desc="{self.query_count} queries"']
+        entries += [f"{name};dur={ms:.1f}" for name, ms in self.durations.items()]
+        entries.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(entries)
+
+
+def record_query(execute, sql, params, many, context):
+    """全接続に入れておく execute_wrapper：計測中のリクエストがあればSQLを記録する"""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created の受信側：接続に record_query を1度だけ入れる"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def start():
+    """リクエストの計測を開始し、(RequestTimings, 復元用トークン) を返す"""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish(token):
+    _current.reset(token)
+
+
+def current():
+    """処理中のリクエストの RequestTimings（計測中でなければ None）"""
+    return _current.get()
+
+
+@contextmanager
+def timed(name):
+    """with timed("serialize"): のように区間の時間を現在のリクエストに加算する"""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, (time.perf_counter() - start_time) * 1000)
+
+
+def record(route, timings, total_ms):
+    """終了したリクエストを route ごとの直近の記録に加える"""
+    window = settings.REQUEST_STATS_WINDOW
+    with _lock:
+        samples = _routes.get(route)
+        if samples is None:
+            samples = _routes[route] = deque(maxlen=window)
+        samples.append((total_ms, timings.query_count, timings.query_ms))
+
+
+def _percentiles(values):
+    if len(values) == 1:
+        return values[0], values[0], values[0]
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def stats():
+    """route ごとの件数・レイテンシとクエリ数のパーセンタイル"""
+    with _lock:
+        snapshot = {route: list(samples) for route, samples in _routes.items()}
+
+    result = {}
+    for route, samples in sorted(snapshot.items()):
+        durations = [sample[0] for sample in samples]
+        queries = [sample[1] for sample in samples]
+        p50, p95, p99 = _percentiles(durations)
+        q50, q95, q99 = _percentiles(queries)
+        result[route] = {
+            "count": len(samples),
+            "ms": {"p50": round(p50, 1), "p95": round(p95, 1), "p99": round(p99, 1)},
+            "queries": {"p50": q50, "p95": q95, "p99": q99, "max": max(queries)},
+            "db_ms_mean": round(statistics.fmean(sample[2] for sample in samples), 1),
+        }
+    return result
+
+
+def reset_stats():
+    with _lock:
+        _routes.clear()
@@ -0,0 +1,127 @@
+# blog/trending.py
+
+"""
+トレンドスコア（時間で減衰するいいねの重み付き合計）と人気順の並べ替え
+
+いいね1件の重みは、そのいいねの時刻 t と基準時刻 epoch（TrendingState）から
+2 ** ((t - epoch) / 半減期) とする。どの記事のスコアも「現在時刻まで減衰させた値」
+に同じ係数を掛けたものになるため、保存した値の大小がそのまま現在のトレンド順になり、
+いいねが来たときは重みを足すだけでよい（他の記事を更新しない）。
+
+新しいいいねほど重みが大きくなり続けるので、redecay_trending コマンドで定期的に
+基準時刻を現在に進め、直近のいいねからスコアを数え直す（いいね解除の取りこぼしや
+古くなったいいねの切り捨てもここで補正される）。
+"""
+
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FloatField, Subquery, Value
+from django.db.models.functions import Coalesce, Power
+from django.utils import timezone
+from rest_framework.filters import OrderingFilter
+
+from .models import BlogPost, Like, TrendingState
+
+# これより古いいいねは重みが 1/1024 未満になるため数えない（半減期の倍数）
+WINDOW_HALF_LIVES = 10
+
+UPDATE_BATCH_SIZE = 1000
+
+
+def half_life_seconds():
+    return settings.TRENDING_HALF_LIFE_HOURS * 3600
+
+
+def like_weight(created_at):
+    """created_at のいいね1件分の重み（UPDATE で加減算する式。基準時刻はDBから読む）"""
+    timestamp = created_at.timestamp()
+    epoch = Coalesce(
+        Subquery(TrendingState.objects.order_by("pk").values("epoch")[:1]),
+        # 基準時刻がまだなければ現在を基準にする（次の数え直しでそろう）
+        Value(timestamp),
+        output_field=FloatField(),
+    )
+    return Power(
+        Value(2.0),
+        (Value(timestamp) - epoch) / Value(float(half_life_seconds())),
+        output_field=FloatField(),
+    )
+
+
+def current_epoch():
+    epoch = TrendingState.objects.order_by("pk").values_list("epoch", flat=True).first()
+    return time.time() if epoch is None else epoch
+
+
+def compute_scores(epoch, post_ids=None):
+    """直近のいいねから記事ごとのスコアを計算する（{記事ID: スコア}）"""
+    since = timezone.now() - timedelta(seconds=half_life_seconds() * WINDOW_HALF_LIVES)
+    likes = Like.objects.filter(created_at__gte=since).order_by()
+    if post_ids is not None:
+        likes = likes.filter(blog_post_id__in=post_ids)
+
+    half_life = half_life_seconds()
+    scores = defaultdict(float)
+    for post_id, created_at in likes.values_list("blog_post_id", "created_at").iterator(chunk_size=5000):
+        scores[post_id] += 2.0 ** ((created_at.timestamp() - epoch) / half_life)
+    return scores
+
+
+def _apply_scores(scores, post_ids=None):
+    """スコアを保存し、直近のいいねがなくなった記事を0に戻す"""
+    stale = BlogPost.objects.filter(trending_score__gt=0)
+    if post_ids is not None:
+        stale = stale.filter(pk__in=post_ids)
+    stale.update(trending_score=0)
+
+    items = sorted(scores.items())
+    for start in range(0, len(items), UPDATE_BATCH_SIZE):
+        BlogPost.objects.bulk_update(
+            [BlogPost(pk=pk, trending_score=score) for pk, score in items[start:start + UPDATE_BATCH_SIZE]],
+            ["trending_score"],
+        )
+
+
+def refresh_scores(post_ids):
+    """指定した記事のスコアを現在の基準時刻で数え直す（ライトビハインドの反映時など）"""
+    post_ids = list(post_ids)
+    with transaction.atomic():
+        _apply_scores(compute_scores(current_epoch(), post_ids), post_ids)
+
+
+def redecay():
+    """基準時刻を現在に進め、すべての記事のスコアを数え直す。スコアのある記事数を返す"""
+    with transaction.atomic():
+        state = TrendingState.objects.select_for_update().order_by("pk").first()
+        epoch = time.time()
+        scores = compute_scores(epoch)
+        _apply_scores(scores)
+        if state is None:
+            TrendingState.objects.create(epoch=epoch)
+        else:
+            state.epoch = epoch
+            state.save(update_fields=["epoch", "updated_at"])
+    return len(scores)
+
+
+class PopularOrderingFilter(OrderingFilter):
+    """
+    ordering=likes（いいねが多い順）と ordering=trending（トレンド順）を受け付ける OrderingFilter
+
+    どちらも公開記事の (is_published, -スコア, -created_at) のインデックスで並べられる。
+    """
+
+    aliases = {
+        "likes": ["-likes_count", "-created_at"],
+        "trending": ["-trending_score", "-created_at"],
+    }
+
+    def get_ordering(self, request, queryset, view):
+        param = request.query_params.get(self.ordering_param, "").strip()
+        if param in self.aliases:
+            return self.aliases[param]
+        return super().get_ordering(request, queryset, view)
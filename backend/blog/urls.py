@@ -12,5 +12,7 @@ router.register(r'tags', views.TagViewSet, basename='tag')
 app_name = 'blog'
 
 urlpatterns = [
+    path('cache/stats/', views.CacheStatsView.as_view(), name='cache-stats'),
+    path('stats/requests/', views.RequestStatsView.as_view(), name='request-stats'),
     path('', include(router.urls)),
 ]
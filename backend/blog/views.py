@@ -1,54 +1,209 @@
 # blog/views.py
 
+from django.conf import settings
+from django.http import Http404
+from django.db.models import Exists, OuterRef, Value
+from django.views.static import serve
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from .models import BlogPost, Tag, Like
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.views import APIView
+from . import archive, cache, likes, timing
+from .cache import CachedResponseMixin
+from .models import ArchiveMonth, BlogPost, Tag, Like
+from .pagination import BlogPostPagination
+from .search import SEARCH_PARAM, FullTextSearchFilter
 from .serializers import (
     BlogPostListSerializer,
     BlogPostDetailSerializer,
-    TagSerializer,
+    LIST_ROW_FIELDS,
+    TagWithCountSerializer,
+    list_row_fields,
+    serialize_list_rows,
 )
+from .storage import is_hashed_name
+from .trending import PopularOrderingFilter
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+# 一括いいね状態取得で一度に指定できる記事数
+BULK_LIKE_STATUS_MAX_IDS = 100
+
+# 内容のハッシュで名前を付けたメディアファイルのキャッシュ期間（1年）
+IMMUTABLE_MEDIA_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def like_result(method, changed, likes_count):
+    """いいねの追加（POST）・解除（DELETE）の結果から (レスポンスデータ, ステータス) を作る"""
+    if method == "POST":
+        if changed:
+            return {
+                "detail": "いいねしました",
+                "likes_count": likes_count,
+                "is_liked": True,
+            }, status.HTTP_201_CREATED
+        return {
+            "detail": "すでにいいねしています",
+            "likes_count": likes_count,
+            "is_liked": True,
+        }, status.HTTP_400_BAD_REQUEST
+
+    if changed:
+        return {
+            "detail": "いいねを解除しました",
+            "likes_count": likes_count,
+            "is_liked": False,
+        }, status.HTTP_200_OK
+    return {
+        "detail": "いいねしていません",
+        "likes_count": likes_count,
+        "is_liked": False,
+    }, status.HTTP_400_BAD_REQUEST
+
+
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """タグの読み取り専用ビューセット"""
 
     queryset = Tag.objects.all()
-    serializer_class = TagSerializer
+    serializer_class = TagWithCountSerializer
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter]
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["name"]
+    # ?ordering=-published_post_count で記事の多い順（blog_tag_popular_idx）
+    ordering_fields = ["name", "published_post_count"]
+    ordering = ["name"]
     pagination_class = None
+    cache_query_params = ("search", "ordering")
+    replica_reads = True
 
+    def get_cache_scopes(self):
+        """タグの追加・変更・削除で無効化"""
+        return [cache.TAGS]
 
-class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
+
+class BlogPostViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """ブログ記事の読み取り専用ビューセット"""
 
     queryset = BlogPost.objects.filter(is_published=True)
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [filters.SearchFilter, PopularOrderingFilter, FullTextSearchFilter]
     search_fields = ["title", "description"]
+    # ほかに ?ordering=likes / ?ordering=trending（blog.trending.PopularOrderingFilter）
     ordering_fields = ["created_at", "updated_at"]
     ordering = ["-created_at"]
+    pagination_class = BlogPostPagination
+    cache_query_params = (
+        "page", "tag", "month", "search", "ordering", SEARCH_PARAM, "pagination", "cursor", "format",
+    )
+    # 一覧・詳細はレプリカから読む（いいね系のアクションはプライマリ）
+    replica_reads = True
 
     def get_queryset(self):
         """クエリセットを取得（フィルタリング機能付き）"""
-        from django.db.models import Count
+        queryset = BlogPost.objects.filter(is_published=True)
+        if self.action == "retrieve":
+            # 一覧は _list_rows が、いいね系のアクションは記事本体だけを使う
+            queryset = queryset.prefetch_related('tags', 'image_variants')
 
-        queryset = BlogPost.objects.filter(is_published=True).prefetch_related(
-            'tags'
-        ).annotate(
-            likes_count_cached=Count('likes')
-        )
-
-        # タグでフィルタリング
+        # タグでフィルタリング（結合せず中間テーブルへの EXISTS にして重複排除を不要にする）
         tag = self.request.query_params.get("tag", None)
         if tag:
-            queryset = queryset.filter(tags__name=tag)
+            queryset = queryset.filter(
+                Exists(
+                    BlogPost.tags.through.objects.filter(
+                        blogpost_id=OuterRef("pk"), tag__name=tag
+                    )
+                )
+            )
+
+        # 月で絞り込み（?month=2024-05。created_at の範囲条件で blog_post_feed_idx を使う）
+        month = self.request.query_params.get("month", None)
+        if month:
+            try:
+                start, end = archive.month_range(archive.parse_month(month))
+            except ValueError:
+                raise ValidationError({"month": "YYYY-MM の形式で指定してください"})
+            queryset = queryset.filter(created_at__gte=start, created_at__lt=end)
+
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(self._list_rows, request, *args, **kwargs)
 
-        return queryset.distinct()
+    def _list_rows(self, request, *args, **kwargs):
+        """
+        一覧の高速パス
+
+        ModelSerializer の代わりに values() の行を serialize_list_rows で
+        直接 dict にする（出力は BlogPostListSerializer と同じ）。
+        """
+        context = self.get_serializer_context()
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .values(*list_row_fields(context))
+        )
+        page = self.paginate_queryset(queryset)
+        rows = list(page if page is not None else queryset)
+        with timing.timed("serialize"):
+            data = serialize_list_rows(rows, context)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(self._retrieve, request, *args, **kwargs)
+
+    def _retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        with timing.timed("serialize"):
+            data = self.get_serializer(instance).data
+        return Response(data)
+
+    @action(detail=False, methods=["get"], permission_classes=[AllowAny])
+    def archive(self, request):
+        """月別の公開記事数（新しい月から。ArchiveMonth を読むだけの1クエリ）"""
+        return self._cached_response(self._archive_rows, request)
+
+    def _archive_rows(self, request):
+        rows = ArchiveMonth.objects.filter(post_count__gt=0).values_list("month", "post_count")
+        return Response(
+            [{"year": month.year, "month": month.month, "count": count} for month, count in rows]
+        )
+
+    @action(detail=True, methods=["get"], permission_classes=[AllowAny])
+    def related(self, request, pk=None):
+        """関連記事（タグの重なりが大きい順。blog.related が事前計算した RelatedPost）"""
+        return self._cached_response(self._related_rows, request, pk=pk)
+
+    def _related_rows(self, request, pk=None):
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        # (blog_post, rank) のインデックスを1回引く（非公開・未計算の記事は空）
+        rows = (
+            BlogPost.objects.filter(related_from__blog_post_id=pk, is_published=True)
+            .order_by("related_from__rank")
+            .values(*LIST_ROW_FIELDS)
+        )
+        with timing.timed("serialize"):
+            data = serialize_list_rows(rows, self.get_serializer_context())
+        return Response(data)
+
+    def get_cache_scopes(self):
+        """レスポンスが依存するキャッシュスコープ（blog.cache を参照）"""
+        if self.action == "retrieve":
+            return [cache.POSTS, cache.post_scope(self.kwargs["pk"])]
+        if self.action == "archive":
+            return [cache.ARCHIVE]
+        if self.action == "related":
+            # 関連記事の一覧にはほかの記事のいいね数なども含まれる
+            return [cache.POSTS, cache.POST_LIST, cache.post_scope(self.kwargs["pk"])]
+        tag = self.request.query_params.get("tag")
+        if tag:
+            return [cache.POSTS, cache.tag_scope(tag)]
+        return [cache.POSTS, cache.POST_LIST]
 
     def get_serializer_class(self):
         """アクションに応じて適切なシリアライザーを選択"""
@@ -57,14 +212,20 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
         return BlogPostDetailSerializer
 
     def get_serializer_context(self):
-        """シリアライザーにセッションキーを渡す"""
+        """シリアライザーにセッションキーと検索語を渡す（セッションは作成しない）"""
         context = super().get_serializer_context()
-        context["session_key"] = self._get_or_create_session_key()
+        context["session_key"] = self._get_session_key()
+        context["search_query"] = self.request.query_params.get(SEARCH_PARAM, "").strip()
         return context
 
-    def _get_or_create_session_key(self):
-        """セッションキーを取得または作成"""
-        if not self.request.session.session_key:
+    def _get_session_key(self, create=False):
+        """
+        セッションキーを取得（未発行なら None）
+
+        閲覧だけの訪問者ごとに django_session へ INSERT しないよう、
+        セッションは create=True（いいねの追加時）のときだけ作成する。
+        """
+        if create and not self.request.session.session_key:
             self.request.session.create()
         return self.request.session.session_key
 
@@ -76,66 +237,118 @@ class BlogPostViewSet(viewsets.ReadOnlyModelViewSet):
         DELETE: いいねを削除
         """
         blog_post = self.get_object()
-        session_key = self._get_or_create_session_key()
+        session_key = self._get_session_key(create=request.method == "POST")
 
         if request.method == "POST":
-            # いいねを追加
-            like, created = Like.objects.get_or_create(
-                session_key=session_key, blog_post=blog_post
+            # いいねを追加（blog.likes を参照）
+            changed, likes_count = likes.add_like(blog_post, session_key)
+        else:
+            # いいねを削除
+            changed, likes_count = likes.remove_like(blog_post, session_key)
+        data, status_code = like_result(request.method, changed, likes_count)
+        return Response(data, status=status_code)
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="like_status",
+        permission_classes=[AllowAny],
+    )
+    def bulk_like_status(self, request):
+        """
+        複数記事のいいね状態をまとめて取得（?ids=1,2,3）
+
+        一覧ページのカードごとに like_status を呼ばずに済むよう、
+        EXISTS サブクエリ付きの1クエリで全件を返す。
+        """
+        raw_ids = request.query_params.get("ids", "")
+        try:
+            ids = list(dict.fromkeys(int(value) for value in raw_ids.split(",") if value))
+        except ValueError:
+            return Response(
+                {"detail": "ids は記事IDのカンマ区切りで指定してください"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            if created:
-                return Response(
-                    {
-                        "detail": "いいねしました",
-                        "likes_count": blog_post.get_likes_count(),
-                        "is_liked": True,
-                    },
-                    status=status.HTTP_201_CREATED,
-                )
-            else:
-                return Response(
-                    {
-                        "detail": "すでにいいねしています",
-                        "likes_count": blog_post.get_likes_count(),
-                        "is_liked": True,
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        if len(ids) > BULK_LIKE_STATUS_MAX_IDS:
+            return Response(
+                {"detail": f"ids は {BULK_LIKE_STATUS_MAX_IDS} 件までです"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not ids:
+            return Response([])
 
-        elif request.method == "DELETE":
-            # いいねを削除
-            try:
-                like = Like.objects.get(session_key=session_key, blog_post=blog_post)
-                like.delete()
-                return Response(
-                    {
-                        "detail": "いいねを解除しました",
-                        "likes_count": blog_post.get_likes_count(),
-                        "is_liked": False,
-                    },
-                    status=status.HTTP_200_OK,
-                )
-            except Like.DoesNotExist:
-                return Response(
-                    {
-                        "detail": "いいねしていません",
-                        "likes_count": blog_post.get_likes_count(),
-                        "is_liked": False,
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        session_key = self._get_session_key()
+        if session_key is None:
+            is_liked = Value(False)
+        else:
+            is_liked = Exists(
+                Like.objects.filter(blog_post=OuterRef("pk"), session_key=session_key)
+            )
+        rows = (
+            BlogPost.objects.filter(is_published=True, pk__in=ids)
+            .annotate(is_liked=is_liked)
+            .values("id", "is_liked", "likes_count")
+        )
+        by_id = {row["id"]: row for row in rows}
+
+        if settings.LIKE_WRITE_BEHIND:
+            # 未反映のいいね操作を楽観的に反映する
+            deltas, latest = likes.pending_state(list(by_id), session_key)
+            for pk, row in by_id.items():
+                row["likes_count"] = max(row["likes_count"] + deltas.get(pk, 0), 0)
+                row["is_liked"] = latest.get(pk, row["is_liked"])
+
+        return Response([by_id[pk] for pk in ids if pk in by_id])
 
     @action(detail=True, methods=["get"], permission_classes=[AllowAny])
     def like_status(self, request, pk=None):
         """現在のセッションがいいねしているかを確認"""
         blog_post = self.get_object()
-        session_key = self._get_or_create_session_key()
-        is_liked = Like.objects.filter(
-            session_key=session_key, blog_post=blog_post
-        ).exists()
+        is_liked, likes_count = likes.like_state(blog_post, self._get_session_key())
         return Response(
             {
                 "is_liked": is_liked,
-                "likes_count": blog_post.get_likes_count(),
+                "likes_count": likes_count,
             }
         )
+
+
+class RequestStatsView(APIView):
+    """route ごとのレイテンシとクエリ数のパーセンタイル（管理者のみ、blog.timing を参照）"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(timing.stats())
+
+    def delete(self, request):
+        timing.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class CacheStatsView(APIView):
+    """APIレスポンスキャッシュのヒット率（管理者のみ、プロセスごとの値）"""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache.stats())
+
+    def delete(self, request):
+        cache.reset_stats()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def media(request, path):
+    """
+    メディアファイルの配信（DEBUG または SERVE_MEDIA のとき config.urls が使う）
+
+    ハッシュ名のファイルは内容が変わらないため immutable として長期キャッシュさせ、
+    それ以外（導入前のファイル）は毎回再検証させる。
+    """
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if is_hashed_name(path):
+        response["Cache-Control"] = f"public, max-age={IMMUTABLE_MEDIA_MAX_AGE}, immutable"
+    else:
+        response["Cache-Control"] = "no-cache"
+    return response
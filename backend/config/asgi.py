@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# 記事一覧・詳細・いいね系を非同期ビューで処理するには ASYNC_API_VIEWS=True を設定する
 
 application = get_asgi_application()
@@ -0,0 +1,7 @@
+# config/async_urls.py
+
+"""ASYNC_API_VIEWS に関係なく /api/ を非同期ビューで処理する URLconf（ROOT_URLCONF の差し替え用）"""
+
+from .urls import build_urlpatterns
+
+urlpatterns = build_urlpatterns(async_views=True)
@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Csv, config
+from django.core.exceptions import ImproperlyConfigured
 import pillow_heif
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     # 追加アプリ
     "rest_framework",
     "corsheaders",
@@ -30,8 +32,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "blog.middleware.ServerTimingMiddleware",  # 計測のため先頭に
     "django.middleware.security.SecurityMiddleware",
-    "django.contrib.sessions.middleware.SessionMiddleware",
+    "blog.middleware.TimedSessionMiddleware",  # SessionMiddleware + 保存時間の計測
     "corsheaders.middleware.CorsMiddleware",  # CommonMiddlewareの前に
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -71,9 +74,71 @@ DATABASES = {
         "PASSWORD": config("DATABASE_PASSWORD"),
         "HOST": config("DATABASE_HOST"),
         "PORT": config("DATABASE_PORT"),
+        # 接続をリクエストごとに張り直さず使い回す（秒）。使う前に生きているか確認する
+        "CONN_MAX_AGE": config("DATABASE_CONN_MAX_AGE", default=60, cast=int),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# True: psycopg 3 の接続プールを使う（psycopg[pool] が必要。CONN_MAX_AGE は使わない）
+# ASGI では接続がスレッドごとに残るため、使い回すならこちらを使う
+if config("DATABASE_POOL", default=False, cast=bool):
+    try:
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured(
+            'DATABASE_POOL には psycopg 3 の接続プールが必要です（pip install "psycopg[binary,pool]"）'
+        )
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": config("DATABASE_POOL_MIN_SIZE", default=2, cast=int),
+            "max_size": config("DATABASE_POOL_MAX_SIZE", default=10, cast=int),
+        }
+    }
+
+# 読み取りレプリカ（"host" または "host:port" のカンマ区切り。blog.routers）
+DATABASE_REPLICAS = []
+for index, address in enumerate(config("DATABASE_REPLICA_HOSTS", default="", cast=Csv()), start=1):
+    host, _, port = address.partition(":")
+    alias = f"replica{index}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["blog.routers.ReplicaRouter"]
+# 記事・タグが変わってからこの秒数の間は、そのレスポンスをレプリカから読まない
+REPLICA_LAG_SECONDS = config("REPLICA_LAG_SECONDS", default=10, cast=int)
+
+# ==========================
+# キャッシュ
+# ==========================
+# APIレスポンスキャッシュのバックエンド: "file"（複数ワーカーで共有）/ "locmem"（単一プロセス向け）
+# またはキャッシュバックエンドのクラスパス
+API_CACHE_BACKEND = config("API_CACHE_BACKEND", default="file")
+API_CACHE_ALIAS = "api"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    API_CACHE_ALIAS: {
+        "BACKEND": {
+            "file": "django.core.cache.backends.filebased.FileBasedCache",
+            "locmem": "django.core.cache.backends.locmem.LocMemCache",
+        }.get(API_CACHE_BACKEND, API_CACHE_BACKEND),
+        "LOCATION": config(
+            "API_CACHE_LOCATION", default=os.path.join(BASE_DIR, "cache", "api")
+        ),
+        "TIMEOUT": config("API_CACHE_TIMEOUT", default=300, cast=int),
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
 # ==========================
 # 認証（管理画面用のみ）
 # ==========================
@@ -96,6 +161,16 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# アップロードファイルは内容のハッシュで名前を付け、同じ内容を共有する（blog.storage）
+STORAGES = {
+    "default": {"BACKEND": "blog.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+# True: DEBUG でなくても Django がメディアファイルを配信する（blog.views.media）
+# 本番で nginx が配信する場合は、ハッシュ名のファイル（例: /media/.../ab/ab….jpg）に
+# 「Cache-Control: public, max-age=31536000, immutable」を付けるよう設定する
+SERVE_MEDIA = config("SERVE_MEDIA", default=False, cast=bool)
+
 # ==========================
 # CORS / CSRF 設定
 # ==========================
@@ -149,9 +224,73 @@ REST_FRAMEWORK = {
 # ==========================
 # ファイルアップロード設定
 # ==========================
-FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
+# これを超えるアップロードはメモリではなく一時ファイルに書き出す
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2 * 1024 * 1024  # 2MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 25 * 1024 * 1024  # 25MB（安全余裕）
 
+# ==========================
+# 画像処理
+# ==========================
+# True: アップロード画像の最適化は process_image_jobs ワーカーで行う
+# False: 保存時にその場で処理する（ワーカーを動かさない開発環境向け）
+IMAGE_PROCESSING_ASYNC = config("IMAGE_PROCESSING_ASYNC", default=True, cast=bool)
+
+# ==========================
+# いいね
+# ==========================
+# True: いいね操作を LikeEvent に追記するだけで応答し、flush_like_events でまとめて反映する
+LIKE_WRITE_BEHIND = config("LIKE_WRITE_BEHIND", default=False, cast=bool)
+# トレンドスコアでいいねの重みが半分になるまでの時間（blog.trending）
+TRENDING_HALF_LIFE_HOURS = config("TRENDING_HALF_LIFE_HOURS", default=24, cast=float)
+# 記事ごとに事前計算しておく関連記事の数（blog.related）
+RELATED_POSTS_LIMIT = config("RELATED_POSTS_LIMIT", default=5, cast=int)
+# 関連記事の候補にするタグごとの新しい公開記事の数（blog.related）
+RELATED_CANDIDATES_PER_TAG = config("RELATED_CANDIDATES_PER_TAG", default=1000, cast=int)
+# 管理画面の一覧でこの推定行数を超えたら COUNT(*) の代わりに推定値を使う（blog.pagination）
+ADMIN_ESTIMATED_COUNT_THRESHOLD = config("ADMIN_ESTIMATED_COUNT_THRESHOLD", default=10000, cast=int)
+
+# ==========================
+# 非同期ビュー
+# ==========================
+# True: 記事一覧・詳細・いいね系を非同期ビュー（blog.async_views）で処理する（ASGI 向け）
+ASYNC_API_VIEWS = config("ASYNC_API_VIEWS", default=False, cast=bool)
+
+# ==========================
+# 静的スナップショット
+# ==========================
+# 公開APIのJSONを書き出すディレクトリ（空なら書き出さない。blog.snapshots）
+SNAPSHOT_ROOT = config("SNAPSHOT_ROOT", default="")
+# スナップショット内のURL（ページの next/previous・画像）に使うスキームとホスト
+SNAPSHOT_BASE_URL = config("SNAPSHOT_BASE_URL", default="http://localhost")
+# 一覧を書き出す最大ページ数（それより深いページは Django が応答する）
+SNAPSHOT_MAX_PAGES = config("SNAPSHOT_MAX_PAGES", default=20, cast=int)
+# 書き出し済みのいいね数からこの割合以上変わったら書き直す（10件未満は1件の変化で）
+SNAPSHOT_LIKES_TOLERANCE = config("SNAPSHOT_LIKES_TOLERANCE", default=0.1, cast=float)
+# True: 更新は flush_snapshot_updates ワーカーが書き出す
+# False: コミット後にそのリクエストの中で書き出す（ワーカーを動かさない開発環境向け）
+SNAPSHOT_UPDATE_ASYNC = config("SNAPSHOT_UPDATE_ASYNC", default=True, cast=bool)
+
+# ==========================
+# リクエストの計測
+# ==========================
+# Server-Timing ヘッダーを返すか（内部の処理時間が見えるため既定は開発時のみ）
+SERVER_TIMING_HEADER = config("SERVER_TIMING_HEADER", default=DEBUG, cast=bool)
+# これ以上かかったリクエストを実行したSQLと一緒にログに出す（ミリ秒）
+SLOW_REQUEST_MS = config("SLOW_REQUEST_MS", default=500, cast=int)
+# route ごとに集計する直近のリクエスト数
+REQUEST_STATS_WINDOW = config("REQUEST_STATS_WINDOW", default=1000, cast=int)
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "blog.timing": {"handlers": ["console"], "level": "WARNING"},
+    },
+}
+
 # ==========================
 # その他
 # ==========================
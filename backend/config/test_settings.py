@@ -0,0 +1,15 @@
+# config/test_settings.py
+
+"""
+テスト用の設定（python manage.py test --settings=config.test_settings）
+
+プライマリとは別のデータベースをレプリカの代わりに作る（blog.tests の ReplicaRoutingTests）。
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+DATABASES["replica"] = {
+    **DATABASES["default"],
+    "TEST": {"NAME": f"test_{DATABASES['default']['NAME']}_replica"},
+}
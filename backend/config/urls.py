@@ -1,16 +1,27 @@
 # config/urls.py
 
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
+from blog.views import media
+
+
+def build_urlpatterns(async_views):
+    """/api/ を非同期ビュー（blog.async_urls）と同期ビュー（blog.urls）のどちらで処理するか"""
+    urlpatterns = [
+        path("admin/", admin.site.urls),
+        path("api/", include("blog.async_urls" if async_views else "blog.urls")),   # /api/ 以下はDRF
+        # トップの RedirectView は不要
+    ]
+
+    # 開発環境（または SERVE_MEDIA）でメディアファイルを配信
+    if settings.DEBUG or settings.SERVE_MEDIA:
+        urlpatterns += [
+            re_path(rf"^{re.escape(settings.MEDIA_URL.lstrip('/'))}(?P<path>.*)$", media, name="media"),
+        ]
+    return urlpatterns
 
-urlpatterns = [
-    path("admin/", admin.site.urls),
-    path("api/", include("blog.urls")),   # /api/ 以下はDRF
-    # トップの RedirectView は不要
-]
 
-# 開発環境でメディアファイルを配信
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+urlpatterns = build_urlpatterns(settings.ASYNC_API_VIEWS)
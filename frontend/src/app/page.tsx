@@ -4,7 +4,11 @@
 
 import { useState, Suspense } from "react";
 import { useSearchParams, useRouter } from "next/navigation";
-import { useBlogPosts } from "@/hooks/useBlogPosts";
+import {
+  useArchive,
+  useBlogPosts,
+  useLikeStatuses,
+} from "@/hooks/useBlogPosts";
 import { useTags } from "@/hooks/useTags";
 import { BlogPostCard } from "@/components/blog/BlogPostCard";
 import { Button } from "@/components/ui/Button";
@@ -20,6 +24,7 @@ function HomeContent() {
   // URLからパラメータを取得
   const page = Number(searchParams.get("page")) || 1;
   const selectedTag = searchParams.get("tag") || "";
+  const selectedMonth = searchParams.get("month") || "";
   const ordering = searchParams.get("ordering") || "-created_at";
 
   const [search, setSearch] = useState("");
@@ -46,6 +51,10 @@ function HomeContent() {
     updateParams({ tag, page: "1" });
   };
 
+  const setSelectedMonth = (month: string) => {
+    updateParams({ month, page: "1" });
+  };
+
   const setOrdering = (newOrdering: string) => {
     updateParams({ ordering: newOrdering, page: "1" });
   };
@@ -58,10 +67,16 @@ function HomeContent() {
     page,
     search,
     tag: selectedTag,
+    month: selectedMonth,
     ordering,
   });
 
+  // カードごとではなく、表示中のページの記事のいいね状態を1回でまとめて取得する
+  const postIds = postsData?.results.map((post) => post.id) ?? [];
+  const { data: likeStatuses } = useLikeStatuses(postIds);
+
   const { data: tags = [] } = useTags();
+  const { data: archive = [] } = useArchive();
 
   const handleSearch = (e: React.FormEvent) => {
     e.preventDefault();
@@ -129,12 +144,29 @@ function HomeContent() {
                 <option value="">すべてのタグ</option>
                 {tags?.map((tag) => (
                   <option key={tag.id} value={tag.name}>
-                    {tag.name}
+                    {tag.name} ({tag.published_post_count ?? 0})
                   </option>
                 ))}
               </select>
             </div>
 
+            {/* 月別アーカイブ */}
+            <select
+              value={selectedMonth}
+              onChange={(e) => setSelectedMonth(e.target.value)}
+              className="form-select"
+            >
+              <option value="">すべての月</option>
+              {archive.map(({ year, month, count }) => {
+                const value = `${year}-${String(month).padStart(2, "0")}`;
+                return (
+                  <option key={value} value={value}>
+                    {year}年{month}月 ({count})
+                  </option>
+                );
+              })}
+            </select>
+
             {/* ソート */}
             <select
               value={ordering}
@@ -144,6 +176,8 @@ function HomeContent() {
               <option value="-created_at">新しい順</option>
               <option value="created_at">古い順</option>
               <option value="-updated_at">更新順</option>
+              <option value="trending">トレンド順</option>
+              <option value="likes">いいねが多い順</option>
             </select>
           </div>
         </div>
@@ -174,7 +208,11 @@ function HomeContent() {
           <>
             <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
               {postsData?.results.map((post) => (
-                <BlogPostCard key={post.id} post={post} />
+                <BlogPostCard
+                  key={post.id}
+                  post={post}
+                  likeStatus={likeStatuses?.get(post.id)}
+                />
               ))}
             </div>
 
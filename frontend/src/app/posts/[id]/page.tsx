@@ -16,6 +16,7 @@ import {
   useBlogPost,
   useLikeBlogPost,
   useLikeStatus,
+  useRelatedPosts,
 } from "@/hooks/useBlogPosts";
 import { Loading } from "@/components/ui/Loading";
 import { Header } from "@/components/layout/Header";
@@ -29,6 +30,7 @@ export default function BlogPostDetailPage() {
 
   const { data: post, isLoading, error } = useBlogPost(postId);
   const { data: likeStatus } = useLikeStatus(postId);
+  const { data: relatedPosts } = useRelatedPosts(postId);
   const likeMutation = useLikeBlogPost();
 
   const handleLike = () => {
@@ -181,6 +183,25 @@ export default function BlogPostDetailPage() {
             </div>
           </div>
         </article>
+
+        {/* 関連記事 */}
+        {relatedPosts && relatedPosts.length > 0 && (
+          <section className="glass rounded-2xl shadow-lg p-8 mt-8">
+            <h2 className="text-xl font-bold text-[#6b6b8d] mb-4">関連記事</h2>
+            <ul className="space-y-3">
+              {relatedPosts.map((related) => (
+                <li key={related.id}>
+                  <Link
+                    href={`/posts/${related.id}`}
+                    className="text-[#8b7eb8] hover:text-[#6b5e98] hover:underline transition-colors"
+                  >
+                    {related.title}
+                  </Link>
+                </li>
+              ))}
+            </ul>
+          </section>
+        )}
       </main>
       <SimpleFooter />
     </div>
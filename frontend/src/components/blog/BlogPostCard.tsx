@@ -8,17 +8,18 @@ import { format } from "date-fns";
 import { ja } from "date-fns/locale";
 import { HeartIcon, ClockIcon, TagIcon } from "@heroicons/react/24/outline";
 import { HeartIcon as HeartSolidIcon } from "@heroicons/react/24/solid";
-import { BlogPost } from "@/types";
+import { BlogPostSummary, LikeStatus } from "@/types";
 import { Card } from "@/components/ui/Card";
-import { useLikeBlogPost, useLikeStatus } from "@/hooks/useBlogPosts";
+import { useLikeBlogPost } from "@/hooks/useBlogPosts";
 
 interface BlogPostCardProps {
-  post: BlogPost;
+  post: BlogPostSummary;
+  // 一覧ページがまとめて取得したいいね状態（取得前は undefined）
+  likeStatus?: LikeStatus;
 }
 
-export function BlogPostCard({ post }: BlogPostCardProps) {
+export function BlogPostCard({ post, likeStatus }: BlogPostCardProps) {
   const likeMutation = useLikeBlogPost();
-  const { data: likeStatus } = useLikeStatus(post.id);
 
   const handleLike = (e: React.MouseEvent) => {
     e.preventDefault(); // Linkのクリックを防ぐ
@@ -64,7 +65,7 @@ export function BlogPostCard({ post }: BlogPostCardProps) {
 
           {/* 説明（Markdownをプレーンテキストに変換） */}
           <p className="text-gray-600 mb-4 line-clamp-3 flex-grow leading-relaxed">
-            {post.description.replace(/[#*`_~\[\]()]/g, "").substring(0, 150)}
+            {post.excerpt}
             ...
           </p>
 
@@ -4,9 +4,12 @@ import { useQuery, useMutation, useQueryClient } from "@tanstack/react-query";
 import {
   fetchBlogPosts,
   fetchBlogPost,
+  fetchArchive,
+  fetchRelatedPosts,
   likeBlogPost,
   unlikeBlogPost,
   fetchLikeStatus,
+  fetchLikeStatuses,
 } from "@/lib/api-functions";
 import toast from "react-hot-toast";
 
@@ -15,6 +18,7 @@ export const useBlogPosts = (params?: {
   page?: number;
   search?: string;
   tag?: string;
+  month?: string;
   ordering?: string;
 }) => {
   return useQuery({
@@ -36,6 +40,25 @@ export const useBlogPost = (id: number) => {
   });
 };
 
+// 月別アーカイブを取得するフック
+export const useArchive = () => {
+  return useQuery({
+    queryKey: ["archive"],
+    queryFn: fetchArchive,
+    staleTime: 1000 * 60 * 5,
+  });
+};
+
+// 関連記事を取得するフック
+export const useRelatedPosts = (id: number) => {
+  return useQuery({
+    queryKey: ["relatedPosts", id],
+    queryFn: () => fetchRelatedPosts(id),
+    enabled: !!id,
+    staleTime: 1000 * 60 * 5,
+  });
+};
+
 // いいね状態を取得するフック
 export const useLikeStatus = (id: number) => {
   return useQuery({
@@ -45,6 +68,17 @@ export const useLikeStatus = (id: number) => {
   });
 };
 
+// 一覧ページの記事のいいね状態をまとめて取得するフック（記事IDごとの Map を返す）
+export const useLikeStatuses = (ids: number[]) => {
+  return useQuery({
+    queryKey: ["likeStatuses", ids],
+    queryFn: () => fetchLikeStatuses(ids),
+    enabled: ids.length > 0,
+    select: (statuses) =>
+      new Map(statuses.map((status) => [status.id, status] as const)),
+  });
+};
+
 // いいね機能のフック
 export const useLikeBlogPost = () => {
   const queryClient = useQueryClient();
@@ -56,6 +90,7 @@ export const useLikeBlogPost = () => {
       queryClient.invalidateQueries({ queryKey: ["blogPosts"] });
       queryClient.invalidateQueries({ queryKey: ["blogPost", variables.id] });
       queryClient.invalidateQueries({ queryKey: ["likeStatus", variables.id] });
+      queryClient.invalidateQueries({ queryKey: ["likeStatuses"] });
       toast.success(
         variables.isLiked ? "いいねを解除しました" : "いいねしました！"
       );
@@ -1,18 +1,49 @@
 import { api } from "./api";
-import { BlogPost, Tag, PaginatedResponse } from "@/types";
+import {
+  ArchiveMonth,
+  BlogPost,
+  BlogPostSummary,
+  LikeStatus,
+  PostLikeStatus,
+  Tag,
+  PaginatedResponse,
+} from "@/types";
 
 // =======================
 // ブログ記事関連のAPI関数
 // =======================
 
+// 記事一覧のクエリパラメータ
+// 空の値と既定値（page=1・ordering=-created_at）は送らない。絞り込みのない一覧は
+// ?page=N&tag=T の形になり、nginx が静的スナップショットを返せる（backend/blog/snapshots.py）
+const listParams = (params?: {
+  page?: number;
+  search?: string;
+  tag?: string;
+  month?: string;
+  ordering?: string;
+}): Record<string, string | number> => {
+  const query: Record<string, string | number> = {};
+  if (!params) return query;
+  if (params.page && params.page > 1) query.page = params.page;
+  if (params.tag) query.tag = params.tag;
+  if (params.month) query.month = params.month;
+  if (params.search) query.search = params.search;
+  if (params.ordering && params.ordering !== "-created_at") {
+    query.ordering = params.ordering;
+  }
+  return query;
+};
+
 // 記事一覧を取得
 export const fetchBlogPosts = async (params?: {
   page?: number;
   search?: string;
   tag?: string;
+  month?: string;
   ordering?: string;
-}): Promise<PaginatedResponse<BlogPost>> => {
-  const response = await api.get("/posts/", { params });
+}): Promise<PaginatedResponse<BlogPostSummary>> => {
+  const response = await api.get("/posts/", { params: listParams(params) });
   return response.data;
 };
 
@@ -22,6 +53,20 @@ export const fetchBlogPost = async (id: number): Promise<BlogPost> => {
   return response.data;
 };
 
+// 月別アーカイブ（月ごとの記事数）を取得
+export const fetchArchive = async (): Promise<ArchiveMonth[]> => {
+  const response = await api.get("/posts/archive/");
+  return response.data;
+};
+
+// 関連記事を取得
+export const fetchRelatedPosts = async (
+  id: number
+): Promise<BlogPostSummary[]> => {
+  const response = await api.get(`/posts/${id}/related/`);
+  return response.data;
+};
+
 // いいねを追加
 export const likeBlogPost = async (id: number): Promise<any> => {
   const response = await api.post(`/posts/${id}/like/`);
@@ -35,13 +80,21 @@ export const unlikeBlogPost = async (id: number): Promise<any> => {
 };
 
 // いいね状態を取得
-export const fetchLikeStatus = async (
-  id: number
-): Promise<{ is_liked: boolean; likes_count: number }> => {
+export const fetchLikeStatus = async (id: number): Promise<LikeStatus> => {
   const response = await api.get(`/posts/${id}/like_status/`);
   return response.data;
 };
 
+// 複数記事のいいね状態をまとめて取得（一覧ページ用。1リクエストで1ページ分）
+export const fetchLikeStatuses = async (
+  ids: number[]
+): Promise<PostLikeStatus[]> => {
+  const response = await api.get("/posts/like_status/", {
+    params: { ids: ids.join(",") },
+  });
+  return response.data;
+};
+
 // =======================
 // タグ関連のAPI関数
 // =======================
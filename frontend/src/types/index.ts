@@ -4,10 +4,25 @@
 export interface Tag {
   id: number;
   name: string;
+  published_post_count?: number; // タグ一覧APIのみ
   created_at: string;
 }
 
-// ブログ記事型
+// ブログ記事一覧の要素型（本文の代わりに抜粋を持つ）
+export interface BlogPostSummary {
+  id: number;
+  title: string;
+  excerpt: string;
+  image: string | null;
+  tags: Tag[];
+  likes_count: number;
+  highlight?: string | null;
+  created_at: string;
+  updated_at: string;
+  is_published: boolean;
+}
+
+// ブログ記事型（詳細）
 export interface BlogPost {
   id: number;
   title: string;
@@ -21,6 +36,24 @@ export interface BlogPost {
   published_at?: string;
 }
 
+// いいね状態（like_status）
+export interface LikeStatus {
+  is_liked: boolean;
+  likes_count: number;
+}
+
+// 一覧ページ用にまとめて取得したいいね状態（like_status?ids=）
+export interface PostLikeStatus extends LikeStatus {
+  id: number;
+}
+
+// 月別アーカイブの要素型
+export interface ArchiveMonth {
+  year: number;
+  month: number;
+  count: number;
+}
+
 // ページネーション型
 export interface PaginatedResponse<T> {
   count: number;